@@ -1,59 +1,157 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS, cross_origin
-from trafficAgents.traffic_base.model import CityModel
-from trafficAgents.traffic_base.agent import Car, Road, Traffic_Light, Obstacle, Destination, Sidewalk, PedestrianWalk, Pedestrian
+import os
+import threading
+import time
 
-noa = 10
+from flask import Flask, request, jsonify, Response, g
+from flask_cors import CORS, cross_origin
+from static_layers import COMBINED_LAYERS
+from sessions import SessionStore
+from simulation import parse_until
+from wire import FRAME_MIMETYPE, wants_binary
+from workers import WorkerPool
+from trafficAgents.traffic_base.metrics import METRIC_FAMILIES, render_prometheus
+
+# Agents of a model built by /init without NAgents in a new session
+DEFAULT_AGENTS_COUNT = 10
 width = 30
 height = 30
-city_model = None
-currentStep = 0
+
+# Concurrent simulations kept alive, and seconds a session may go unused before eviction
+MAX_SESSIONS = 16
+SESSION_IDLE_TIMEOUT = 600
+
+# Largest number of steps a single /update may run
+MAX_STEPS_PER_UPDATE = 10000
+
+# Worker processes hosting session models; 0 steps every model in the request threads
+SIMULATION_WORKERS = int(os.environ.get("TRAFFIC_WORKERS", "0"))
+
+# Collect simulation and request metrics for /metrics; off records nothing
+METRICS_ENABLED = os.environ.get("TRAFFIC_METRICS", "0").lower() in ("1", "true")
+
+SERVER_METRIC_FAMILIES = dict(
+    METRIC_FAMILIES,
+    traffic_sessions=("gauge", "Live sessions."),
+    traffic_http_requests_total=("counter", "HTTP requests by endpoint and status."),
+    traffic_http_request_seconds_total=("counter", "Time spent handling HTTP requests by endpoint."),
+)
+request_metrics = {}
+request_metrics_lock = threading.Lock()
+
+sessions = SessionStore(MAX_SESSIONS, SESSION_IDLE_TIMEOUT)
+pool_lock = threading.Lock()
+
+def startWorkers():
+    """Start the worker pool on first use, so that importing this module never spawns processes."""
+    with pool_lock:
+        if SIMULATION_WORKERS > 0 and sessions.pool is None:
+            sessions.pool = WorkerPool(SIMULATION_WORKERS)
 
 app = Flask("Traffic Base")
-CORS(app, origins = ["http://localhost"])
+CORS(app, origins = ["http://localhost"], expose_headers = ["ETag"])
+
+if METRICS_ENABLED:
+    @app.before_request
+    def startRequestTimer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def recordRequestMetrics(response):
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or "unknown"
+        with request_metrics_lock:
+            count_key = ("traffic_http_requests_total", (("endpoint", endpoint), ("status", str(response.status_code))))
+            time_key = ("traffic_http_request_seconds_total", (("endpoint", endpoint),))
+            request_metrics[count_key] = request_metrics.get(count_key, 0) + 1
+            request_metrics[time_key] = request_metrics.get(time_key, 0.0) + elapsed
+        return response
+
+def sessionId():
+    """Get the session id sent with ?session= or the X-Session-Id header."""
+    return request.args.get("session") or request.headers.get("X-Session-Id")
+
+def currentSession():
+    """Get the session of the current request, or None if it is unknown or was evicted."""
+    session_id = sessionId()
+    return sessions.get(session_id) if session_id else None
+
+def unknownSession():
+    """Answer a request whose session does not exist."""
+    return jsonify({"message": "Unknown session, call /init first", "session": sessionId()}), 404
+
+def sessionEvents(session):
+    """Stream a session's frames, keeping the session alive while a viewer is connected."""
+    for event in session.channel.events():
+        session.touch()
+        yield event
+
+def staticLayerResponse(session, name):
+    """Serve a static layer from memory, answering conditional GETs with 304."""
+    body, etag = session.static_layer(name)
+    response = Response(body, mimetype = "application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def binaryFrameResponse(session, **layers):
+    """Encode the current frame as packed arrays when the client asked for them in Accept, else None."""
+    if not wants_binary(request.accept_mimetypes):
+        return None
+    response = Response(session.run("binary", **layers), mimetype = FRAME_MIMETYPE)
+    response.vary.add("Accept")
+    return response
 
 @app.route('/init', methods = ['GET', 'POST'])
 @cross_origin()
 def initModel():
-    global currentStep, city_model, noa
+    """Build a model in a new session, or rebuild it in the session given with the request.
+
+    Without NAgents, a rebuilt session keeps its own agent count.
+    """
+    session = currentSession()
+    agents_count = session.model_params["initial_agents_count"] if session is not None else DEFAULT_AGENTS_COUNT
 
     if request.method == 'POST':
         try:
-            noa = int(request.json['NAgents'])
-            city_model = CityModel(initial_agents_count=noa)
-            currentStep = 0
+            agents_count = int(request.json['NAgents'])
         except Exception as e:
             print(e)
             return jsonify({"message": "Error initializing model", "error": str(e)}), 500
-    elif request.method == 'GET':
-        city_model = CityModel(initial_agents_count=noa)
-        currentStep = 0
 
-    print(f"Model parameters: {noa,width,height}")
+    try:
+        startWorkers()
+        model_params = {"initial_agents_count": agents_count, "metrics": METRICS_ENABLED}
+        if session is None:
+            session = sessions.create(model_params)
+        else:
+            session.reset(model_params)
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Error initializing model", "error": str(e)}), 500
+
+    print(f"Model parameters: {agents_count,width,height}, session {session.id}")
     
-    return jsonify({"message": "Model initialized"}), 200
+    return jsonify({"message": "Model initialized", "session": session.id}), 200
+
+@app.route('/session', methods = ['DELETE'])
+@cross_origin()
+def closeSession():
+    if not sessions.remove(sessionId()):
+        return unknownSession()
+    return jsonify({"message": "Session closed"}), 200
 
 
 @app.route('/getAgents', methods = ['GET'])
 @cross_origin()
 def getAgents():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     try:
-        agentCells = city_model.grid.all_cells.select(
-            lambda cell: any(isinstance(obj, Car) for obj in cell.agents)
-        ).cells 
-
-        agents = [
-            (cell.coordinate, agent)
-            for cell in agentCells
-            for agent in cell.agents
-            if isinstance(agent, Car)
-        ]
-
-        agentPositions = [
-            {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1], "orientation": a.orientation}
-            for coordinate, a in agents
-        ]
+        binary = binaryFrameResponse(session, pedestrians = False, lights = False)
+        if binary is not None:
+            return binary
+
+        agentPositions = session.run("cars")
 
         return jsonify({"agentpos": agentPositions})
     except Exception as e:
@@ -63,27 +161,13 @@ def getAgents():
 @app.route("/getObstacles", methods = ['GET'])
 @cross_origin()
 def getObstacles():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            obstacleCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, Obstacle) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in obstacleCells
-                for agent in cell.agents
-                if isinstance(agent, Obstacle)
-            ]
-
-            obstaclePositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1]}
-                for (coordinate, a) in agents
-            ]
-
-            return jsonify({"obstaclepos": obstaclePositions})
+            return staticLayerResponse(session, "getObstacles")
         except Exception as e:
             print(e)
             return jsonify({"message": "Error getting obstacles positions", "error": str(e)}), 500
@@ -91,25 +175,17 @@ def getObstacles():
 @app.route("/getTrafficLights", methods = ['GET'])
 @cross_origin()
 def getTrafficLights():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            TrafficLightCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, Traffic_Light) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in TrafficLightCells
-                for agent in cell.agents
-                if isinstance(agent, Traffic_Light)
-            ]
-
-            TrafficLightPositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1], "state": a.state, "time_remaining": a.time_remaining}
-                for (coordinate, a) in agents
-            ]
+            binary = binaryFrameResponse(session, cars = False, pedestrians = False)
+            if binary is not None:
+                return binary
+
+            TrafficLightPositions = session.run("lights")
 
             return jsonify({"TrafficLightpos": TrafficLightPositions})
         except Exception as e:
@@ -120,27 +196,13 @@ def getTrafficLights():
 @app.route("/getRoads", methods = ['GET'])
 @cross_origin()
 def getRoads():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            RoadCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, Road) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in RoadCells
-                for agent in cell.agents
-                if isinstance(agent, Road)
-            ]
-
-            RoadPositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1]}
-                for (coordinate, a) in agents
-            ]
-
-            return jsonify({"Roadpos": RoadPositions})
+            return staticLayerResponse(session, "getRoads")
         except Exception as e:
             print(e)
             return jsonify({"message": "Error getting roads positions", "error": str(e)}), 500
@@ -149,27 +211,13 @@ def getRoads():
 @app.route("/getDestinations", methods = ['GET'])
 @cross_origin()
 def getDestinations():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            DestinationCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, Destination) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in DestinationCells
-                for agent in cell.agents
-                if isinstance(agent, Destination)
-            ]
-
-            DestinationPositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1]}
-                for (coordinate, a) in agents
-            ]
-
-            return jsonify({"Destinationpos": DestinationPositions})
+            return staticLayerResponse(session, "getDestinations")
         except Exception as e:
             print(e)
             return jsonify({"message": "Error getting destinations positions", "error": str(e)}), 500
@@ -177,27 +225,13 @@ def getDestinations():
 @app.route("/getSidewalks", methods = ['GET'])
 @cross_origin()
 def getSidewalks():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            SidewalkCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, Sidewalk) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in SidewalkCells
-                for agent in cell.agents
-                if isinstance(agent, Sidewalk)
-            ]
-
-            SidewalkPositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1]}
-                for (coordinate, a) in agents
-            ]
-
-            return jsonify({"Sidewalkpos": SidewalkPositions})
+            return staticLayerResponse(session, "getSidewalks")
         except Exception as e:
             print(e)
             return jsonify({"message": "Error getting sidewalks positions", "error": str(e)}), 500
@@ -205,102 +239,188 @@ def getSidewalks():
 @app.route("/getPedestrianWalks", methods = ['GET'])
 @cross_origin()
 def getPedestrianWalks():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            PedestrianWalkCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, PedestrianWalk) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in PedestrianWalkCells
-                for agent in cell.agents
-                if isinstance(agent, PedestrianWalk)
-            ]
-
-            PedestrianWalkPositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1]}
-                for (coordinate, a) in agents
-            ]
-
-            return jsonify({"PedestrianWalkpos": PedestrianWalkPositions})
+            return staticLayerResponse(session, "getPedestrianWalks")
         except Exception as e:
             print(e)
             return jsonify({"message": "Error getting pedestrian walks positions", "error": str(e)}), 500
 
 
+@app.route("/getStaticLayers", methods = ['GET'])
+@cross_origin()
+def getStaticLayers():
+    session = currentSession()
+    if session is None:
+        return unknownSession()
+
+    if request.method == "GET":
+        try:
+            return staticLayerResponse(session, COMBINED_LAYERS)
+        except Exception as e:
+            print(e)
+            return jsonify({"message": "Error getting static layers", "error": str(e)}), 500
+
 @app.route("/getPedestrians", methods = ['GET'])
 @cross_origin()
 def getPedestrians():
-    global city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         try:
-            PedestrianCells = city_model.grid.all_cells.select(
-                lambda cell: any(isinstance(obj, Pedestrian) for obj in cell.agents)
-            ).cells
-
-            agents = [
-                (cell.coordinate, agent)
-                for cell in PedestrianCells
-                for agent in cell.agents
-                if isinstance(agent, Pedestrian)
-            ]
-
-            PedestrianPositions = [
-                {"id": str(a.unique_id), "x":coordinate[0], "y":1, "z":coordinate[1], "orientation": a.orientation}
-                for (coordinate, a) in agents
-            ]
+            binary = binaryFrameResponse(session, cars = False, lights = False)
+            if binary is not None:
+                return binary
+
+            PedestrianPositions = session.run("pedestrians")
 
             return jsonify({"Pedestrianpos": PedestrianPositions})
         except Exception as e:
             print(e)
             return jsonify({"message": "Error getting pedestrians positions", "error": str(e)}), 500
 
+@app.route("/state", methods = ['GET'])
+@cross_origin()
+def getState():
+    session = currentSession()
+    if session is None:
+        return unknownSession()
+
+    if request.method == "GET":
+        try:
+            if request.args.get("advance", "false").lower() in ("1", "true"):
+                session.run("advance")
+
+            binary = binaryFrameResponse(session)
+            if binary is not None:
+                return binary
+
+            return jsonify(session.run("state"))
+        except Exception as e:
+            print(e)
+            return jsonify({"message": "Error getting model state", "error": str(e)}), 500
+
+@app.route("/delta", methods = ['GET'])
+@cross_origin()
+def getDelta():
+    session = currentSession()
+    if session is None:
+        return unknownSession()
+
+    if request.method == "GET":
+        try:
+            since = request.args.get("since", type = int)
+            return jsonify(session.run("delta", since))
+        except Exception as e:
+            print(e)
+            return jsonify({"message": "Error getting model delta", "error": str(e)}), 500
+
 @app.route("/update", methods = ["GET"])
 @cross_origin()
 def updateModel():
-    global currentStep, city_model
+    session = currentSession()
+    if session is None:
+        return unknownSession()
     
     if request.method == "GET":
         print("--------------------DEBUG----------------------")
-        print(city_model)
+        print(f"Session {session.id}")
         try:
-            city_model.step()
-            currentStep += 1
+            steps = request.args.get("steps", 1, type = int)
+            if not 1 <= steps <= MAX_STEPS_PER_UPDATE:
+                return jsonify({"message": f"steps must be between 1 and {MAX_STEPS_PER_UPDATE}"}), 400
+            until = request.args.get("until")
+            try:
+                parse_until(until)
+            except ValueError as e:
+                return jsonify({"message": "Invalid until condition", "error": str(e)}), 400
+            per_step = request.args.get("per_step", "false").lower() in ("1", "true")
+
+            update = session.run("advance_many", steps, until, per_step)
+            stats = update["stats"]
             
-            # Calculate statistics from agents
-            active_cars = sum(1 for agent in city_model.agents if isinstance(agent, Car) and agent.is_active())
-            arrived_cars = sum(1 for agent in city_model.agents if isinstance(agent, Car) and agent.is_arrived())
-            total_cars = sum(1 for agent in city_model.agents if isinstance(agent, Car))
-            
-            active_pedestrians = sum(1 for agent in city_model.agents if isinstance(agent, Pedestrian) and agent.is_active())
-            arrived_pedestrians = sum(1 for agent in city_model.agents if isinstance(agent, Pedestrian) and agent.is_arrived())
-            total_pedestrians = sum(1 for agent in city_model.agents if isinstance(agent, Pedestrian))
-            
-            print("Active cars: ", active_cars)
-            print("Arrived cars: ", arrived_cars)
-            print("Total cars: ", total_cars)
-            print("Active pedestrians: ", active_pedestrians)
-            print("Arrived pedestrians: ", arrived_pedestrians)
-            print("Total pedestrians: ", total_pedestrians)
+            print("Active cars: ", stats["active_cars"])
+            print("Arrived cars: ", stats["arrived_cars"])
+            print("Total cars: ", stats["total_cars"])
+            print("Active pedestrians: ", stats["active_pedestrians"])
+            print("Arrived pedestrians: ", stats["arrived_pedestrians"])
+            print("Total pedestrians: ", stats["total_pedestrians"])
             
             return jsonify({
-                "message": f"Model updated to step {currentStep}",
-                "stats": {
-                    "active_cars": active_cars,
-                    "arrived_cars": arrived_cars,
-                    "total_cars": total_cars,
-                    "active_pedestrians": active_pedestrians,
-                    "arrived_pedestrians": arrived_pedestrians,
-                    "total_pedestrians": total_pedestrians
-                }
+                "message": f"Model updated to step {update['step']}",
+                **update
             })
         except Exception as e:
             print(e)
             return jsonify({"message": "Error updating model", "error": str(e)}), 500
 
+@app.route("/stream/start", methods = ['GET', 'POST'])
+@cross_origin()
+def startStream():
+    """Start stepping the model on a server-side tick, optionally at ?rate= steps per second."""
+    session = currentSession()
+    if session is None:
+        return unknownSession()
+
+    try:
+        rate = request.args.get("rate", type = float)
+        session.ticker.start(rate)
+        return jsonify({"message": f"Streaming at {session.ticker.rate} steps per second"}), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Error starting stream", "error": str(e)}), 500
+
+@app.route("/stream/stop", methods = ['GET', 'POST'])
+@cross_origin()
+def stopStream():
+    session = currentSession()
+    if session is None:
+        return unknownSession()
+    try:
+        session.ticker.stop()
+        return jsonify({"message": "Streaming stopped"}), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Error stopping stream", "error": str(e)}), 500
+
+@app.route("/stream", methods = ['GET'])
+@cross_origin()
+def getStream():
+    """Push every frame produced by the ticker as Server-Sent Events, skipping frames a slow client missed."""
+    session = currentSession()
+    if session is None:
+        return unknownSession()
+
+    return Response(
+        sessionEvents(session),
+        mimetype = "text/event-stream",
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/metrics", methods = ['GET'])
+def getMetrics():
+    """Export simulation and request metrics of every session in the Prometheus text format."""
+    try:
+        live_sessions = sessions.all()
+        samples = [("traffic_sessions", {}, len(live_sessions))]
+        with request_metrics_lock:
+            samples.extend((name, dict(labels), value) for (name, labels), value in request_metrics.items())
+        for session in live_sessions:
+            samples.extend(
+                (name, dict(labels, session = session.id), value)
+                for name, labels, value in session.run("metrics")
+            )
+
+        return Response(render_prometheus(samples, SERVER_METRIC_FAMILIES), mimetype = "text/plain; version=0.0.4")
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Error getting metrics", "error": str(e)}), 500
+
 if __name__ == "__main__":
-    app.run(host="localhost", port=8585, debug=True)
\ No newline at end of file
+    app.run(host="localhost", port=8585, debug=True, threaded=True)
\ No newline at end of file
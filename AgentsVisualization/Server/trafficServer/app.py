@@ -61,6 +61,24 @@ model_params = {
         "max": 50,
         "step": 1,
     },
+    "routing": {
+        "type": "Select",
+        "value": "astar",
+        "values": ["astar", "field"],
+        "label": "Routing",
+    },
+    "replanning": {
+        "type": "Select",
+        "value": "restart",
+        "values": ["restart", "incremental"],
+        "label": "Replanning (incremental needs the agents engine)",
+    },
+    "engine": {
+        "type": "Select",
+        "value": "agents",
+        "values": ["agents", "fast"],
+        "label": "Car Engine",
+    },
 }
 
 model = CityModel(model_params["initial_agents_count"], spawn_interval=model_params["spawn_interval"]["value"])
@@ -0,0 +1,256 @@
+"""Reproducible benchmarks of model construction, stepping, routing, endpoints and
+generated cities of growing size.
+
+Every benchmark uses fixed seeds and reports the median, mean, min and max
+of repeated timings in seconds. Results are written as JSON keyed by
+benchmark name, and can be compared against a stored baseline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --output current.json --baseline baseline.json
+
+A benchmark counts as a regression when its median is slower than the
+baseline by more than --threshold (10% by default).
+"""
+import argparse
+import contextlib
+import gc
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import mesa
+import numpy as np
+
+from trafficAgents.traffic_base.map_generator import generate_city
+from trafficAgents.traffic_base.model import CityModel
+
+CITY_FILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trafficAgents", "city_files")
+BENCHMARK_GROUPS = ("init", "step", "routing", "endpoints", "scale")
+
+
+def summarize(timings):
+    """Get the summary statistics of a list of timings in seconds."""
+    return {
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "runs": len(timings),
+    }
+
+
+def measure(func, repeat):
+    """Time repeat calls of func with the garbage collector paused."""
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return summarize(timings)
+
+
+def bench_init(repeat):
+    """Time CityModel construction on every map in city_files."""
+    results = {}
+    for map_path in sorted(glob.glob(os.path.join(CITY_FILES_DIR, "*.txt"))):
+        map_file = os.path.basename(map_path)
+        results[f"init/{map_file}"] = measure(lambda: CityModel(10, seed=42, map_file=map_file), repeat)
+    return results
+
+
+def bench_step(repeat, fleet_sizes=(10, 50, 150, 300), warmup=200, steps=50):
+    """Time CityModel.step against fleet size after a warm-up that fills the city."""
+    results = {}
+    for fleet_size in fleet_sizes:
+        for engine in ("agents", "fast"):
+            model = CityModel(10, seed=42, spawn_interval=1, max_cars=fleet_size, max_pedestrians=max(5, fleet_size // 10), engine=engine)
+            for _ in range(warmup):
+                model.step()
+
+            summary = measure(lambda: [model.step() for _ in range(steps)], repeat)
+            summary["steps_per_second"] = steps / summary["median"]
+            summary["active_cars"] = model.counters.active["car"]
+            results[f"step/{engine}/fleet_{fleet_size}"] = summary
+    return results
+
+
+def bench_routing(repeat, warmup=100):
+    """Time calculate_path_to_destination of every active car and pedestrian, cold and with cached routes."""
+    model = CityModel(10, seed=42, spawn_interval=1, max_cars=100, max_pedestrians=20)
+    for _ in range(warmup):
+        model.step()
+
+    results = {}
+    for kind in ("car", "pedestrian"):
+        agents = [agent for agent in model.counters.agents(kind) if agent.destination is not None]
+
+        def cold():
+            for agent in agents:
+                model.route_cache.clear()
+                agent.calculate_path_to_destination()
+
+        def cached():
+            for agent in agents:
+                agent.calculate_path_to_destination()
+
+        for label, func in (("astar", cold), ("cached", cached)):
+            summary = measure(func, repeat)
+            summary["per_route"] = summary["median"] / max(1, len(agents))
+            summary["routes"] = len(agents)
+            results[f"routing/{kind}/{label}"] = summary
+    return results
+
+
+def bench_endpoints(repeat, warmup=100):
+    """Time every agents_server endpoint through Flask's test client."""
+    import agents_server
+    from wire import FRAME_MIMETYPE
+
+    client = agents_server.app.test_client()
+    session_id = client.post("/init", json={"NAgents": 10}).json["session"]
+    client.get(f"/update?session={session_id}&steps={warmup}")
+    roads_etag = client.get(f"/getRoads?session={session_id}").headers["ETag"]
+
+    requests = {
+        "init": lambda: client.post(f"/init?session={session_id}", json={"NAgents": 10}),
+        "update": lambda: client.get(f"/update?session={session_id}"),
+        "update_10_steps": lambda: client.get(f"/update?session={session_id}&steps=10"),
+        "state": lambda: client.get(f"/state?session={session_id}"),
+        "state_advance": lambda: client.get(f"/state?session={session_id}&advance=true"),
+        "state_binary": lambda: client.get(f"/state?session={session_id}", headers={"Accept": FRAME_MIMETYPE}),
+        "delta": lambda: client.get(f"/delta?session={session_id}&since={max(0, warmup - 1)}"),
+        "getAgents": lambda: client.get(f"/getAgents?session={session_id}"),
+        "getPedestrians": lambda: client.get(f"/getPedestrians?session={session_id}"),
+        "getTrafficLights": lambda: client.get(f"/getTrafficLights?session={session_id}"),
+        "getRoads": lambda: client.get(f"/getRoads?session={session_id}"),
+        "getRoads_not_modified": lambda: client.get(f"/getRoads?session={session_id}", headers={"If-None-Match": roads_etag}),
+        "getStaticLayers": lambda: client.get(f"/getStaticLayers?session={session_id}"),
+    }
+
+    results = {}
+    for name, request in requests.items():
+        if name == "init":
+            results[f"endpoints/{name}"] = measure(request, max(1, repeat // 10))
+            client.get(f"/update?session={session_id}&steps={warmup}")
+            roads_etag = client.get(f"/getRoads?session={session_id}").headers["ETag"]
+        else:
+            results[f"endpoints/{name}"] = measure(request, repeat)
+    return results
+
+
+def bench_scale(repeat, sizes=(64, 128, 256), warmup=100, steps=20):
+    """Time construction and stepping on generated square cities of growing size."""
+    results = {}
+    for size in sizes:
+        city = generate_city(size, size, seed=42)
+        results[f"scale/init/{size}x{size}"] = measure(lambda: CityModel(10, seed=42, map_file=city), max(1, repeat // 3))
+
+        model = CityModel(10, seed=42, spawn_interval=1, max_cars=size, max_pedestrians=max(5, size // 10), map_file=city)
+        for _ in range(warmup):
+            model.step()
+
+        summary = measure(lambda: [model.step() for _ in range(steps)], repeat)
+        summary["steps_per_second"] = steps / summary["median"]
+        summary["active_cars"] = model.counters.active["car"]
+        results[f"scale/step/{size}x{size}"] = summary
+    return results
+
+
+def run_benchmarks(groups, quick=False):
+    """Run the selected benchmark groups and get the JSON report."""
+    repeat = 3 if quick else 10
+    runners = {
+        "init": lambda: bench_init(repeat),
+        "step": lambda: bench_step(repeat, fleet_sizes=(10, 150) if quick else (10, 50, 150, 300)),
+        "routing": lambda: bench_routing(repeat),
+        "endpoints": lambda: bench_endpoints(repeat * 10),
+        "scale": lambda: bench_scale(repeat, sizes=(64, 128) if quick else (64, 128, 256)),
+    }
+
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for group in groups:
+            results.update(runners[group]())
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "numpy": np.__version__,
+            "mesa": mesa.__version__,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """Compare medians of two reports and get one row per shared benchmark.
+
+    Each row holds the benchmark name, both medians, their ratio and a
+    verdict of "regression", "improvement" or "same".
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median"]
+        after = result["median"]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold:
+            verdict = "regression"
+        elif ratio < 1 - threshold:
+            verdict = "improvement"
+        else:
+            verdict = "same"
+        rows.append({"name": name, "baseline": before, "current": after, "ratio": ratio, "verdict": verdict})
+    return rows
+
+
+def print_comparison(rows):
+    """Print a comparison table."""
+    width = max((len(row["name"]) for row in rows), default=10)
+    print(f"{'benchmark':<{width}}  {'baseline':>12}  {'current':>12}  {'ratio':>7}  verdict")
+    for row in rows:
+        print(f"{row['name']:<{width}}  {row['baseline'] * 1000:>10.3f}ms  {row['current'] * 1000:>10.3f}ms  {row['ratio']:>7.3f}  {row['verdict']}")
+
+
+def main(argv=None):
+    """Run benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the traffic model and server.")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against a JSON report written earlier")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARK_GROUPS, default=list(BENCHMARK_GROUPS))
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and fleet sizes")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.only, args.quick)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            rows = compare(json.load(baseline_file), report, args.threshold)
+        print_comparison(rows)
+        if any(row["verdict"] == "regression" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Bounded history of per-step change sets used to send delta frames."""
+from collections import deque
+
+from frames import build_state, car_positions, pedestrian_positions, traffic_light_states
+
+# Frame key -> function collecting that layer's entries
+DELTA_LAYERS = {
+    "agentpos": car_positions,
+    "Pedestrianpos": pedestrian_positions,
+    "TrafficLightpos": traffic_light_states,
+}
+
+# Fields whose change marks an entry as updated; None compares the whole entry
+# Lights count down every step, so only flips are sent and clients count down themselves
+CHANGE_FIELDS = {
+    "agentpos": None,
+    "Pedestrianpos": None,
+    "TrafficLightpos": ("state",),
+}
+
+
+def _change_key(entry, fields):
+    """Get the part of an entry that is compared between steps."""
+    if fields is None:
+        return entry
+    return tuple(entry[field] for field in fields)
+
+
+class DeltaHistory:
+    """Ring buffer of what changed in each of the last capacity recordings.
+
+    Every recording stores, per layer, the entries that were added or
+    changed and the ids that disappeared since the previous recording,
+    which may be several steps earlier. A client that last saw step N gets
+    the merged change sets of every recording that ends after N, or a full
+    frame once N fell out of the buffer. When N lies inside a recording,
+    the delta also repeats changes made up to N, which clients apply as
+    no-ops.
+    """
+
+    def __init__(self, model, step=0, capacity=256):
+        """Start a history at the model's current frame."""
+        self.model = model
+        self.step = step
+        self.changes = deque(maxlen=capacity)
+        self.last = {layer: self._collect(layer) for layer in DELTA_LAYERS}
+
+    def _collect(self, layer):
+        """Get the current entries of a layer keyed by id."""
+        return {entry["id"]: entry for entry in DELTA_LAYERS[layer](self.model)}
+
+    def record(self, step):
+        """Store the changes made by the steps taken since the last recording."""
+        change_set = {}
+        for layer, fields in CHANGE_FIELDS.items():
+            previous = self.last[layer]
+            current = self._collect(layer)
+            updated = {
+                entry_id: entry for entry_id, entry in current.items()
+                if entry_id not in previous or _change_key(previous[entry_id], fields) != _change_key(entry, fields)
+            }
+            removed = [entry_id for entry_id in previous if entry_id not in current]
+            change_set[layer] = (updated, removed)
+            self.last[layer] = current
+
+        self.changes.append((self.step, step, change_set))
+        self.step = step
+
+    def oldest(self):
+        """Get the oldest step a delta can be computed from."""
+        return self.changes[0][0] if self.changes else self.step
+
+    def delta(self, since):
+        """Get everything that changed after step since, or a full frame if it is not buffered."""
+        if since is None or since < self.oldest() or since > self.step:
+            frame = build_state(self.model, self.step)
+            frame["full"] = True
+            return frame
+
+        frame = {"step": self.step, "since": since, "full": False}
+        pending = [change_set for _, end, change_set in self.changes if end > since]
+        for layer in DELTA_LAYERS:
+            updated = {}
+            removed = set()
+            for change_set in pending:
+                layer_updated, layer_removed = change_set[layer]
+                for entry_id, entry in layer_updated.items():
+                    updated[entry_id] = entry
+                    removed.discard(entry_id)
+                for entry_id in layer_removed:
+                    updated.pop(entry_id, None)
+                    removed.add(entry_id)
+            frame[layer] = {"updated": list(updated.values()), "removed": sorted(removed)}
+
+        frame["stats"] = self.model.counters.stats()
+        return frame
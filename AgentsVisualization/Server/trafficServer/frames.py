@@ -0,0 +1,36 @@
+"""Per-frame snapshots of the dynamic agents served to the visualization."""
+
+
+def car_positions(model):
+    """Positions and orientations of active cars."""
+    return [
+        {"id": str(car.unique_id), "x": car.cell.coordinate[0], "y": 1, "z": car.cell.coordinate[1], "orientation": car.orientation}
+        for car in model.counters.agents("car")
+    ]
+
+
+def pedestrian_positions(model):
+    """Positions and orientations of active pedestrians."""
+    return [
+        {"id": str(pedestrian.unique_id), "x": pedestrian.cell.coordinate[0], "y": 1, "z": pedestrian.cell.coordinate[1], "orientation": pedestrian.orientation}
+        for pedestrian in model.counters.agents("pedestrian")
+    ]
+
+
+def traffic_light_states(model):
+    """Positions, states and remaining time of every traffic light."""
+    return [
+        {"id": str(light.unique_id), "x": light.cell.coordinate[0], "y": 1, "z": light.cell.coordinate[1], "state": light.state, "time_remaining": light.time_remaining}
+        for light in model.traffic_lights
+    ]
+
+
+def build_state(model, step):
+    """Cars, pedestrians, light states and stats of one step, using the same keys as the get* endpoints."""
+    return {
+        "step": step,
+        "agentpos": car_positions(model),
+        "Pedestrianpos": pedestrian_positions(model),
+        "TrafficLightpos": traffic_light_states(model),
+        "stats": model.counters.stats(),
+    }
@@ -0,0 +1,170 @@
+"""Session-scoped simulations so that several viewers can share one server."""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from simulation import Simulation
+from streaming import FrameChannel, SimulationTicker
+
+
+class Session:
+    """One viewer's simulation, run in the request thread.
+
+    Everything goes through run, which calls a Simulation method under
+    lock. The lock is reentrant so that callers can group several calls
+    into one consistent critical section.
+    """
+
+    def __init__(self, session_id, model_params):
+        """Create a session around a freshly built model."""
+        self.id = session_id
+        self.model_params = model_params
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+        self.channel = FrameChannel()
+        self.ticker = SimulationTicker(self.tick_frame, self.channel)
+        self.static_layers = {}
+        self._open(model_params)
+
+    def _open(self, model_params):
+        """Build the simulation."""
+        self.simulation = Simulation(model_params)
+
+    def _execute(self, method, args, kwargs):
+        """Call a Simulation method."""
+        return getattr(self.simulation, method)(*args, **kwargs)
+
+    def run(self, method, *args, **kwargs):
+        """Call a Simulation method under the session lock."""
+        with self.lock:
+            return self._execute(method, args, kwargs)
+
+    def reset(self, model_params):
+        """Replace the model, restarting step count and per-model caches."""
+        with self.lock:
+            self.run("reset", model_params)
+            self.model_params = model_params
+            self.static_layers = {}
+
+    def static_layer(self, name):
+        """Get the JSON body and ETag of a static layer, fetching it once per model."""
+        with self.lock:
+            if name not in self.static_layers:
+                self.static_layers[name] = self.run("static_layer", name)
+            return self.static_layers[name]
+
+    def tick_frame(self):
+        """Advance the model for the streaming ticker and get the new frame."""
+        return self.run("tick")
+
+    def touch(self):
+        """Mark the session as used now."""
+        self.last_used = time.monotonic()
+
+    def close(self):
+        """Stop the session's ticker, ending its open streams."""
+        self.ticker.stop()
+
+
+class RemoteSession(Session):
+    """A session whose simulation lives in a worker process of a WorkerPool."""
+
+    def __init__(self, session_id, model_params, pool):
+        """Place the session on a worker and build its model there."""
+        self.pool = pool
+        self.worker = pool.assign(session_id)
+        super().__init__(session_id, model_params)
+
+    def _open(self, model_params):
+        """Build the simulation in the worker."""
+        try:
+            self.worker.call(self.id, "open", model_params)
+        except Exception:
+            self.pool.release(self.worker, self.id)
+            raise
+
+    def _execute(self, method, args, kwargs):
+        """Forward a Simulation method call to the worker."""
+        return self.worker.call(self.id, method, *args, **kwargs)
+
+    def close(self):
+        """Stop the ticker and drop the simulation from its worker."""
+        super().close()
+        try:
+            self.worker.call(self.id, "close")
+        finally:
+            self.pool.release(self.worker, self.id)
+
+
+class SessionStore:
+    """Bounded set of sessions evicted by idle time and least recent use.
+
+    Sessions idle for longer than idle_timeout seconds are dropped whenever
+    a session is created or looked up. When max_sessions are live, creating
+    one more evicts the least recently used session. With a worker pool,
+    new sessions are RemoteSessions hosted by the pool's processes.
+    """
+
+    def __init__(self, max_sessions=16, idle_timeout=600.0, pool=None):
+        """Initialize an empty store."""
+        self.pool = pool
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        """Get the number of live sessions."""
+        return len(self.sessions)
+
+    def all(self):
+        """Get every live session without marking them used."""
+        with self.lock:
+            return list(self.sessions.values())
+
+    def create(self, model_params):
+        """Build a model from CityModel keyword arguments in a new session and return the session."""
+        session_id = uuid.uuid4().hex
+        if self.pool is None:
+            session = Session(session_id, model_params)
+        else:
+            session = RemoteSession(session_id, model_params, self.pool)
+        with self.lock:
+            evicted = self._expired()
+            while len(self.sessions) >= self.max_sessions:
+                evicted.append(self.sessions.popitem(last=False)[1])
+            self.sessions[session.id] = session
+        self._close(evicted)
+        return session
+
+    def get(self, session_id):
+        """Get a live session and mark it used, or None if it does not exist or expired."""
+        with self.lock:
+            evicted = self._expired()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                session.touch()
+        self._close(evicted)
+        return session
+
+    def remove(self, session_id):
+        """Drop a session, returning whether it existed."""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        self._close([session] if session is not None else [])
+        return session is not None
+
+    def _expired(self):
+        """Pop sessions idle for longer than idle_timeout; the store lock must be held."""
+        deadline = time.monotonic() - self.idle_timeout
+        expired = [session for session in self.sessions.values() if session.last_used < deadline]
+        for session in expired:
+            del self.sessions[session.id]
+        return expired
+
+    def _close(self, sessions):
+        """Close evicted sessions outside the store lock."""
+        for session in sessions:
+            session.close()
@@ -0,0 +1,136 @@
+"""Everything the server serves about one model, reachable through plain method calls.
+
+Sessions only talk to a model through the methods of Simulation, with
+arguments and results that can be pickled, so the same object works in
+the request thread and inside a worker process.
+"""
+from trafficAgents.traffic_base.model import CityModel
+
+from deltas import DeltaHistory
+from frames import build_state, car_positions, pedestrian_positions, traffic_light_states
+from static_layers import StaticLayers
+from wire import encode_frame
+
+# Named stop conditions for advance_many, checked after every step
+UNTIL_CONDITIONS = {
+    "all_cars_arrived": lambda stats: stats["total_cars"] > 0 and stats["active_cars"] == 0,
+    "all_pedestrians_arrived": lambda stats: stats["total_pedestrians"] > 0 and stats["active_pedestrians"] == 0,
+    "no_agents": lambda stats: stats["active_cars"] == 0 and stats["active_pedestrians"] == 0,
+}
+
+
+def parse_until(until):
+    """Get the stop condition named by until: a key of UNTIL_CONDITIONS or step:N."""
+    if until is None:
+        return None
+    if until in UNTIL_CONDITIONS:
+        condition = UNTIL_CONDITIONS[until]
+        return lambda step, stats: condition(stats)
+    name, _, limit = until.partition(":")
+    if name == "step" and limit.isdigit():
+        return lambda step, stats: step >= int(limit)
+    raise ValueError(f"Unknown until condition {until!r}, expected one of {sorted(UNTIL_CONDITIONS)} or step:N")
+
+
+class Simulation:
+    """A CityModel with its step count, delta history and static layers.
+
+    The delta history only starts with the first delta request, so models
+    nobody asks deltas of do not collect change sets.
+    """
+
+    def __init__(self, model_params):
+        """Build the model from CityModel keyword arguments."""
+        self.reset(model_params)
+
+    def reset(self, model_params):
+        """Replace the model, restarting step count and per-model caches."""
+        self.model = CityModel(**model_params)
+        self.step = 0
+        self.delta_history = None
+        self._static_layers = None
+
+    def _step_model(self):
+        """Step the model once, without recording changes, and get the new step and stats."""
+        self.model.step()
+        self.step += 1
+        return {"step": self.step, "stats": self.model.counters.stats()}
+
+    def _record_changes(self):
+        """Record changes since the last recording, once a client has asked for deltas."""
+        if self.delta_history is not None and self.delta_history.step != self.step:
+            self.delta_history.record(self.step)
+
+    def advance(self):
+        """Step the model once and get the new step and stats."""
+        update = self._step_model()
+        self._record_changes()
+        return update
+
+    def advance_many(self, steps, until=None, per_step=False):
+        """Step the model up to steps times, stopping early once until holds.
+
+        Returns the final step and stats, the number of steps taken, why
+        stepping stopped and, with per_step, the step and stats of every
+        step taken. Changes are recorded once for all the steps taken.
+        """
+        condition = parse_until(until)
+        start_step = self.step
+        update = {"step": self.step, "stats": self.model.counters.stats()}
+        history = []
+        while self.step - start_step < steps:
+            if condition is not None and condition(update["step"], update["stats"]):
+                break
+            update = self._step_model()
+            if per_step:
+                history.append(update)
+        self._record_changes()
+
+        result = dict(update, steps_taken=self.step - start_step)
+        result["stopped"] = "until" if condition is not None and condition(update["step"], update["stats"]) else "steps"
+        if per_step:
+            result["per_step"] = history
+        return result
+
+    def tick(self):
+        """Step the model once and get the new frame."""
+        self.advance()
+        return self.state()
+
+    def cars(self):
+        """Get active car positions."""
+        return car_positions(self.model)
+
+    def pedestrians(self):
+        """Get active pedestrian positions."""
+        return pedestrian_positions(self.model)
+
+    def lights(self):
+        """Get traffic light states."""
+        return traffic_light_states(self.model)
+
+    def state(self):
+        """Get the full frame of the current step."""
+        return build_state(self.model, self.step)
+
+    def binary(self, **layers):
+        """Get the current frame as packed arrays."""
+        return encode_frame(self.model, self.step, **layers)
+
+    def delta(self, since):
+        """Get what changed after step since, tracking changes from the first call on."""
+        if self.delta_history is None:
+            self.delta_history = DeltaHistory(self.model, self.step)
+        return self.delta_history.delta(since)
+
+    def metrics(self):
+        """Get the model's metric samples, or none when it was built without metrics."""
+        if self.model.metrics is None:
+            return []
+        return self.model.metrics.samples()
+
+    def static_layer(self, name):
+        """Get the JSON body and ETag of a static layer."""
+        if self._static_layers is None:
+            self._static_layers = StaticLayers(self.model)
+        return self._static_layers.bodies[name], self._static_layers.etags[name]
@@ -0,0 +1,47 @@
+"""Static map layers serialized once per model and served with strong ETags."""
+import hashlib
+import json
+
+from trafficAgents.traffic_base.agent import Road, Obstacle, Destination, Sidewalk, PedestrianWalk
+
+# Endpoint name -> (response key, agent class) of every static layer
+STATIC_LAYERS = {
+    "getRoads": ("Roadpos", Road),
+    "getObstacles": ("obstaclepos", Obstacle),
+    "getSidewalks": ("Sidewalkpos", Sidewalk),
+    "getPedestrianWalks": ("PedestrianWalkpos", PedestrianWalk),
+    "getDestinations": ("Destinationpos", Destination),
+}
+
+# Endpoint name of the payload that combines every static layer
+COMBINED_LAYERS = "getStaticLayers"
+
+
+class StaticLayers:
+    """JSON bodies and ETags of the static layers of one model.
+
+    Tiles never change after CityModel.__init__, so every layer is
+    collected in a single pass over the grid and encoded once.
+    """
+
+    def __init__(self, model):
+        """Collect and serialize every static layer of a model."""
+        self.model = model
+
+        positions = {key: [] for key, _ in STATIC_LAYERS.values()}
+        for cell in model.grid.all_cells:
+            x, z = cell.coordinate
+            for agent in cell.agents:
+                for key, agent_class in STATIC_LAYERS.values():
+                    if isinstance(agent, agent_class):
+                        positions[key].append({"id": str(agent.unique_id), "x": x, "y": 1, "z": z})
+
+        payloads = {name: {key: positions[key]} for name, (key, _) in STATIC_LAYERS.items()}
+        payloads[COMBINED_LAYERS] = positions
+
+        self.bodies = {}
+        self.etags = {}
+        for name, payload in payloads.items():
+            body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            self.bodies[name] = body
+            self.etags[name] = hashlib.sha256(body).hexdigest()
@@ -0,0 +1,118 @@
+"""Server-side simulation ticker that pushes frames to Server-Sent Events clients."""
+import json
+import threading
+import time
+
+
+class FrameChannel:
+    """Mailbox holding only the latest encoded frame.
+
+    Subscribers remember the sequence number of the last frame they sent
+    and always wake up to the newest one, so a slow consumer skips the
+    frames published while it was busy instead of queueing them.
+    """
+
+    def __init__(self):
+        """Initialize an empty channel."""
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.frame = None
+        self.closed = False
+
+    def publish(self, frame):
+        """Replace the latest frame and wake every subscriber."""
+        body = json.dumps(frame, separators=(",", ":"))
+        with self.condition:
+            self.frame = body
+            self.sequence += 1
+            self.closed = False
+            self.condition.notify_all()
+
+    def close(self):
+        """Wake every subscriber and tell it the stream ended."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait(self, last_sequence, timeout):
+        """Wait for a frame newer than last_sequence.
+
+        Returns the sequence and body of the latest frame, with a body of
+        None on timeout and a sequence of None once the channel is closed.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != last_sequence or self.closed, timeout)
+            if self.sequence != last_sequence:
+                return self.sequence, self.frame
+            if self.closed:
+                return None, None
+            return last_sequence, None
+
+    def events(self, keepalive=15.0):
+        """Yield Server-Sent Events for every frame a subscriber gets to see."""
+        last_sequence = self.sequence
+        while True:
+            sequence, body = self.wait(last_sequence, keepalive)
+            if sequence is None:
+                yield "event: end\ndata: {}\n\n"
+                return
+            if body is None:
+                yield ": keepalive\n\n"
+                continue
+            dropped = sequence - last_sequence - 1
+            last_sequence = sequence
+            yield f"id: {sequence}\nevent: frame\ndata: {body}\n\n"
+            if dropped:
+                yield f"event: dropped\ndata: {dropped}\n\n"
+
+
+class SimulationTicker:
+    """Background thread that advances the simulation at a fixed rate.
+
+    advance is called once per tick and returns the frame to publish, or
+    None when there is nothing to publish yet. Ticks that run late are not
+    made up for, so a slow step lowers the frame rate instead of bursting.
+    """
+
+    def __init__(self, advance, channel, rate=10.0):
+        """Create a stopped ticker publishing to channel rate times per second."""
+        self.advance = advance
+        self.channel = channel
+        self.rate = rate
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def running(self):
+        """Check whether the ticker thread is alive."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, rate=None):
+        """Start ticking, or change the rate of a running ticker."""
+        if rate is not None:
+            if rate <= 0:
+                raise ValueError(f"Tick rate must be positive, got {rate}")
+            self.rate = rate
+        if self.running():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="simulation-ticker", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop ticking and end every open stream."""
+        self.stopping.set()
+        if self.running() and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        self.channel.close()
+
+    def _run(self):
+        """Advance and publish until stopped."""
+        next_tick = time.monotonic()
+        while not self.stopping.is_set():
+            frame = self.advance()
+            if frame is not None:
+                self.channel.publish(frame)
+
+            next_tick = max(next_tick + 1.0 / self.rate, time.monotonic())
+            self.stopping.wait(next_tick - time.monotonic())
@@ -0,0 +1,178 @@
+"""Headless parameter sweeps over CityModel, run across a process pool.
+
+Every combination of the swept values is one run. Runs execute in
+worker processes without Flask or Solara and their metrics are written
+as tables through pandas: one row per run, and optionally one row per
+sampled step. The output format follows the file suffix (.csv or
+.parquet, which needs pyarrow or fastparquet).
+
+Example, from this directory:
+
+    python sweep.py --seed 1 2 3 --spawn-interval 5 10 --max-cars 10 40 \\
+        --light-timing S=15,s=7 S=20,s=10 --steps 1000 \\
+        --output runs.csv --step-output steps.parquet
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from trafficAgents.traffic_base.model import CityModel
+
+# Swept CityModel parameters and their defaults when not given
+SWEEP_DEFAULTS = {
+    "seed": [42],
+    "spawn_interval": [10],
+    "max_cars": [10],
+    "max_pedestrians": [5],
+    "map_file": ["2024_modified.txt"],
+    "light_timings": [None],
+}
+
+
+def expand_grid(spec):
+    """Get the parameters of every run: the cartesian product of the swept values."""
+    values = dict(SWEEP_DEFAULTS, **spec)
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def format_light_timings(light_timings):
+    """Get a table-friendly representation of a light timing override."""
+    if not light_timings:
+        return ""
+    return ",".join(f"{group}={period}" for group, period in sorted(light_timings.items()))
+
+
+def run_one(run_id, params, steps, initial_agents_count=10, every=1):
+    """Run one model for steps steps and get its run row and sampled step rows.
+
+    Idle stretches with no agents and no spawn due are skipped with
+    CityModel.skip_idle; their stats are constant, so rows stay the same.
+    """
+    model = CityModel(initial_agents_count, **params)
+    step_rows = []
+    active_cars_total = 0
+    active_pedestrians_total = 0
+    idle_steps_skipped = 0
+
+    started = time.perf_counter()
+    step = 0
+    while step < steps:
+        advanced = model.skip_idle(steps - step)
+        idle_steps_skipped += advanced
+        if not advanced:
+            model.step()
+            advanced = 1
+
+        stats = model.counters.stats()
+        active_cars_total += stats["active_cars"] * advanced
+        active_pedestrians_total += stats["active_pedestrians"] * advanced
+        if every:
+            for sampled_step in range(step + every - step % every, step + advanced + 1, every):
+                step_rows.append({"run_id": run_id, "step": sampled_step, **stats})
+        step += advanced
+    elapsed = time.perf_counter() - started
+
+    run_row = {
+        "run_id": run_id,
+        **params,
+        "light_timings": format_light_timings(params["light_timings"]),
+        "steps": steps,
+        "idle_steps_skipped": idle_steps_skipped,
+        "wall_time": elapsed,
+        "steps_per_second": steps / elapsed if elapsed else float("inf"),
+        "mean_active_cars": active_cars_total / steps if steps else 0.0,
+        "mean_active_pedestrians": active_pedestrians_total / steps if steps else 0.0,
+        **model.counters.stats(),
+    }
+    return run_row, step_rows
+
+
+def _run_star(arguments):
+    """Unpack run_one arguments for Executor.map."""
+    return run_one(*arguments)
+
+
+def sweep(spec, steps, initial_agents_count=10, processes=None, every=1):
+    """Run every combination of spec and get the run and step tables as DataFrames.
+
+    every samples one step row every that many steps; 0 skips step rows.
+    """
+    jobs = [(run_id, params, steps, initial_agents_count, every) for run_id, params in enumerate(expand_grid(spec))]
+
+    if processes == 1:
+        return _tables(map(_run_star, jobs))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return _tables(executor.map(_run_star, jobs))
+
+
+def _tables(results):
+    """Collect run results into run and step DataFrames."""
+    run_rows = []
+    step_rows = []
+    for run_row, run_step_rows in results:
+        run_rows.append(run_row)
+        step_rows.extend(run_step_rows)
+    return pd.DataFrame(run_rows), pd.DataFrame(step_rows)
+
+
+def write_table(frame, path):
+    """Write a DataFrame as CSV or Parquet, chosen by the file suffix."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".parquet":
+        frame.to_parquet(path, index=False)
+    elif suffix == ".csv":
+        frame.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format {suffix!r}, use .csv or .parquet")
+
+
+def parse_light_timing(text):
+    """Parse a GROUP=PERIOD[,GROUP=PERIOD...] light timing override."""
+    light_timings = {}
+    for item in text.split(","):
+        group, _, period = item.partition("=")
+        if not group or not period.isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid light timing {item!r}, expected GROUP=PERIOD")
+        light_timings[group] = int(period)
+    return light_timings
+
+
+def main(argv=None):
+    """Run a sweep from the command line."""
+    parser = argparse.ArgumentParser(description="Run CityModel parameter sweeps headlessly.")
+    parser.add_argument("--seed", type=int, nargs="+")
+    parser.add_argument("--spawn-interval", type=int, nargs="+")
+    parser.add_argument("--max-cars", type=int, nargs="+")
+    parser.add_argument("--max-pedestrians", type=int, nargs="+")
+    parser.add_argument("--map", dest="map_file", nargs="+", help="map paths or file names in city_files")
+    parser.add_argument("--light-timing", dest="light_timings", type=parse_light_timing, nargs="+", help="light periods per group, e.g. S=15,s=7")
+    parser.add_argument("--agents", type=int, default=10, help="initial_agents_count of every run")
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--every", type=int, default=1, help="keep one step row every N steps, 0 for none")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--output", required=True, help="per-run table, .csv or .parquet")
+    parser.add_argument("--step-output", help="per-step table, .csv or .parquet")
+    args = parser.parse_args(argv)
+
+    spec = {
+        name: getattr(args, name)
+        for name in SWEEP_DEFAULTS
+        if getattr(args, name) is not None
+    }
+    every = args.every if args.step_output else 0
+
+    started = time.perf_counter()
+    runs, steps = sweep(spec, args.steps, args.agents, args.processes, every)
+    write_table(runs, args.output)
+    if args.step_output:
+        write_table(steps, args.step_output)
+    print(f"{len(runs)} runs of {args.steps} steps in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the server modules and trafficAgents the way agents_server.py does, from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trafficAgents.traffic_base.agent import Car, Pedestrian
+from trafficAgents.traffic_base.model import CityModel
+
+
+@pytest.fixture
+def trajectory():
+    """Get a function that runs a busy model and returns every step's agent and light snapshot."""
+    def run(steps=200, **kwargs):
+        model = CityModel(5, seed=42, spawn_interval=2, max_cars=40, max_pedestrians=15, **kwargs)
+        snapshots = []
+        for _ in range(steps):
+            model.step()
+            agents = sorted(
+                (agent.unique_id, agent.cell.coordinate, agent.orientation, agent.waiting_time, agent.navigating_state.value)
+                for agent in model.agents
+                if isinstance(agent, (Car, Pedestrian))
+            )
+            lights = [(light.unique_id, light.state, light.time_remaining) for light in model.traffic_lights]
+            snapshots.append((agents, lights))
+        return snapshots
+    return run
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Get a test client of the server with its own session store."""
+    import agents_server
+    from sessions import SessionStore
+
+    monkeypatch.setattr(agents_server, "sessions", SessionStore(agents_server.MAX_SESSIONS, agents_server.SESSION_IDLE_TIMEOUT))
+    return agents_server.app.test_client()
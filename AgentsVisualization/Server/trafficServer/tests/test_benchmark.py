@@ -0,0 +1,30 @@
+import json
+
+import benchmark
+
+
+def report(**medians):
+    """Get a benchmark report with the given medians."""
+    return {"meta": {}, "results": {name: {"median": median} for name, median in medians.items()}}
+
+
+def test_comparison_flags_slowdowns_beyond_the_threshold():
+    rows = benchmark.compare(report(a=1.0, b=1.0, c=1.0, gone=1.0), report(a=1.2, b=0.8, c=1.05, new=1.0))
+
+    assert [(row["name"], row["verdict"]) for row in rows] == [("a", "regression"), ("b", "improvement"), ("c", "same")]
+
+
+def test_main_fails_on_regressions(tmp_path, monkeypatch):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report(step=1.0)))
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda groups, quick: report(step=2.0))
+
+    assert benchmark.main(["--baseline", str(baseline), "--output", str(tmp_path / "current.json")]) == 1
+    assert benchmark.main(["--baseline", str(tmp_path / "current.json")]) == 0
+
+
+def test_benchmarked_models_are_reproducible():
+    first = benchmark.bench_scale(1, sizes=(40,), warmup=20, steps=2)
+    second = benchmark.bench_scale(1, sizes=(40,), warmup=20, steps=2)
+
+    assert first["scale/step/40x40"]["active_cars"] == second["scale/step/40x40"]["active_cars"] > 0
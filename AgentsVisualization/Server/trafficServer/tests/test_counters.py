@@ -0,0 +1,21 @@
+from trafficAgents.traffic_base.agent import Car, MainState, Pedestrian
+from trafficAgents.traffic_base.model import CityModel
+
+
+def test_counters_match_sums_over_the_agents():
+    model = CityModel(5, seed=42, spawn_interval=2, max_cars=40, max_pedestrians=15)
+    seen = {"car": set(), "pedestrian": set()}
+    for _ in range(200):
+        model.step()
+        for kind, agent_class in (("car", Car), ("pedestrian", Pedestrian)):
+            agents = [agent for agent in model.agents if isinstance(agent, agent_class)]
+            active = [agent for agent in agents if agent.main_state == MainState.ACTIVE]
+            seen[kind].update(agent.unique_id for agent in agents)
+
+            assert model.counters.agents(kind) == active
+            assert model.counters.active[kind] == len(active)
+            assert model.counters.total[kind] == len(seen[kind])
+            assert model.counters.arrived[kind] == len(seen[kind]) - len(active)
+
+    stats = model.counters.stats()
+    assert stats["arrived_cars"] > 0 and stats["arrived_pedestrians"] > 0
@@ -0,0 +1,69 @@
+from deltas import DELTA_LAYERS
+from simulation import Simulation
+
+MODEL_PARAMS = {"initial_agents_count": 5, "seed": 42, "spawn_interval": 2, "max_cars": 40, "max_pedestrians": 15}
+
+
+def client_view(frame):
+    """Get what a client shows for a full frame, keyed by layer and id."""
+    return {layer: {entry["id"]: entry for entry in frame[layer]} for layer in DELTA_LAYERS}
+
+
+def apply_delta(view, frame):
+    """Apply a delta frame to a client view."""
+    if frame["full"]:
+        return client_view(frame)
+    view = {layer: dict(entries) for layer, entries in view.items()}
+    for layer in DELTA_LAYERS:
+        for entry in frame[layer]["updated"]:
+            view[layer][entry["id"]] = entry
+        for entry_id in frame[layer]["removed"]:
+            view[layer].pop(entry_id, None)
+    return view
+
+
+def comparable(view):
+    """Drop light countdowns, which deltas leave to clients."""
+    return {
+        layer: {entry_id: {key: value for key, value in entry.items() if key != "time_remaining"} for entry_id, entry in entries.items()}
+        for layer, entries in view.items()
+    }
+
+
+def test_changes_are_not_recorded_without_delta_requests():
+    simulation = Simulation(MODEL_PARAMS)
+    simulation.advance()
+    simulation.advance_many(5)
+
+    assert simulation.delta_history is None
+    assert simulation.delta(None)["full"]
+
+
+def test_deltas_from_any_buffered_step_rebuild_the_current_frame():
+    simulation = Simulation(MODEL_PARAMS)
+    stepwise = Simulation(MODEL_PARAMS)
+    views = [client_view(stepwise.state())]
+
+    assert simulation.delta(0)["full"] is False
+    for steps in (1, 5, 1, 10, 3):
+        if steps == 1:
+            simulation.advance()
+        else:
+            simulation.advance_many(steps)
+        for _ in range(steps):
+            stepwise.advance()
+            views.append(client_view(stepwise.state()))
+
+        current = comparable(client_view(simulation.state()))
+        for since, view in enumerate(views):
+            assert comparable(apply_delta(view, simulation.delta(since))) == current
+
+
+def test_steps_before_the_first_delta_request_get_a_full_frame():
+    simulation = Simulation(MODEL_PARAMS)
+    simulation.advance_many(4)
+
+    assert simulation.delta(2)["full"]
+    simulation.advance()
+    assert simulation.delta(4)["full"] is False
+    assert simulation.delta(3)["full"]
@@ -0,0 +1,80 @@
+import heapq
+import random
+
+from trafficAgents.traffic_base.dstar_lite import DStarLite
+from trafficAgents.traffic_base.graph import astar
+from trafficAgents.traffic_base.model import CityModel
+
+
+def dijkstra_cost(graph, start_id, goal_id, cell_costs):
+    """Get the cheapest cost from start to goal when entering a cell costs 1 plus its extra cost."""
+    costs = {start_id: 0}
+    frontier = [(0, start_id)]
+    while frontier:
+        cost, cell_id = heapq.heappop(frontier)
+        if cell_id == goal_id:
+            return cost
+        if cost > costs[cell_id]:
+            continue
+        for neighbor_id in graph.neighbors(cell_id):
+            neighbor_cost = cost + 1 + cell_costs.get(neighbor_id, 0)
+            if neighbor_cost < costs.get(neighbor_id, float("inf")):
+                costs[neighbor_id] = neighbor_cost
+                heapq.heappush(frontier, (neighbor_cost, neighbor_id))
+    return None
+
+
+def path_cost(planner, start_id, path):
+    """Sum the edge costs of a path, checking that it follows graph edges."""
+    cost = 0
+    for source_id, target_id in zip([start_id] + path, path):
+        assert target_id in planner.graph.neighbors(source_id)
+        cost += planner.edge_cost(source_id, target_id)
+    return cost
+
+
+def test_plans_match_astar_without_extra_costs():
+    graph = CityModel(0).road_graph
+    roads = [cell_id for cell_id in range(graph.size) if graph.neighbors(cell_id)]
+    rng = random.Random(3)
+    for _ in range(20):
+        start_id, goal_id = rng.sample(roads, 2)
+        planner = DStarLite(graph, goal_id)
+        path = planner.plan(start_id)
+        expected = astar(graph, start_id, goal_id)
+
+        assert (path is None) == (expected is None)
+        if path is not None:
+            assert path_cost(planner, start_id, path) == len(expected)
+
+
+def test_repaired_plans_match_dijkstra_as_costs_change_and_the_start_moves():
+    graph = CityModel(0).road_graph
+    roads = [cell_id for cell_id in range(graph.size) if graph.neighbors(cell_id)]
+    rng = random.Random(4)
+    for _ in range(5):
+        start_id, goal_id = rng.sample(roads, 2)
+        planner = DStarLite(graph, goal_id)
+        path = planner.plan(start_id)
+        while path:
+            for cell_id in rng.sample(roads, 15):
+                planner.set_cell_cost(cell_id, rng.choice([0, 0, 3, 10]))
+
+            start_id = path[0]
+            path = planner.plan(start_id)
+            expected = dijkstra_cost(graph, start_id, goal_id, planner.cell_costs)
+            if expected is None:
+                assert path is None
+            else:
+                assert path_cost(planner, start_id, path) == expected
+
+
+def test_incremental_replanning_runs_are_reproducible(trajectory, monkeypatch):
+    plans = []
+    plan = DStarLite.plan
+    monkeypatch.setattr(DStarLite, "plan", lambda planner, start_id: plans.append(start_id) or plan(planner, start_id))
+
+    run = trajectory(replanning="incremental")
+
+    assert plans
+    assert run == trajectory(replanning="incremental")
@@ -0,0 +1,27 @@
+from trafficAgents.traffic_base.events import EventQueue
+
+
+def test_events_fire_in_time_then_scheduling_order():
+    events = EventQueue()
+    fired = []
+    events.subscribe("tick", lambda payload: fired.append((events.now, payload)))
+    for time, payload in [(3, "c"), (1, "a"), (3, "d"), (2, "b"), (5, "e")]:
+        events.schedule(time, "tick", payload)
+
+    assert events.run_until(3) == 4
+    assert fired == [(1, "a"), (2, "b"), (3, "c"), (3, "d")]
+    assert events.now == 3
+    assert events.next_time() == 5
+    assert len(events) == 1
+
+
+def test_publish_notifies_subscribers_without_scheduling():
+    events = EventQueue()
+    received = []
+    events.subscribe("changed", received.append)
+    events.subscribe("changed", lambda payload: received.append(payload * 2))
+
+    events.publish("changed", 2)
+
+    assert received == [2, 4]
+    assert len(events) == 0
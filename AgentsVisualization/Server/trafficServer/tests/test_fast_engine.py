@@ -0,0 +1,14 @@
+import pytest
+
+from trafficAgents.traffic_base.model import CityModel
+
+
+def test_fast_engine_matches_agent_engine(trajectory):
+    assert trajectory(engine="fast") == trajectory(engine="agents")
+
+
+def test_fast_engine_falls_back_to_restart_replanning():
+    with pytest.warns(UserWarning, match="restart replanning"):
+        model = CityModel(5, engine="fast", replanning="incremental")
+
+    assert model.replanning == "restart"
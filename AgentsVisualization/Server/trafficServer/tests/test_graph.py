@@ -0,0 +1,95 @@
+from collections import deque
+import random
+
+import pytest
+
+from trafficAgents.traffic_base.graph import DIRECTION_OFFSETS, OPPOSING_DIRECTION, astar
+from trafficAgents.traffic_base.model import CityModel
+
+MAP_FILES = ["2021_base.txt", "2022_base.txt", "2023_base.txt", "2024_base.txt", "2024_modified.txt"]
+
+
+def scanned_road_neighbors(model, coordinate):
+    """Get road neighbours the way cars scanned them per cell before graphs were compiled."""
+    neighbors = []
+    for movement_direction, (dx, dy) in DIRECTION_OFFSETS:
+        next_road = model.tiles.road_at((coordinate[0] + dx, coordinate[1] + dy))
+        if next_road is not None and next_road.direction != OPPOSING_DIRECTION[movement_direction]:
+            neighbors.append(next_road.cell.coordinate)
+    return neighbors
+
+
+def scanned_walk_neighbors(model, coordinate, walkable):
+    """Get walkable neighbours the way pedestrians scanned them per cell."""
+    return [
+        (coordinate[0] + dx, coordinate[1] + dy)
+        for _, (dx, dy) in DIRECTION_OFFSETS
+        if (coordinate[0] + dx, coordinate[1] + dy) in walkable
+    ]
+
+
+def bfs_distances(graph, start_id):
+    """Get hop distances from a cell to every reachable cell."""
+    distances = {start_id: 0}
+    frontier = deque([start_id])
+    while frontier:
+        cell_id = frontier.popleft()
+        for neighbor_id in graph.neighbors(cell_id):
+            if neighbor_id not in distances:
+                distances[neighbor_id] = distances[cell_id] + 1
+                frontier.append(neighbor_id)
+    return distances
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_compiled_graphs_match_per_cell_scans(map_file):
+    model = CityModel(0, map_file=map_file)
+    tiles = model.tiles
+    road_graph, walk_graph = model.road_graph, model.walk_graph
+
+    for coordinate in tiles.roads:
+        compiled = [road_graph.coordinate(cell_id) for cell_id in road_graph.neighbors(road_graph.cell_id(coordinate))]
+        assert compiled == scanned_road_neighbors(model, coordinate)
+
+    walkable = set(tiles.sidewalks) | set(tiles.pedestrian_walks) | {light.cell.coordinate for light in tiles.traffic_lights}
+    for coordinate in walkable:
+        compiled = [walk_graph.coordinate(cell_id) for cell_id in walk_graph.neighbors(walk_graph.cell_id(coordinate))]
+        assert compiled == scanned_walk_neighbors(model, coordinate, walkable)
+
+
+def test_astar_finds_shortest_valid_paths():
+    model = CityModel(0)
+    rng = random.Random(1)
+    for graph, cells in ((model.road_graph, list(model.tiles.roads)), (model.walk_graph, list(model.tiles.sidewalks))):
+        for _ in range(40):
+            start_id, goal_id = (graph.cell_id(coordinate) for coordinate in rng.sample(cells, 2))
+            distance = bfs_distances(graph, start_id).get(goal_id)
+            path = astar(graph, start_id, goal_id)
+
+            if distance is None:
+                assert path is None
+                continue
+            assert len(path) == distance
+            for source_id, target_id in zip([start_id] + path, path):
+                assert target_id in graph.neighbors(source_id)
+
+
+def test_distance_fields_match_astar():
+    model = CityModel(0, routing="field")
+    graph = model.road_graph
+    starts = list(model.tiles.roads)
+    rng = random.Random(2)
+
+    assert graph.distance_fields
+    for goal_id, field in graph.distance_fields.items():
+        for coordinate in rng.sample(starts, 25):
+            start_id = graph.cell_id(coordinate)
+            path = field.path_from(start_id)
+            expected = astar(graph, start_id, goal_id)
+
+            if expected is None:
+                assert path is None and field.distance[start_id] == -1
+                continue
+            assert len(path) == len(expected) == field.distance[start_id]
+            for source_id, target_id in zip([start_id] + path, path):
+                assert target_id in graph.neighbors(source_id)
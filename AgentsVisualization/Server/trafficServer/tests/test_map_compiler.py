@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import os
+
+import numpy as np
+import pytest
+
+from trafficAgents.traffic_base import map_compiler
+from trafficAgents.traffic_base.map_compiler import ARRAY_NAMES, CITY_FILES_DIR, DEFAULT_CACHE_DIR, MAX_COMPILED_MAPS, TILE_KINDS, load_map, load_map_text
+from trafficAgents.traffic_base.map_generator import generate_city
+
+MAP_PATH = os.path.join(CITY_FILES_DIR, "2024_modified.txt")
+
+
+@pytest.fixture(autouse=True)
+def empty_memory_cache(monkeypatch):
+    """Give every test its own in-memory compiled map cache."""
+    monkeypatch.setattr(map_compiler, "_compiled_maps", OrderedDict())
+
+
+def test_tiles_follow_the_map_text():
+    with open(MAP_PATH) as map_file:
+        lines = map_file.read().splitlines()
+
+    expected = [
+        (column, len(lines) - row - 1, TILE_KINDS[character])
+        for row, line in enumerate(lines)
+        for column, character in enumerate(line)
+        if character in TILE_KINDS
+    ]
+    tiles = [(x, y, kind) for x, y, kind, *_ in load_map(MAP_PATH, cache_dir=None).tiles()]
+
+    assert tiles == expected
+
+
+def test_artifact_round_trip_matches_compiling(tmp_path, monkeypatch):
+    compiled = load_map(MAP_PATH, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    monkeypatch.setattr(map_compiler, "_compiled_maps", OrderedDict())
+    monkeypatch.setattr(map_compiler, "compile_map", None)
+    loaded = load_map(MAP_PATH, cache_dir=tmp_path)
+
+    assert loaded is not compiled
+    for name in ARRAY_NAMES:
+        np.testing.assert_array_equal(loaded.arrays[name], compiled.arrays[name])
+
+
+def artifacts(cache_dir):
+    """Get the artifact file names in a cache directory."""
+    return set(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else set()
+
+
+def test_map_text_is_only_written_to_an_explicit_cache_dir(tmp_path):
+    before = artifacts(DEFAULT_CACHE_DIR)
+    load_map_text(generate_city(40, 40, seed=3).text)
+    assert artifacts(DEFAULT_CACHE_DIR) == before
+
+    load_map_text(generate_city(40, 40, seed=4).text, cache_dir=tmp_path / "explicit")
+    assert len(list((tmp_path / "explicit").glob("*.npz"))) == 1
+
+
+def test_memory_cache_keeps_the_most_recent_maps():
+    texts = [generate_city(30, 30, seed=seed).text for seed in range(MAX_COMPILED_MAPS + 2)]
+    compiled = [load_map_text(text) for text in texts]
+
+    assert len(map_compiler._compiled_maps) == MAX_COMPILED_MAPS
+    assert load_map_text(texts[-1]) is compiled[-1]
+    assert load_map_text(texts[0]) is not compiled[0]
@@ -0,0 +1,56 @@
+from collections import deque
+
+import pytest
+
+from trafficAgents.traffic_base.map_generator import generate_city
+from trafficAgents.traffic_base.model import CityModel
+
+
+def reachable(graph, start_id):
+    """Get every cell id reachable from a cell."""
+    seen = {start_id}
+    frontier = deque([start_id])
+    while frontier:
+        for neighbor_id in graph.neighbors(frontier.popleft()):
+            if neighbor_id not in seen:
+                seen.add(neighbor_id)
+                frontier.append(neighbor_id)
+    return seen
+
+
+def test_generation_is_reproducible_by_seed():
+    assert generate_city(60, 50, seed=5).text == generate_city(60, 50, seed=5).text
+    assert generate_city(60, 50, seed=5).text != generate_city(60, 50, seed=6).text
+    with pytest.raises(ValueError):
+        generate_city(8, 60)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_generated_cities_are_connected(seed):
+    generated = generate_city(70, 56, block_size=6 + seed % 3, seed=seed)
+    model = CityModel(0, map_file=generated)
+    road_graph, walk_graph = model.road_graph, model.walk_graph
+    roads = {road_graph.cell_id(coordinate) for coordinate in model.tiles.roads}
+    walkable = {walk_graph.cell_id(coordinate) for coordinate in model.tiles.sidewalks}
+
+    assert (generated.width, generated.height) == (70, 56)
+    assert model.car_destinations and model.pedestrian_destinations
+    start_id = next(iter(roads))
+    assert reachable(road_graph, start_id) >= roads
+    for destination in model.car_destinations:
+        assert start_id in reachable(road_graph, road_graph.cell_id(destination.cell.coordinate))
+    assert reachable(walk_graph, next(iter(walkable))) >= walkable
+    for destination in model.pedestrian_destinations:
+        assert walkable <= reachable(walk_graph, walk_graph.cell_id(destination.cell.coordinate))
+    for coordinate in generated.car_spawn_positions:
+        assert road_graph.cell_id(coordinate) in roads
+    for coordinate in generated.pedestrian_spawn_positions:
+        assert walk_graph.cell_id(coordinate) in walkable
+
+
+def test_generated_cities_run():
+    model = CityModel(5, map_file=generate_city(48, 48, seed=1), spawn_interval=2, max_cars=20, max_pedestrians=10)
+    for _ in range(100):
+        model.step()
+
+    assert model.counters.arrived["car"] > 0
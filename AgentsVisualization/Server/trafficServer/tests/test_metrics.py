@@ -0,0 +1,43 @@
+from trafficAgents.traffic_base.metrics import render_prometheus
+from trafficAgents.traffic_base.model import CityModel
+
+
+def replan_counts(engine, steps=200):
+    """Run a busy model with metrics and get its replan counters by (kind, reason)."""
+    model = CityModel(5, seed=42, spawn_interval=2, max_cars=40, max_pedestrians=15, engine=engine, metrics=True)
+    for _ in range(steps):
+        model.step()
+    return {
+        (dict(labels)["kind"], dict(labels)["reason"]): value
+        for (name, labels), value in model.metrics.counters.items()
+        if name == "traffic_replans_total" and value
+    }
+
+
+def test_blocked_replans_are_labelled_blocked_by_both_engines():
+    agents = replan_counts("agents")
+    fast = replan_counts("fast")
+
+    assert agents[("car", "blocked")] > 0
+    assert agents[("pedestrian", "blocked")] > 0
+    assert agents == fast
+
+
+def test_metrics_do_not_change_the_run(trajectory):
+    assert trajectory(metrics=True) == trajectory()
+
+
+def test_samples_render_in_the_prometheus_text_format():
+    text = render_prometheus([
+        ("traffic_steps_total", {}, 3),
+        ("traffic_replans_total", {"kind": "car", "reason": 'say "hi"'}, 1),
+    ])
+
+    assert text == (
+        "# HELP traffic_replans_total Route replans by agent kind and reason.\n"
+        "# TYPE traffic_replans_total counter\n"
+        'traffic_replans_total{kind="car",reason="say \\"hi\\""} 1.0\n'
+        "# HELP traffic_steps_total Model steps taken.\n"
+        "# TYPE traffic_steps_total counter\n"
+        "traffic_steps_total 3.0\n"
+    )
@@ -0,0 +1,56 @@
+from collections import Counter
+
+import numpy as np
+
+from trafficAgents.traffic_base.model import CityModel
+from trafficAgents.traffic_base.occupancy import OccupancyGrid
+from trafficAgents.traffic_base.tiles import TileLayers, ROAD_DIRECTIONS, ROAD_DIRECTION_CODES
+
+
+def occupancy_from_agents(model, kind):
+    """Count active agents of a kind per tile by walking the agents."""
+    counts = np.zeros((model.grid.width, model.grid.height), dtype=np.int16)
+    for coordinate, count in Counter(agent.cell.coordinate for agent in model.counters.agents(kind)).items():
+        counts[coordinate] = count
+    return counts
+
+
+def test_occupancy_follows_agents_and_light_queues_match_queue_length():
+    model = CityModel(5, seed=42, spawn_interval=2, max_cars=40, max_pedestrians=15)
+    longest_queue = 0
+    for _ in range(25):
+        for _ in range(10):
+            model.step()
+        occupancy = model.occupancy
+        np.testing.assert_array_equal(occupancy.cars, occupancy_from_agents(model, "car"))
+        np.testing.assert_array_equal(occupancy.pedestrians, occupancy_from_agents(model, "pedestrian"))
+
+        tiles = model.tiles
+        expected = [
+            occupancy.queue_length(light.cell.coordinate, ROAD_DIRECTIONS[tiles.road_direction[light.cell.coordinate]])
+            for light in tiles.traffic_lights
+        ]
+        queues = occupancy.traffic_light_queues(tiles)
+        assert queues.tolist() == expected
+        longest_queue = max(longest_queue, queues.max())
+
+    assert longest_queue > 0
+
+
+def test_light_queues_stop_at_the_first_gap_and_the_grid_edge():
+    tiles = TileLayers(6, 6)
+    occupancy = OccupancyGrid(6, 6)
+    # A light per direction: Left at (1, 0), Right at (4, 1), Up at (2, 4), Down at (3, 1)
+    lights = [((1, 0), "Left"), ((4, 1), "Right"), ((2, 4), "Up"), ((3, 1), "Down")]
+    for light_id, (coordinate, direction) in enumerate(lights):
+        tiles.traffic_light[coordinate] = light_id
+        tiles.road_direction[coordinate] = ROAD_DIRECTION_CODES[direction]
+    occupancy.cars[2:4, 0] = 1
+    occupancy.cars[5, 0] = 1
+    occupancy.cars[0:4, 1] = 1
+    occupancy.cars[2, 1:4] = 1
+    occupancy.cars[3, 2:6] = 1
+
+    queues = occupancy.traffic_light_queues(tiles).tolist()
+    assert queues == [2, 4, 4, 4]
+    assert queues == [occupancy.queue_length(coordinate, direction) for coordinate, direction in lights]
@@ -0,0 +1,18 @@
+from trafficAgents.traffic_base.route_cache import MISSING, RouteCache
+
+
+def test_least_recently_used_routes_are_evicted():
+    cache = RouteCache(2)
+    cache.put("a", [1, 2])
+    cache.put("b", [3])
+    assert cache.get("a") == (1, 2)
+    cache.put("c", None)
+
+    assert "b" not in cache
+    assert cache.get("c", MISSING) is None
+    assert cache.get("b", MISSING) is MISSING
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 1, "hit_rate": 2 / 3}
+
+
+def test_cached_routes_do_not_change_the_run(trajectory):
+    assert trajectory(route_cache_size=0) == trajectory()
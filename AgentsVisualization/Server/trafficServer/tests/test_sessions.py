@@ -0,0 +1,45 @@
+import agents_server
+from sessions import SessionStore
+
+MODEL_PARAMS = {"initial_agents_count": 2}
+
+
+def test_init_keeps_agent_counts_per_session(client):
+    first = client.post("/init", json={"NAgents": 3}).json["session"]
+    second = client.post("/init", json={"NAgents": 7}).json["session"]
+
+    assert client.get(f"/init?session={first}").status_code == 200
+    fresh = client.get("/init").json["session"]
+
+    store = agents_server.sessions
+    assert store.get(first).simulation.model.num_agents == 3
+    assert store.get(second).simulation.model.num_agents == 7
+    assert store.get(fresh).simulation.model.num_agents == agents_server.DEFAULT_AGENTS_COUNT
+
+
+def test_sessions_step_independently(client):
+    first = client.post("/init", json={"NAgents": 3}).json["session"]
+    second = client.post("/init", json={"NAgents": 3}).json["session"]
+
+    client.get(f"/update?session={first}&steps=5")
+
+    assert client.get(f"/state?session={first}").json["step"] == 5
+    assert client.get(f"/state?session={second}").json["step"] == 0
+    assert client.get("/state?session=missing").status_code == 404
+
+
+def test_store_evicts_least_recently_used_and_idle_sessions():
+    store = SessionStore(max_sessions=2, idle_timeout=60)
+    first = store.create(MODEL_PARAMS)
+    second = store.create(MODEL_PARAMS)
+    store.get(first.id)
+    third = store.create(MODEL_PARAMS)
+
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
+
+    third.last_used -= 120
+    assert store.get(third.id) is None
+    assert len(store) == 1
+    assert store.remove(first.id)
+    assert not store.remove(first.id)
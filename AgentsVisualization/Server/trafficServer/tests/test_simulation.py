@@ -0,0 +1,38 @@
+import pytest
+
+from simulation import Simulation, parse_until
+
+MODEL_PARAMS = {"initial_agents_count": 5, "seed": 42, "spawn_interval": 2, "max_cars": 40, "max_pedestrians": 15}
+
+
+def test_advancing_many_steps_matches_advancing_one_at_a_time():
+    batched = Simulation(MODEL_PARAMS)
+    single = Simulation(MODEL_PARAMS)
+
+    result = batched.advance_many(30, per_step=True)
+    updates = [single.advance() for _ in range(30)]
+
+    assert result["per_step"] == updates
+    assert result["steps_taken"] == 30 and result["stopped"] == "steps"
+    assert batched.state() == single.state()
+
+
+def test_advancing_stops_once_the_condition_holds():
+    simulation = Simulation(MODEL_PARAMS)
+
+    result = simulation.advance_many(100, until="step:12")
+
+    assert (result["step"], result["steps_taken"], result["stopped"]) == (12, 12, "until")
+    assert simulation.advance_many(5, until="step:12")["steps_taken"] == 0
+    with pytest.raises(ValueError):
+        parse_until("never")
+
+
+def test_update_endpoint_runs_several_steps(client):
+    session = client.post("/init", json={"NAgents": 5}).json["session"]
+
+    update = client.get(f"/update?session={session}&steps=8&until=step:5").json
+
+    assert (update["step"], update["stopped"]) == (5, "until")
+    assert client.get(f"/update?session={session}&steps=0").status_code == 400
+    assert client.get(f"/update?session={session}&until=never").status_code == 400
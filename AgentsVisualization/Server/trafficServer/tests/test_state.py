@@ -0,0 +1,18 @@
+def test_state_combines_the_per_layer_endpoints(client):
+    session = client.post("/init", json={"NAgents": 5}).json["session"]
+    client.get(f"/update?session={session}&steps=30")
+
+    state = client.get(f"/state?session={session}").json
+
+    assert state["step"] == 30
+    assert state["agentpos"] == client.get(f"/getAgents?session={session}").json["agentpos"]
+    assert state["Pedestrianpos"] == client.get(f"/getPedestrians?session={session}").json["Pedestrianpos"]
+    assert state["TrafficLightpos"] == client.get(f"/getTrafficLights?session={session}").json["TrafficLightpos"]
+    assert state["agentpos"] and state["TrafficLightpos"]
+
+
+def test_state_can_advance_before_answering(client):
+    session = client.post("/init", json={"NAgents": 5}).json["session"]
+
+    assert client.get(f"/state?session={session}&advance=true").json["step"] == 1
+    assert client.get(f"/state?session={session}").json["step"] == 1
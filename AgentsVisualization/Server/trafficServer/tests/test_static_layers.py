@@ -0,0 +1,30 @@
+import agents_server
+from static_layers import COMBINED_LAYERS, STATIC_LAYERS
+
+
+def test_static_layers_list_every_tile_and_combine(client):
+    session = client.post("/init", json={"NAgents": 1}).json["session"]
+    tiles = agents_server.sessions.get(session).simulation.model.tiles
+    expected = {
+        "Roadpos": set(tiles.roads),
+        "Sidewalkpos": set(tiles.sidewalks),
+        "PedestrianWalkpos": set(tiles.pedestrian_walks),
+        "obstaclepos": set(tiles.obstacles),
+        "Destinationpos": {destination.cell.coordinate for destination in tiles.destinations},
+    }
+
+    combined = client.get(f"/{COMBINED_LAYERS}?session={session}").json
+    for name, (key, _) in STATIC_LAYERS.items():
+        layer = client.get(f"/{name}?session={session}").json[key]
+        assert {(entry["x"], entry["z"]) for entry in layer} == expected[key]
+        assert combined[key] == layer
+
+
+def test_unchanged_layers_answer_not_modified(client):
+    session = client.post("/init", json={"NAgents": 1}).json["session"]
+    response = client.get(f"/getRoads?session={session}")
+    etag = response.headers["ETag"]
+
+    assert client.get(f"/getRoads?session={session}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/getRoads?session={session}", headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert client.get(f"/getSidewalks?session={session}").headers["ETag"] != etag
@@ -0,0 +1,25 @@
+import os
+
+from trafficAgents.traffic_base.agent import Car, Pedestrian, StaticTile
+from trafficAgents.traffic_base.map_compiler import CITY_FILES_DIR, load_map
+from trafficAgents.traffic_base.model import CityModel
+
+
+def test_only_moving_agents_are_scheduled():
+    model = CityModel(5, seed=42, spawn_interval=2, max_cars=40, max_pedestrians=15)
+    for _ in range(50):
+        model.step()
+
+    assert set(model.agents) == set(model.counters.agents("car") + model.counters.agents("pedestrian"))
+    assert all(isinstance(agent, (Car, Pedestrian)) for agent in model.agents)
+
+
+def test_static_tiles_stay_on_the_grid_and_in_the_tile_registries():
+    model = CityModel(0)
+    tile_agents = set(model.tiles.agents())
+    on_grid = {agent for cell in model.grid.all_cells for agent in cell.agents if isinstance(agent, StaticTile)}
+    map_tiles = {(x, y) for x, y, *_ in load_map(os.path.join(CITY_FILES_DIR, "2024_modified.txt")).tiles()}
+
+    assert len(model.agents) == 0
+    assert on_grid == tile_agents
+    assert {agent.cell.coordinate for agent in tile_agents} == map_tiles
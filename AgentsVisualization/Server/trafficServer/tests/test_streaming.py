@@ -0,0 +1,47 @@
+import json
+
+from simulation import Simulation
+from streaming import FrameChannel, SimulationTicker
+
+
+def test_subscribers_skip_to_the_latest_frame():
+    channel = FrameChannel()
+    events = channel.events(keepalive=0.01)
+    assert next(events) == ": keepalive\n\n"
+    channel.publish({"step": 1})
+
+    assert next(events) == 'id: 1\nevent: frame\ndata: {"step":1}\n\n'
+
+    channel.publish({"step": 2})
+    channel.publish({"step": 3})
+    assert next(events) == 'id: 3\nevent: frame\ndata: {"step":3}\n\n'
+    assert next(events) == "event: dropped\ndata: 1\n\n"
+    assert next(events) == ": keepalive\n\n"
+
+    channel.close()
+    assert next(events) == "event: end\ndata: {}\n\n"
+
+
+def test_ticker_publishes_the_frames_of_consecutive_steps():
+    simulation = Simulation({"initial_agents_count": 3})
+    reference = Simulation({"initial_agents_count": 3})
+    channel = FrameChannel()
+    frames = []
+
+    def tick():
+        frame = simulation.tick()
+        frames.append(frame)
+        return frame
+
+    ticker = SimulationTicker(tick, channel, rate=200.0)
+    ticker.start()
+    last_sequence, body = channel.wait(0, timeout=5)
+    for _ in range(5):
+        last_sequence, body = channel.wait(last_sequence, timeout=5)
+    ticker.stop()
+
+    assert channel.wait(last_sequence, timeout=0) == (None, None)
+    assert [frame["step"] for frame in frames] == list(range(1, len(frames) + 1))
+    for frame in frames:
+        assert reference.tick() == frame
+    assert json.loads(channel.frame) == frames[-1]
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from sweep import expand_grid, parse_light_timing, sweep, write_table
+from trafficAgents.traffic_base.model import CityModel
+
+SPEC = {"seed": [1, 2], "max_cars": [5, 20], "light_timings": [None, {"S": 8, "s": 4}]}
+TIMING_COLUMNS = ["wall_time", "steps_per_second"]
+
+
+def test_grid_expands_to_every_combination():
+    grid = expand_grid(SPEC)
+
+    assert len(grid) == 8
+    assert {(params["seed"], params["max_cars"]) for params in grid} == {(1, 5), (1, 20), (2, 5), (2, 20)}
+    assert all(params["map_file"] == "2024_modified.txt" for params in grid)
+    assert parse_light_timing("S=8,s=4") == {"S": 8, "s": 4}
+
+
+def test_step_rows_match_stepping_the_model():
+    runs, steps = sweep({"seed": [3], "max_cars": [15]}, steps=60, initial_agents_count=3, processes=1, every=10)
+    model = CityModel(3, **expand_grid({"seed": [3], "max_cars": [15]})[0])
+    expected = []
+    for step in range(1, 61):
+        model.step()
+        if step % 10 == 0:
+            expected.append({"run_id": 0, "step": step, **model.counters.stats()})
+
+    assert steps.to_dict("records") == expected
+    assert runs.loc[0, "total_cars"] == model.counters.stats()["total_cars"]
+
+
+def test_parallel_sweeps_match_serial_sweeps(tmp_path):
+    serial_runs, serial_steps = sweep(SPEC, steps=40, initial_agents_count=3, processes=1, every=5)
+    parallel_runs, parallel_steps = sweep(SPEC, steps=40, initial_agents_count=3, processes=2, every=5)
+
+    pd.testing.assert_frame_equal(serial_runs.drop(columns=TIMING_COLUMNS), parallel_runs.drop(columns=TIMING_COLUMNS))
+    pd.testing.assert_frame_equal(serial_steps, parallel_steps)
+
+    write_table(serial_steps, tmp_path / "steps.csv")
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "steps.csv"), serial_steps)
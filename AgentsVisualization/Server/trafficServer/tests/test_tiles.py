@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from trafficAgents.traffic_base.agent import Destination, Obstacle, PedestrianWalk, Road, Sidewalk, Traffic_Light
+from trafficAgents.traffic_base.model import CityModel
+from trafficAgents.traffic_base.tiles import ROAD_DIRECTION_CODES
+
+MAP_FILES = ["2021_base.txt", "2022_base.txt", "2023_base.txt", "2024_base.txt", "2024_modified.txt"]
+
+
+def layer_of(model, coordinates):
+    """Get a grid-sized layer set to True at coordinates."""
+    layer = np.zeros((model.grid.width, model.grid.height), dtype=bool)
+    for coordinate in coordinates:
+        layer[coordinate] = True
+    return layer
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_layers_agree_with_tile_agents(map_file):
+    model = CityModel(0, map_file=map_file)
+    tiles = model.tiles
+    by_class = {agent_class: list(tiles.agents(agent_class)) for agent_class in (Road, Sidewalk, PedestrianWalk, Traffic_Light, Obstacle, Destination)}
+
+    road_direction = np.zeros_like(tiles.road_direction)
+    for road in by_class[Road]:
+        road_direction[road.cell.coordinate] = ROAD_DIRECTION_CODES[road.direction]
+        assert tiles.road_at(road.cell.coordinate) is road
+    np.testing.assert_array_equal(tiles.road_direction, road_direction)
+
+    walkable = [tile.cell.coordinate for agent_class in (Sidewalk, PedestrianWalk, Traffic_Light) for tile in by_class[agent_class]]
+    np.testing.assert_array_equal(tiles.walkable, layer_of(model, walkable))
+    np.testing.assert_array_equal(tiles.obstacle, layer_of(model, [tile.cell.coordinate for tile in by_class[Obstacle]]))
+
+    for light in by_class[Traffic_Light]:
+        assert tiles.traffic_light_at(light.cell.coordinate) is light
+    for destination in by_class[Destination]:
+        assert tiles.destination_at(destination.cell.coordinate) is destination
+    assert np.count_nonzero(tiles.traffic_light >= 0) == len(by_class[Traffic_Light])
+    assert np.count_nonzero(tiles.destination >= 0) == len(by_class[Destination])
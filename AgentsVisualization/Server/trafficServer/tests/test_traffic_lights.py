@@ -0,0 +1,71 @@
+from trafficAgents.traffic_base.model import CityModel
+from trafficAgents.traffic_base.traffic_lights import LIGHTS_CHANGED, TrafficLightController
+
+
+def expected_state(initial, step, period, offset):
+    """Get a light's state after step from the number of switches at steps where (step - offset) % period == 0."""
+    switches = sum(1 for past in range(1, step + 1) if (past - offset) % period == 0)
+    return initial ^ (switches % 2 == 1)
+
+
+def test_lights_switch_on_their_period_and_offset():
+    controller = TrafficLightController()
+    changed = []
+    controller.events.subscribe(LIGHTS_CHANGED, lambda light_ids: changed.append(sorted(light_ids)))
+    first = controller.add(False, 3, group="S", offset=1)
+    second = controller.add(True, 7, group="S")
+    other = controller.add(True, 4, group="s")
+
+    for step in range(1, 30):
+        changed.clear()
+        controller.events.run_until(step)
+        assert controller.state[first] == expected_state(False, step, 3, 1)
+        assert controller.state[second] == expected_state(True, step, 3, 1)
+        assert controller.state[other] == expected_state(True, step, 4, 0)
+        assert controller.time_remaining.tolist() == [3 - (step - 1) % 3, 3 - (step - 1) % 3, 4 - step % 4]
+        assert all(light_ids in ([first, second], [other]) for light_ids in changed)
+
+
+def test_retiming_a_group_replaces_its_pending_switch():
+    controller = TrafficLightController()
+    light = controller.add(False, 10, group="S")
+    controller.events.run_until(4)
+
+    controller.set_group_timing("S", 3, offset=2)
+    for step in range(5, 30):
+        controller.events.run_until(step)
+        assert controller.state[light] == expected_state(False, step, 3, 2) ^ expected_state(False, 4, 3, 2)
+        assert controller.light_time_remaining(light) == 3 - (step - 2) % 3
+
+
+def test_skipping_idle_steps_matches_stepping_through_them():
+    def run(skip, steps=120):
+        model = CityModel(0, seed=7, spawn_interval=15, max_cars=1, max_pedestrians=1)
+        skipped = 0
+        while model.steps < steps:
+            skipped += model.skip_idle(steps - model.steps) if skip else 0
+            if model.steps < steps:
+                model.step()
+        agents = sorted((agent.unique_id, agent.cell.coordinate, agent.waiting_time) for agent in model.agents)
+        lights = [(light.state, light.time_remaining) for light in model.traffic_lights]
+        return skipped, (model.steps, model.spawn_timer, agents, lights)
+
+    skipped, skipping_run = run(skip=True)
+    assert skipped > 0
+    assert skipping_run == run(skip=False)[1]
+
+
+def test_light_timings_retime_every_light_of_a_map_group():
+    model = CityModel(0, light_timings={"S": (4, 1), "s": 6}, max_cars=0, max_pedestrians=0)
+    controller = model.traffic_light_controller
+    groups = {group: [light for light in model.traffic_lights if light.light_id in controller.members(group)] for group in ("S", "s")}
+    initial = {light.unique_id: light.state for light in model.traffic_lights}
+
+    assert groups["S"] and groups["s"]
+    for step in range(1, 25):
+        model.step()
+        for light in groups["S"]:
+            assert light.state == expected_state(initial[light.unique_id], step, 4, 1)
+            assert light.time_remaining == 4 - (step - 1) % 4
+        for light in groups["s"]:
+            assert light.state == expected_state(initial[light.unique_id], step, 6, 0)
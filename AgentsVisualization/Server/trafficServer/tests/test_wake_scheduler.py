@@ -0,0 +1,23 @@
+import pytest
+
+from trafficAgents.traffic_base.model import CityModel
+from trafficAgents.traffic_base.wake_scheduler import PARKED_STATES
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"replanning": "incremental"}, {"routing": "field"}])
+def test_parking_waiting_agents_does_not_change_the_run(trajectory, kwargs):
+    assert trajectory(wake_scheduling=True, **kwargs) == trajectory(wake_scheduling=False, **kwargs)
+
+
+def test_waiting_agents_are_parked_and_woken():
+    model = CityModel(5, seed=42, spawn_interval=2, max_cars=40, max_pedestrians=15, metrics=True)
+    woken = []
+    wake = model.wake_scheduler.wake
+    model.wake_scheduler.wake = lambda agent: woken.append(agent) or wake(agent)
+    for _ in range(200):
+        model.step()
+
+    parked_turns = sum(value for (name, _), value in model.metrics.counters.items() if name == "traffic_parked_turns_total")
+    assert parked_turns > 0
+    assert woken
+    assert all(agent.navigating_state in PARKED_STATES for agent in model.wake_scheduler.parked)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from wire import FRAME_MAGIC, FRAME_MIMETYPE, FRAME_VERSION, HEADER, STATS_KEYS
+
+ORIENTATIONS = [None, "Up", "Down", "Left", "Right"]
+
+
+def decode_frame(body):
+    """Decode a binary frame into the keys and entries of a JSON frame."""
+    magic, version, _, step, *rest = HEADER.unpack_from(body)
+    counts, stats = rest[:3], rest[3:]
+    assert (magic, version) == (FRAME_MAGIC, FRAME_VERSION)
+
+    offset = HEADER.size
+    sections = []
+    for count in counts:
+        ids = np.frombuffer(body, "<u4", count, offset).tolist()
+        xs = np.frombuffer(body, "<u2", count, offset + 4 * count).tolist()
+        zs = np.frombuffer(body, "<u2", count, offset + 6 * count).tolist()
+        values = np.frombuffer(body, np.uint8, count, offset + 8 * count).tolist()
+        offset += 9 * count + (-9 * count % 4)
+        sections.append(list(zip(ids, xs, zs, values)))
+    assert offset == len(body)
+
+    cars, pedestrians, lights = sections
+    return {
+        "step": step,
+        "agentpos": [{"id": str(i), "x": x, "y": 1, "z": z, "orientation": ORIENTATIONS[value]} for i, x, z, value in cars],
+        "Pedestrianpos": [{"id": str(i), "x": x, "y": 1, "z": z, "orientation": ORIENTATIONS[value]} for i, x, z, value in pedestrians],
+        "TrafficLightpos": [{"id": str(i), "x": x, "y": 1, "z": z, "state": bool(value)} for i, x, z, value in lights],
+        "stats": dict(zip(STATS_KEYS, stats)),
+    }
+
+
+def test_binary_frames_carry_the_json_frame(client):
+    session = client.post("/init", json={"NAgents": 5}).json["session"]
+    client.get(f"/update?session={session}&steps=40")
+
+    response = client.get(f"/state?session={session}", headers={"Accept": FRAME_MIMETYPE})
+    frame = client.get(f"/state?session={session}", headers={"Accept": "application/json"}).json
+    for light in frame["TrafficLightpos"]:
+        del light["time_remaining"]
+
+    assert response.mimetype == FRAME_MIMETYPE
+    assert "Accept" in response.headers["Vary"]
+    assert decode_frame(response.data) == frame
+    assert frame["agentpos"] and frame["Pedestrianpos"]
+
+
+def test_layer_endpoints_send_only_their_layer(client):
+    session = client.post("/init", json={"NAgents": 5}).json["session"]
+    client.get(f"/update?session={session}&steps=10")
+
+    cars = decode_frame(client.get(f"/getAgents?session={session}", headers={"Accept": FRAME_MIMETYPE}).data)
+
+    assert cars["agentpos"] == client.get(f"/getAgents?session={session}").json["agentpos"]
+    assert cars["Pedestrianpos"] == [] and cars["TrafficLightpos"] == []
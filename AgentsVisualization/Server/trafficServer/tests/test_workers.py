@@ -0,0 +1,42 @@
+import pytest
+
+from sessions import RemoteSession, SessionStore
+from workers import WorkerPool
+
+MODEL_PARAMS = {"initial_agents_count": 5}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """Get a pool of two worker processes shared by this module's tests."""
+    pool = WorkerPool(2)
+    yield pool
+    pool.stop()
+
+
+def test_remote_sessions_run_like_local_ones(pool):
+    remote_store = SessionStore(pool=pool)
+    local = SessionStore().create(MODEL_PARAMS)
+    first = remote_store.create(MODEL_PARAMS)
+    second = remote_store.create(MODEL_PARAMS)
+
+    assert isinstance(first, RemoteSession)
+    assert first.worker is not second.worker
+    for session in (local, first):
+        session.run("advance_many", 25)
+    assert first.run("state") == local.run("state")
+    assert first.run("delta", 20) == local.run("delta", 20)
+    assert second.run("state")["step"] == 0
+
+    remote_store.remove(first.id)
+    remote_store.remove(second.id)
+    assert all(not worker.sessions for worker in pool.workers)
+
+
+def test_worker_errors_reach_the_caller(pool):
+    session = SessionStore(pool=pool).create(MODEL_PARAMS)
+
+    with pytest.raises(RuntimeError, match="ValueError"):
+        session.run("advance_many", 1, until="never")
+    assert session.run("advance")["step"] == 1
+    session.close()
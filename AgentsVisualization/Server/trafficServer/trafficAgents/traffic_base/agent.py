@@ -1,6 +1,6 @@
 from mesa.experimental.cell_space import CellAgent, FixedAgent
 from enum import Enum
-import heapq
+from .dstar_lite import DStarLite
 
 class MainState(Enum):
     ACTIVE = "active"
@@ -13,9 +13,43 @@ class NavigatingState(Enum):
     BLOCKED = "blocked"
     PLANNING_ROUTE = "planning"
 
-class Car(CellAgent):
+class MovingAgent(CellAgent):
+    """Cell agent that keeps the model occupancy grid and agent counters in sync."""
+    
+    agent_kind = None
+    occupancy_layer = None
+    
+    def __init__(self, model):
+        """Register agent with the model counters."""
+        super().__init__(model)
+        self.model.counters.add(self)
+    
+    def remove(self):
+        """Remove agent from the model and its counters."""
+        self.model.counters.remove(self)
+        super().remove()
+    
+    @property
+    def cell(self):
+        return self._mesa_cell
+    
+    @cell.setter
+    def cell(self, cell):
+        layer = getattr(self.model.occupancy, self.occupancy_layer)
+        if self._mesa_cell is not None:
+            layer[self._mesa_cell.coordinate] -= 1
+            if self.model.wake_scheduler is not None:
+                self.model.wake_scheduler.cell_vacated(self._mesa_cell.coordinate)
+        CellAgent.cell.fset(self, cell)
+        if cell is not None:
+            layer[cell.coordinate] += 1
+
+class Car(MovingAgent):
     """Intelligent car agent with A* pathfinding and state machine."""
     
+    agent_kind = "car"
+    occupancy_layer = "cars"
+    
     def __init__(self, model, cell, destination=None):
         """Initialize car agent."""
         super().__init__(model)
@@ -29,6 +63,8 @@ class Car(CellAgent):
         self.path = []
         self.path_index = 0
         self.recalculate_path_threshold = 5
+        self.replan_reason = None
+        self.replanner = None
         
         if self.destination is not None:
             self.calculate_path_to_destination()
@@ -56,6 +92,7 @@ class Car(CellAgent):
         """Transition to arrived state."""
         self.main_state = MainState.ARRIVED
         self.navigating_state = None
+        self.model.counters.arrive(self)
         self.remove()
     
     def transition_navigating_state(self, new_state):
@@ -70,119 +107,55 @@ class Car(CellAgent):
                 self.waiting_time = 0
     
     
-    def heuristic(self, pos1, pos2):
-        """Calculate Manhattan distance between two positions."""
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
-    
     def get_valid_neighbors(self, cell):
         """Get valid neighboring cells respecting one-way roads."""
-        neighbors = []
-        current_pos = cell.coordinate
-        
-        road_agent = None
-        for agent in cell.agents:
-            if isinstance(agent, Road):
-                road_agent = agent
-                break
-        
-        if road_agent is None:
-            return neighbors
-        
-        directions = [
-            ("Up", (0, 1)),
-            ("Down", (0, -1)),
-            ("Left", (-1, 0)),
-            ("Right", (1, 0))
-        ]
-        
-        opposing_direction = {
-            "Up": "Down",
-            "Down": "Up",
-            "Left": "Right",
-            "Right": "Left"
-        }
-        
-        for movement_dir, (dx, dy) in directions:
-            next_pos = (current_pos[0] + dx, current_pos[1] + dy)
-            
-            if (0 <= next_pos[0] < self.model.grid.dimensions[0] and
-                0 <= next_pos[1] < self.model.grid.dimensions[1]):
-                
-                next_cell = self.model.grid[next_pos]
-                
-                if self._has_road(next_cell):
-                    next_road = None
-                    for agent in next_cell.agents:
-                        if isinstance(agent, Road):
-                            next_road = agent
-                            break
-                    
-                    if next_road:
-                        forbidden_dir = opposing_direction[movement_dir]
-                        
-                        if next_road.direction != forbidden_dir:
-                            neighbors.append(next_pos)
-        
-        return neighbors
+        graph = self.model.road_graph
+        return [graph.coordinate(neighbor_id) for neighbor_id in graph.neighbors(graph.cell_id(cell.coordinate))]
     
     def calculate_path_to_destination(self):
-        """Calculate optimal path using A* algorithm."""
+        """Calculate shortest path over the compiled road graph."""
         if self.destination is None:
             return False
         
-        start_pos = self.cell.coordinate
-        goal_pos = self.destination.cell.coordinate
+        graph = self.model.road_graph
+        path = self.model.find_route(
+            graph, graph.cell_id(self.cell.coordinate), graph.cell_id(self.destination.cell.coordinate)
+        )
         
-        counter = 0
-        open_set = [(0, counter, start_pos)]
-        counter += 1
+        if path is None:
+            self.path = []
+            return False
         
-        came_from = {}
+        self.path = [graph.coordinate(cell_id) for cell_id in path]
+        self.path_index = 0
+        return True
+    
+    def replan_around_congestion(self):
+        """Repair the per-car D* Lite search, penalizing cells currently occupied by cars."""
+        if self.destination is None:
+            return False
         
-        g_score = {start_pos: 0}
-        f_score = {start_pos: self.heuristic(start_pos, goal_pos)}
+        graph = self.model.road_graph
+        if self.replanner is None or self.replanner.graph is not graph:
+            self.replanner = DStarLite(graph, graph.cell_id(self.destination.cell.coordinate))
         
-        open_set_hash = {start_pos}
+        for cell_id in list(self.replanner.cell_costs):
+            if not self._has_car(self.model.grid[graph.coordinate(cell_id)]):
+                self.replanner.set_cell_cost(cell_id, 0)
         
-        while open_set:
-            current_f, _, current_pos = heapq.heappop(open_set)
-            open_set_hash.discard(current_pos)
-            
-            if current_pos == goal_pos:
-                self.path = self._reconstruct_path(came_from, current_pos)
-                self.path_index = 0
-                return True
-            
-            current_cell = self.model.grid[current_pos]
-            neighbors = self.get_valid_neighbors(current_cell)
-            
-            for neighbor_pos in neighbors:
-                tentative_g_score = g_score[current_pos] + 1
-                
-                if neighbor_pos not in g_score or tentative_g_score < g_score[neighbor_pos]:
-                    came_from[neighbor_pos] = current_pos
-                    g_score[neighbor_pos] = tentative_g_score
-                    f_score[neighbor_pos] = tentative_g_score + self.heuristic(neighbor_pos, goal_pos)
-                    
-                    if neighbor_pos not in open_set_hash:
-                        heapq.heappush(open_set, (f_score[neighbor_pos], counter, neighbor_pos))
-                        counter += 1
-                        open_set_hash.add(neighbor_pos)
-        self.path = []
-        return False
-    
-    def _reconstruct_path(self, came_from, current_pos):
-        """Reconstruct path from start to destination."""
-        path = [current_pos]
-        while current_pos in came_from:
-            current_pos = came_from[current_pos]
-            path.append(current_pos)
-        path.reverse() 
+        next_pos = self.get_next_position_from_path()
+        if next_pos is not None and self._has_car(self.model.grid[next_pos]):
+            self.replanner.set_cell_cost(graph.cell_id(next_pos), self.model.congestion_penalty)
         
-        if path and path[0] == self.cell.coordinate:
-            path.pop(0)
+        path = self.replanner.plan(graph.cell_id(self.cell.coordinate))
+        
+        if path is None:
+            self.path = []
+            return False
         
-        return path
+        self.path = [graph.coordinate(cell_id) for cell_id in path]
+        self.path_index = 0
+        return True
     
     def get_next_position_from_path(self):
         """Get next position from calculated path."""
@@ -203,10 +176,8 @@ class Car(CellAgent):
             'next_cell': None
         }
         
-        for agent in self.cell.agents:
-            if isinstance(agent, Road):
-                perception['road'] = agent
-                break
+        tiles = self.model.tiles
+        perception['road'] = tiles.road_at(self.cell.coordinate)
         
         next_pos_from_path = self.get_next_position_from_path()
         if next_pos_from_path:
@@ -217,11 +188,10 @@ class Car(CellAgent):
                 perception['next_cell'] = self.model.grid[next_pos]
         
         if perception['next_cell']:
-            for agent in perception['next_cell'].agents:
-                if isinstance(agent, Car):
-                    perception['cars_ahead'].append(agent)
-                elif isinstance(agent, Traffic_Light):
-                    perception['traffic_light'] = agent
+            next_pos = perception['next_cell'].coordinate
+            perception['traffic_light'] = tiles.traffic_light_at(next_pos)
+            if self.model.occupancy.has_car(next_pos):
+                perception['cars_ahead'] = [agent for agent in perception['next_cell'].agents if isinstance(agent, Car)]
         
         return perception
     
@@ -268,33 +238,25 @@ class Car(CellAgent):
             alt_pos = self._calculate_next_position(alt_direction)
             if alt_pos:
                 alt_cell = self.model.grid[alt_pos]
-                if self._has_road(alt_cell):
-                    has_car = False
-                    for agent in alt_cell.agents:
-                        if isinstance(agent, Car):
-                            has_car = True
-                            break
-                    if not has_car:
-                        return alt_cell
+                if self._has_road(alt_cell) and not self._has_car(alt_cell):
+                    return alt_cell
         
         return None
     
     def _has_road(self, cell):
         """Check if cell has road agent."""
-        for agent in cell.agents:
-            if isinstance(agent, Road):
-                return True
-        return False
+        return self.model.tiles.has_road(cell.coordinate)
+    
+    def _has_car(self, cell):
+        """Check if cell has car agent."""
+        return self.model.occupancy.has_car(cell.coordinate)
     
     def _is_at_destination(self):
         """Check if car is at destination."""
         if self.destination is None:
             return False
         
-        for agent in self.cell.agents:
-            if isinstance(agent, Destination) and agent == self.destination:
-                return True
-        return False
+        return self.model.tiles.destination_at(self.cell.coordinate) is self.destination
     
     def decide_action(self, perception):
         """Decide action based on state and perception."""
@@ -308,6 +270,7 @@ class Car(CellAgent):
         if (not self.path or self.path_index >= len(self.path) or 
             (self.waiting_time >= self.recalculate_path_threshold)):
             
+            self.replan_reason = 'blocked' if self.waiting_time >= self.recalculate_path_threshold else 'no_path'
             self.transition_navigating_state(NavigatingState.PLANNING_ROUTE)
             return 'replan'
         
@@ -360,7 +323,10 @@ class Car(CellAgent):
             self.waiting_time = 0
             
         elif action == 'replan':
-            success = self.calculate_path_to_destination()
+            if self.model.replanning == "incremental" and self.replan_reason == 'blocked':
+                success = self.replan_around_congestion()
+            else:
+                success = self.calculate_path_to_destination()
             if not success:
                 self.transition_navigating_state(NavigatingState.BLOCKED)
             else:
@@ -378,9 +344,12 @@ class Car(CellAgent):
         action = self.decide_action(perception)
         self.execute_action(action, perception)
 
-class Pedestrian(CellAgent):
+class Pedestrian(MovingAgent):
     """Pedestrian agent."""
     
+    agent_kind = "pedestrian"
+    occupancy_layer = "pedestrians"
+    
     def __init__(self, model, cell, destination):
         super().__init__(model)
         self.cell = cell
@@ -393,6 +362,7 @@ class Pedestrian(CellAgent):
         self.path = []
         self.path_index = 0
         self.recalculate_path_threshold = 5
+        self.replan_reason = None
         
         if self.destination is not None:
             self.calculate_path_to_destination()
@@ -419,6 +389,7 @@ class Pedestrian(CellAgent):
         """Transition to arrived state."""
         self.main_state = MainState.ARRIVED
         self.navigating_state = None
+        self.model.counters.arrive(self)
         self.remove()
     
     def transition_navigating_state(self, new_state):
@@ -432,107 +403,28 @@ class Pedestrian(CellAgent):
             else:
                 self.waiting_time = 0
     
-    def heuristic(self, pos1, pos2):
-        """Calculate Manhattan distance between two positions."""
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
-    
     def get_valid_neighbors(self, cell):
         """Get valid neighboring cells for pedestrians (sidewalks, pedestrian walks, and traffic lights)."""
-        neighbors = []
-        current_pos = cell.coordinate
-        
-        # Check if current cell has sidewalk, pedestrian walk, or traffic light
-        has_walkable = False
-        for agent in cell.agents:
-            if isinstance(agent, (Sidewalk, PedestrianWalk, Traffic_Light)):
-                has_walkable = True
-                break
-        
-        if not has_walkable:
-            return neighbors
-        
-        # Pedestrians can move in all 4 directions
-        directions = [
-            (0, 1),   # Up
-            (0, -1),  # Down
-            (-1, 0),  # Left
-            (1, 0)    # Right
-        ]
-        
-        for dx, dy in directions:
-            next_pos = (current_pos[0] + dx, current_pos[1] + dy)
-            
-            # Check if position is within bounds
-            if (0 <= next_pos[0] < self.model.grid.dimensions[0] and
-                0 <= next_pos[1] < self.model.grid.dimensions[1]):
-                
-                next_cell = self.model.grid[next_pos]
-                
-                # Check if next cell has walkable surface (sidewalk, pedestrian walk, or traffic light)
-                if self._has_walkable_surface(next_cell):
-                    neighbors.append(next_pos)
-        
-        return neighbors
+        graph = self.model.walk_graph
+        return [graph.coordinate(neighbor_id) for neighbor_id in graph.neighbors(graph.cell_id(cell.coordinate))]
     
     def calculate_path_to_destination(self):
-        """Calculate optimal path using A* algorithm."""
+        """Calculate shortest path over the compiled walkable graph."""
         if self.destination is None:
             return False
         
-        start_pos = self.cell.coordinate
-        goal_pos = self.destination.cell.coordinate
-        
-        counter = 0
-        open_set = [(0, counter, start_pos)]
-        counter += 1
-        
-        came_from = {}
-        
-        g_score = {start_pos: 0}
-        f_score = {start_pos: self.heuristic(start_pos, goal_pos)}
+        graph = self.model.walk_graph
+        path = self.model.find_route(
+            graph, graph.cell_id(self.cell.coordinate), graph.cell_id(self.destination.cell.coordinate)
+        )
         
-        open_set_hash = {start_pos}
-        
-        while open_set:
-            current_f, _, current_pos = heapq.heappop(open_set)
-            open_set_hash.discard(current_pos)
-            
-            if current_pos == goal_pos:
-                self.path = self._reconstruct_path(came_from, current_pos)
-                self.path_index = 0
-                return True
-            
-            current_cell = self.model.grid[current_pos]
-            neighbors = self.get_valid_neighbors(current_cell)
-            
-            for neighbor_pos in neighbors:
-                tentative_g_score = g_score[current_pos] + 1
-                
-                if neighbor_pos not in g_score or tentative_g_score < g_score[neighbor_pos]:
-                    came_from[neighbor_pos] = current_pos
-                    g_score[neighbor_pos] = tentative_g_score
-                    f_score[neighbor_pos] = tentative_g_score + self.heuristic(neighbor_pos, goal_pos)
-                    
-                    if neighbor_pos not in open_set_hash:
-                        heapq.heappush(open_set, (f_score[neighbor_pos], counter, neighbor_pos))
-                        counter += 1
-                        open_set_hash.add(neighbor_pos)
-    
-        self.path = []
-        return False
-    
-    def _reconstruct_path(self, came_from, current_pos):
-        """Reconstruct path from start to destination."""
-        path = [current_pos]
-        while current_pos in came_from:
-            current_pos = came_from[current_pos]
-            path.append(current_pos)
-        path.reverse() 
-        
-        if path and path[0] == self.cell.coordinate:
-            path.pop(0)
+        if path is None:
+            self.path = []
+            return False
         
-        return path
+        self.path = [graph.coordinate(cell_id) for cell_id in path]
+        self.path_index = 0
+        return True
     
     def get_next_position_from_path(self):
         """Get next position from calculated path."""
@@ -555,19 +447,11 @@ class Pedestrian(CellAgent):
             'next_cell': None
         }
         
-        for agent in self.cell.agents:
-            if isinstance(agent, Sidewalk):
-                perception['sidewalk'] = agent
-                break
-        
-        for agent in self.cell.agents:
-            if isinstance(agent, PedestrianWalk):
-                perception['pedestrian_walk'] = agent
-                break
-        for agent in self.cell.agents:
-            if isinstance(agent, Traffic_Light):
-                perception['traffic_light'] = agent
-                break
+        tiles = self.model.tiles
+        current_pos = self.cell.coordinate
+        perception['sidewalk'] = tiles.sidewalks.get(current_pos)
+        perception['pedestrian_walk'] = tiles.pedestrian_walks.get(current_pos)
+        perception['traffic_light'] = tiles.traffic_light_at(current_pos)
 
         next_pos_from_path = self.get_next_position_from_path()
         if next_pos_from_path:
@@ -578,13 +462,17 @@ class Pedestrian(CellAgent):
                 perception['next_cell'] = self.model.grid[next_pos]
         
         if perception['next_cell']:
-            for agent in perception['next_cell'].agents:
-                if isinstance(agent, Pedestrian):
-                    perception['pedestrians_ahead'].append(agent)
-                elif isinstance(agent, Car):
-                    perception['cars_ahead'].append(agent)
-                elif isinstance(agent, Traffic_Light):
-                    perception['traffic_light'] = agent
+            next_traffic_light = tiles.traffic_light_at(perception['next_cell'].coordinate)
+            if next_traffic_light is not None:
+                perception['traffic_light'] = next_traffic_light
+            occupancy = self.model.occupancy
+            next_pos = perception['next_cell'].coordinate
+            if occupancy.has_pedestrian(next_pos) or occupancy.has_car(next_pos):
+                for agent in perception['next_cell'].agents:
+                    if isinstance(agent, Pedestrian):
+                        perception['pedestrians_ahead'].append(agent)
+                    elif isinstance(agent, Car):
+                        perception['cars_ahead'].append(agent)
         
         return perception
     
@@ -611,20 +499,14 @@ class Pedestrian(CellAgent):
     
     def _has_walkable_surface(self, cell):
         """Check if cell has sidewalk, pedestrian walk, or traffic light."""
-        for agent in cell.agents:
-            if isinstance(agent, (Sidewalk, PedestrianWalk, Traffic_Light)):
-                return True
-        return False
+        return self.model.tiles.is_walkable(cell.coordinate)
     
     def _is_at_destination(self):
         """Check if pedestrian is at destination."""
         if self.destination is None:
             return False
         
-        for agent in self.cell.agents:
-            if isinstance(agent, Destination) and agent == self.destination:
-                return True
-        return False
+        return self.model.tiles.destination_at(self.cell.coordinate) is self.destination
     
     def decide_action(self, perception):
         """Decide action based on state and perception."""
@@ -642,6 +524,7 @@ class Pedestrian(CellAgent):
             if self.waiting_time >= self.recalculate_path_threshold:
                 print(f"Pedestrian en {self.cell.coordinate}: Recalculando ruta (bloqueado {self.waiting_time} pasos)")
             
+            self.replan_reason = 'blocked' if self.waiting_time >= self.recalculate_path_threshold else 'no_path'
             self.transition_navigating_state(NavigatingState.PLANNING_ROUTE)
             return 'replan'
         
@@ -729,69 +612,73 @@ class Pedestrian(CellAgent):
         self.execute_action(action, perception)
 
 
-class Traffic_Light(FixedAgent):
-    """Traffic light agent."""
-    
-    def __init__(self, model, cell, state = False, timeToChange = 10):
-        """Initialize traffic light."""
+class StaticTile(FixedAgent):
+    """Fixed map tile that sits on its cell but is never scheduled.
+
+    CityModel keeps static tiles out of model.agents and registers them in
+    its TileLayers instead, so stepping the model only shuffles agents that
+    act. Tiles are still found on their cells with isinstance checks.
+    """
+
+    def __init__(self, model, cell):
+        """Initialize a tile on a cell."""
         super().__init__(model)
         self.cell = cell
-        self.state = state
-        self.timeToChange = timeToChange
-        self.time_remaining = timeToChange
 
-    def step(self):
-        """Change traffic light state."""
-        steps_since_change = self.model.steps % self.timeToChange
-        self.time_remaining = self.timeToChange - steps_since_change
-        
-        if self.model.steps % self.timeToChange == 0:
-            self.state = not self.state
-            self.time_remaining = self.timeToChange
+class Traffic_Light(StaticTile):
+    """Traffic light tile switched by timed events of the model's TrafficLightController."""
+    
+    def __init__(self, model, cell, state = False, timeToChange = 10, group = None):
+        """Initialize traffic light."""
+        super().__init__(model, cell)
+        self.light_id = model.traffic_light_controller.add(state, timeToChange, group)
+
+    @property
+    def state(self):
+        return bool(self.model.traffic_light_controller.state[self.light_id])
+
+    @state.setter
+    def state(self, state):
+        self.model.traffic_light_controller.set_state(self.light_id, state)
+
+    @property
+    def timeToChange(self):
+        return int(self.model.traffic_light_controller.period[self.light_id])
+
+    @property
+    def time_remaining(self):
+        return self.model.traffic_light_controller.light_time_remaining(self.light_id)
     
     def get_seconds_remaining(self):
         """Get remaining steps until next state change."""
         return self.time_remaining
 
-class Destination(FixedAgent):
+class Destination(StaticTile):
     """Destination agent."""
-    
-    def __init__(self, model, cell):
-        """Initialize destination."""
-        super().__init__(model)
-        self.cell = cell
 
-class Obstacle(FixedAgent):
+class Obstacle(StaticTile):
     """Obstacle agent."""
-    
-    def __init__(self, model, cell):
-        """Initialize obstacle."""
-        super().__init__(model)
-        self.cell = cell
 
-class Road(FixedAgent):
+class Road(StaticTile):
     """Road agent with direction."""
     
     def __init__(self, model, cell, direction= "Left"):
         """Initialize road."""
-        super().__init__(model)
-        self.cell = cell
+        super().__init__(model, cell)
         self.direction = direction
 
-class Sidewalk(FixedAgent):
+class Sidewalk(StaticTile):
     """Sidewalk agent."""
     
     def __init__(self, model, cell, direction= "Left"):
         """Initialize sidewalk."""
-        super().__init__(model)
-        self.cell = cell
+        super().__init__(model, cell)
         self.direction = direction
 
-class PedestrianWalk(FixedAgent):
+class PedestrianWalk(StaticTile):
     """Pedestrian walk agent."""
     
     def __init__(self, model, cell, direction= "Left"):
         """Initialize pedestrian walk."""
-        super().__init__(model)
-        self.cell = cell
-        self.direction = direction
\ No newline at end of file
+        super().__init__(model, cell)
+        self.direction = direction
@@ -0,0 +1,57 @@
+from collections import Counter
+
+class AgentCounters:
+    """Live counts and registries of moving agents, keyed by agent kind.
+
+    Agents report themselves on construction, arrival and removal, so
+    counts are read in O(1) instead of summing over every agent in the
+    model. active is the number of agents currently moving, arrived and
+    total are running counts of arrivals and of agents ever created.
+    """
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self.active = Counter()
+        self.arrived = Counter()
+        self.total = Counter()
+        self.registries = {}
+
+    def add(self, agent):
+        """Count a newly created agent as active."""
+        kind = agent.agent_kind
+        self.active[kind] += 1
+        self.total[kind] += 1
+        self.registries.setdefault(kind, {})[agent] = None
+
+    def arrive(self, agent):
+        """Move an agent from active to arrived."""
+        if self._discard(agent):
+            self.arrived[agent.agent_kind] += 1
+
+    def remove(self, agent):
+        """Stop counting an agent that left the model without arriving."""
+        self._discard(agent)
+
+    def _discard(self, agent):
+        """Drop an agent from its registry, returning whether it was active."""
+        registry = self.registries.get(agent.agent_kind)
+        if registry is None or agent not in registry:
+            return False
+        del registry[agent]
+        self.active[agent.agent_kind] -= 1
+        return True
+
+    def agents(self, kind):
+        """Get active agents of a kind in creation order."""
+        return list(self.registries.get(kind, ()))
+
+    def stats(self):
+        """Get active, arrived and total counts for cars and pedestrians."""
+        return {
+            "active_cars": self.active["car"],
+            "arrived_cars": self.arrived["car"],
+            "total_cars": self.total["car"],
+            "active_pedestrians": self.active["pedestrian"],
+            "arrived_pedestrians": self.arrived["pedestrian"],
+            "total_pedestrians": self.total["pedestrian"],
+        }
@@ -0,0 +1,142 @@
+import heapq
+
+INFINITY = float("inf")
+
+class DStarLite:
+    """Incremental D* Lite planner towards a fixed goal on a CellGraph.
+
+    The search runs backwards from the goal, so a car can move and report
+    changed cell costs, and the next plan only repairs the affected part
+    of the search instead of starting over.
+    """
+
+    def __init__(self, graph, goal_id):
+        """Initialize search state with the goal as the only open cell."""
+        self.graph = graph
+        self.goal_id = goal_id
+        self.start_id = None
+        self.key_modifier = 0
+        self.cell_costs = {}
+        self.g = {}
+        self.rhs = {goal_id: 0}
+        self.expansions = 0
+        self._open_set = []
+        self._open_keys = {}
+        self._push(goal_id)
+
+    def heuristic(self, cell_a, cell_b):
+        """Calculate Manhattan distance between two cell ids."""
+        ax, ay = divmod(cell_a, self.graph.height)
+        bx, by = divmod(cell_b, self.graph.height)
+        return abs(ax - bx) + abs(ay - by)
+
+    def edge_cost(self, source_id, target_id):
+        """Cost of moving into target, one step plus any extra cost set on it."""
+        return 1 + self.cell_costs.get(target_id, 0)
+
+    def set_cell_cost(self, cell_id, extra_cost):
+        """Change the extra cost of entering a cell and repair affected cells."""
+        if self.cell_costs.get(cell_id, 0) == extra_cost:
+            return
+
+        if extra_cost:
+            self.cell_costs[cell_id] = extra_cost
+        else:
+            self.cell_costs.pop(cell_id, None)
+
+        for source_id in self.graph.predecessors(cell_id):
+            self._update_vertex(source_id)
+
+    def plan(self, start_id):
+        """Repair the search for the current start, returning cell ids after it or None."""
+        if self.start_id is not None:
+            self.key_modifier += self.heuristic(self.start_id, start_id)
+        self.start_id = start_id
+
+        self._compute_shortest_path()
+
+        if self.g.get(start_id, INFINITY) == INFINITY:
+            return None
+
+        path = []
+        cell_id = start_id
+        visited = {start_id}
+        while cell_id != self.goal_id:
+            best_id = None
+            best_cost = INFINITY
+            for neighbor_id in self.graph.neighbors(cell_id):
+                cost = self.edge_cost(cell_id, neighbor_id) + self.g.get(neighbor_id, INFINITY)
+                if cost < best_cost:
+                    best_id = neighbor_id
+                    best_cost = cost
+
+            if best_id is None or best_id in visited:
+                return None
+
+            visited.add(best_id)
+            path.append(best_id)
+            cell_id = best_id
+
+        return path
+
+    def _calculate_key(self, cell_id):
+        """Calculate priority key of a cell."""
+        best = min(self.g.get(cell_id, INFINITY), self.rhs.get(cell_id, INFINITY))
+        start_distance = self.heuristic(self.start_id, cell_id) if self.start_id is not None else 0
+        return (best + start_distance + self.key_modifier, best)
+
+    def _push(self, cell_id):
+        """Insert or reprioritize a cell in the open set."""
+        key = self._calculate_key(cell_id)
+        self._open_keys[cell_id] = key
+        heapq.heappush(self._open_set, (key, cell_id))
+
+    def _top(self):
+        """Get the smallest live open entry, discarding stale heap entries."""
+        while self._open_set:
+            key, cell_id = self._open_set[0]
+            if self._open_keys.get(cell_id) == key:
+                return key, cell_id
+            heapq.heappop(self._open_set)
+        return (INFINITY, INFINITY), None
+
+    def _update_vertex(self, cell_id):
+        """Recompute rhs of a cell from its successors and fix its open set membership."""
+        if cell_id != self.goal_id:
+            self.rhs[cell_id] = min(
+                (self.edge_cost(cell_id, neighbor_id) + self.g.get(neighbor_id, INFINITY)
+                 for neighbor_id in self.graph.neighbors(cell_id)),
+                default=INFINITY,
+            )
+
+        self._open_keys.pop(cell_id, None)
+        if self.g.get(cell_id, INFINITY) != self.rhs.get(cell_id, INFINITY):
+            self._push(cell_id)
+
+    def _compute_shortest_path(self):
+        """Expand cells until the start is locally consistent."""
+        start_id = self.start_id
+        while True:
+            top_key, cell_id = self._top()
+            start_g = self.g.get(start_id, INFINITY)
+            start_rhs = self.rhs.get(start_id, INFINITY)
+            if cell_id is None or (top_key >= self._calculate_key(start_id) and start_rhs == start_g):
+                return
+
+            heapq.heappop(self._open_set)
+            new_key = self._calculate_key(cell_id)
+            if top_key < new_key:
+                self._push(cell_id)
+                continue
+
+            del self._open_keys[cell_id]
+            self.expansions += 1
+            if self.g.get(cell_id, INFINITY) > self.rhs.get(cell_id, INFINITY):
+                self.g[cell_id] = self.rhs[cell_id]
+                for source_id in self.graph.predecessors(cell_id):
+                    self._update_vertex(source_id)
+            else:
+                self.g[cell_id] = INFINITY
+                self._update_vertex(cell_id)
+                for source_id in self.graph.predecessors(cell_id):
+                    self._update_vertex(source_id)
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from itertools import count
+import heapq
+
+class EventQueue:
+    """Discrete-event priority queue of timed model events.
+
+    Events are (time, kind, payload) entries kept in a heap and fired in
+    time order, and in scheduling order when times are equal. Firing an
+    event calls every subscriber of its kind with the payload; publish
+    notifies subscribers right away without scheduling anything.
+    """
+
+    def __init__(self):
+        """Initialize an empty queue at time 0."""
+        self.now = 0
+        self.subscribers = defaultdict(list)
+        self._heap = []
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, time, kind, payload=None):
+        """Schedule an event of a kind to fire at time."""
+        heapq.heappush(self._heap, (time, next(self._sequence), kind, payload))
+
+    def subscribe(self, kind, handler):
+        """Call handler with the payload of every event of a kind."""
+        self.subscribers[kind].append(handler)
+
+    def publish(self, kind, payload=None):
+        """Notify every subscriber of a kind now."""
+        for handler in self.subscribers[kind]:
+            handler(payload)
+
+    def next_time(self):
+        """Get the time of the earliest pending event, or None."""
+        return self._heap[0][0] if self._heap else None
+
+    def run_until(self, time):
+        """Fire every event due at or before time, in order, and get how many fired."""
+        fired = 0
+        while self._heap and self._heap[0][0] <= time:
+            event_time, _, kind, payload = heapq.heappop(self._heap)
+            self.now = event_time
+            self.publish(kind, payload)
+            fired += 1
+        self.now = time
+        return fired
@@ -0,0 +1,474 @@
+from mesa import Agent
+from .agent import Car, MainState, NavigatingState
+from .tiles import ROAD_DIRECTIONS
+import numpy as np
+
+MAIN_STATES = [MainState.ACTIVE, MainState.ARRIVED]
+NAVIGATING_STATES = [
+    None,
+    NavigatingState.MOVING,
+    NavigatingState.WAITING_TRAFFIC_LIGHT,
+    NavigatingState.AVOIDING_COLLISION,
+    NavigatingState.BLOCKED,
+    NavigatingState.PLANNING_ROUTE,
+]
+MAIN_STATE_CODES = {state: code for code, state in enumerate(MAIN_STATES)}
+NAVIGATING_STATE_CODES = {state: code for code, state in enumerate(NAVIGATING_STATES)}
+ORIENTATION_CODES = {direction: code for code, direction in enumerate(ROAD_DIRECTIONS) if direction}
+
+MOVING = NAVIGATING_STATE_CODES[NavigatingState.MOVING]
+WAITING_TRAFFIC_LIGHT = NAVIGATING_STATE_CODES[NavigatingState.WAITING_TRAFFIC_LIGHT]
+AVOIDING_COLLISION = NAVIGATING_STATE_CODES[NavigatingState.AVOIDING_COLLISION]
+BLOCKED = NAVIGATING_STATE_CODES[NavigatingState.BLOCKED]
+PLANNING_ROUTE = NAVIGATING_STATE_CODES[NavigatingState.PLANNING_ROUTE]
+
+# Orientation code for each (dx, dy) a car can move by
+ORIENTATION_BY_OFFSET = {
+    (0, 1): ORIENTATION_CODES["Up"],
+    (0, -1): ORIENTATION_CODES["Down"],
+    (-1, 0): ORIENTATION_CODES["Left"],
+    (1, 0): ORIENTATION_CODES["Right"],
+}
+
+# Conflict resolution status of a car in one step
+NOT_CANDIDATE = 0
+UNDECIDED = 1
+MOVES = 2
+STAYS = 3
+
+NO_RANK = np.iinfo(np.int64).max
+
+class FastCarEngine:
+    """Structure-of-arrays engine that steps every car in vectorized passes.
+
+    Car state lives in NumPy arrays indexed by slot. Each step the engine
+    shuffles the model's agents exactly like AgentSet.shuffle_do, turns
+    every car's position in that order into a rank, and then runs perceive
+    and decide for the whole fleet at once. Cars that want to enter the
+    same or an occupied cell are resolved by rank, which reproduces what
+    sequential Car.step calls would see. Other agents such as pedestrians
+    are still stepped one by one at their rank, with car moves applied up
+    to that point, so under a fixed seed the run matches the per-agent
+    engine step for step.
+    """
+
+    SLOT_ARRAYS = {
+        "cell": (np.int32, -1),
+        "destination": (np.int32, -1),
+        "main_state": (np.int8, 0),
+        "navigating_state": (np.int8, 0),
+        "waiting_time": (np.int32, 0),
+        "orientation": (np.int8, 0),
+        "steps_taken": (np.int32, 0),
+        "recalculate_path_threshold": (np.int32, 0),
+        "path_start": (np.int32, 0),
+        "path_length": (np.int32, 0),
+        "path_index": (np.int32, 0),
+    }
+
+    def __init__(self, model, capacity=64):
+        """Initialize empty car arrays for a model whose map is already loaded."""
+        self.model = model
+        self.width, self.height = model.grid.dimensions
+        self.cells_by_id = [model.grid[divmod(cell_id, self.height)] for cell_id in range(self.width * self.height)]
+        self.road_direction = model.tiles.road_direction.ravel()
+        self.traffic_light = model.tiles.traffic_light.ravel()
+
+        self.cars = [None] * capacity
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        for name, (dtype, fill) in self.SLOT_ARRAYS.items():
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+
+        self.path_buffer = np.zeros(1024, dtype=np.int32)
+        self.path_buffer_size = 0
+        self._steps_by_type = {}
+
+    def allocate(self, car):
+        """Reserve a slot for a new car and return it."""
+        if not self.free_slots:
+            self._grow()
+        slot = self.free_slots.pop()
+        self.cars[slot] = car
+        for name, (dtype, fill) in self.SLOT_ARRAYS.items():
+            getattr(self, name)[slot] = fill
+        return slot
+
+    def release(self, slot):
+        """Free the slot of a car that left the simulation."""
+        self.cars[slot] = None
+        self.cell[slot] = -1
+        self.path_length[slot] = 0
+        self.free_slots.append(slot)
+
+    def _grow(self):
+        """Double slot capacity."""
+        capacity = len(self.cars)
+        self.cars.extend([None] * capacity)
+        self.free_slots.extend(range(2 * capacity - 1, capacity - 1, -1))
+        for name, (dtype, fill) in self.SLOT_ARRAYS.items():
+            array = getattr(self, name)
+            grown = np.full(2 * capacity, fill, dtype=dtype)
+            grown[:capacity] = array
+            setattr(self, name, grown)
+
+    def cell_id(self, coordinate):
+        """Convert an (x, y) coordinate to a flat cell id."""
+        return coordinate[0] * self.height + coordinate[1]
+
+    def coordinate(self, cell_id):
+        """Convert a flat cell id back to an (x, y) coordinate."""
+        return divmod(int(cell_id), self.height)
+
+    def get_path(self, slot):
+        """Get the stored path of a car as cell ids."""
+        start = self.path_start[slot]
+        return self.path_buffer[start:start + self.path_length[slot]].tolist()
+
+    def set_path(self, slot, path):
+        """Store a car path, given as cell ids, in the shared path buffer."""
+        length = len(path)
+        if self.path_buffer_size + length > len(self.path_buffer):
+            self._compact_paths(length)
+        start = self.path_buffer_size
+        self.path_buffer[start:start + length] = path
+        self.path_buffer_size += length
+        self.path_start[slot] = start
+        self.path_length[slot] = length
+
+    def _compact_paths(self, extra_length):
+        """Drop paths of released cars from the buffer, growing it if still too small."""
+        live_slots = [slot for slot, car in enumerate(self.cars) if car is not None and self.path_length[slot]]
+        live_length = int(self.path_length[live_slots].sum()) if live_slots else 0
+        capacity = len(self.path_buffer)
+        while live_length + extra_length > capacity // 2:
+            capacity *= 2
+
+        compacted = np.zeros(capacity, dtype=np.int32)
+        offset = 0
+        for slot in live_slots:
+            start, length = self.path_start[slot], self.path_length[slot]
+            compacted[offset:offset + length] = self.path_buffer[start:start + length]
+            self.path_start[slot] = offset
+            offset += length
+
+        self.path_buffer = compacted
+        self.path_buffer_size = offset
+
+    def plan_route(self, slot):
+        """Plan a car's route from its cell with the model router, as calculate_path_to_destination does."""
+        if self.destination[slot] < 0:
+            return False
+
+        route = self.model.find_route(self.model.road_graph, int(self.cell[slot]), int(self.destination[slot]))
+        if route is None:
+            self.path_length[slot] = 0
+            return False
+
+        self.set_path(slot, route)
+        self.path_index[slot] = 0
+        return True
+
+    def _steps(self, agent):
+        """Check if an agent overrides Agent.step, so fixed tiles are not dispatched."""
+        agent_type = type(agent)
+        if agent_type not in self._steps_by_type:
+            self._steps_by_type[agent_type] = agent_type.step is not Agent.step
+        return self._steps_by_type[agent_type]
+
+    def step(self):
+        """Step every agent once, cars in bulk and everything else in shuffled order."""
+        model = self.model
+        agents = list(model.agents)
+        model.random.shuffle(agents)
+
+        rank = np.full(len(self.cars), NO_RANK, dtype=np.int64)
+        car_slots = []
+        car_ranks = []
+        others = []
+        for position, agent in enumerate(agents):
+            if type(agent) is FastCar:
+                car_slots.append(agent.engine_slot)
+                car_ranks.append(position)
+            elif self._steps(agent):
+                others.append((position, agent))
+
+        slots = np.array(car_slots, dtype=np.int64)
+        rank[slots] = car_ranks
+        events = self._decide(slots, rank)
+
+        # Apply car moves and arrivals in rank order, stepping other agents at their own rank
+        event_index = 0
+        for position, agent in others:
+            while event_index < len(events) and events[event_index][0] < position:
+                self._apply_event(events[event_index])
+                event_index += 1
+            agent.step()
+        for event in events[event_index:]:
+            self._apply_event(event)
+
+    def _decide(self, slots, rank):
+        """Run perceive and decide for all cars, returning (rank, slot, next cell) events."""
+        if not slots.size:
+            return []
+
+        car_rank = rank[slots]
+        cell = self.cell[slots]
+        destination = self.destination[slots]
+        path_index = self.path_index[slots]
+        path_length = self.path_length[slots]
+
+        arriving = (destination >= 0) & (cell == destination)
+        replanning = ~arriving & (
+            (path_index >= path_length) | (self.waiting_time[slots] >= self.recalculate_path_threshold[slots])
+        )
+        deciding = ~arriving & ~replanning
+
+        next_cell = np.full(len(slots), -1, dtype=np.int64)
+        next_cell[deciding] = self.path_buffer[self.path_start[slots[deciding]] + path_index[deciding]]
+        safe_next_cell = np.maximum(next_cell, 0)
+
+        blocked = deciding & (
+            (self.road_direction[cell] == 0) | (next_cell < 0) | (self.road_direction[safe_next_cell] == 0)
+        )
+        light_id = self.traffic_light[safe_next_cell]
+        red_light = (
+            deciding & ~blocked & (light_id >= 0)
+            & ~self.model.traffic_light_controller.state[np.maximum(light_id, 0)]
+        )
+        candidates = deciding & ~blocked & ~red_light
+
+        if np.bincount(cell, minlength=1).max() > 1:
+            moves = self._resolve_sequential(cell, next_cell, car_rank, arriving, candidates)
+        else:
+            moves = self._resolve_vectorized(cell, next_cell, car_rank, arriving, candidates)
+        avoiding = candidates & ~moves
+
+        waiting = blocked | red_light | avoiding
+        self.navigating_state[slots[blocked]] = BLOCKED
+        self.navigating_state[slots[red_light]] = WAITING_TRAFFIC_LIGHT
+        self.navigating_state[slots[avoiding]] = AVOIDING_COLLISION
+        self.waiting_time[slots[waiting]] += 1
+
+        moving_slots = slots[moves]
+        self.navigating_state[moving_slots] = MOVING
+        self.waiting_time[moving_slots] = 0
+        self.steps_taken[moving_slots] += 1
+        self.path_index[moving_slots] += 1
+        moving_from = cell[moves]
+        moving_to = next_cell[moves]
+        offsets = zip(
+            (moving_to // self.height - moving_from // self.height).tolist(),
+            (moving_to % self.height - moving_from % self.height).tolist(),
+        )
+        self.orientation[moving_slots] = [ORIENTATION_BY_OFFSET.get(offset, 0) for offset in offsets]
+        self.cell[moving_slots] = moving_to
+
+        metrics = self.model.metrics
+        if metrics is not None and replanning.any():
+            blocked_replans = int(np.count_nonzero(self.waiting_time[slots[replanning]] >= self.recalculate_path_threshold[slots[replanning]]))
+            metrics.inc("traffic_replans_total", blocked_replans, kind="car", reason="blocked")
+            metrics.inc("traffic_replans_total", int(np.count_nonzero(replanning)) - blocked_replans, kind="car", reason="no_path")
+
+        for slot in slots[replanning].tolist():
+            self.navigating_state[slot] = PLANNING_ROUTE
+            self.waiting_time[slot] = 0
+            if not self.plan_route(slot):
+                self.navigating_state[slot] = BLOCKED
+                self.waiting_time[slot] = 1
+
+        events = list(zip(car_rank[moves].tolist(), moving_slots.tolist(), moving_to.tolist()))
+        events.extend((event_rank, slot, -1) for event_rank, slot in zip(car_rank[arriving].tolist(), slots[arriving].tolist()))
+        events.sort()
+        return events
+
+    def _resolve_vectorized(self, cell, next_cell, car_rank, arriving, candidates):
+        """Decide which candidate cars move when each cell holds at most one car.
+
+        A candidate can enter its next cell if the car standing there left
+        earlier in the step, and the first such candidate by rank wins the
+        cell. The earliest undecided candidate can always be settled, so
+        the loop runs at most as many passes as the longest queue.
+        """
+        count = len(cell)
+        occupant = np.full(self.width * self.height, -1, dtype=np.int64)
+        occupant[cell] = np.arange(count)
+
+        status = np.where(candidates, UNDECIDED, NOT_CANDIDATE)
+        while True:
+            undecided = np.flatnonzero(status == UNDECIDED)
+            if not undecided.size:
+                break
+
+            target = next_cell[undecided]
+            target_occupant = occupant[target]
+            has_occupant = target_occupant >= 0
+            safe_occupant = np.maximum(target_occupant, 0)
+            occupant_rank = car_rank[safe_occupant]
+            occupant_status = status[safe_occupant]
+
+            # The car in the target cell has not acted yet
+            still_there = has_occupant & (occupant_rank > car_rank[undecided])
+            status[undecided[still_there]] = STAYS
+
+            leaves = has_occupant & (arriving[safe_occupant] | (occupant_status == MOVES))
+            never_leaves = has_occupant & ~leaves & (occupant_status != UNDECIDED)
+            settled = ~still_there & (~has_occupant | leaves | never_leaves)
+            if not settled.any():
+                continue
+
+            leave_rank = np.where(has_occupant, occupant_rank, -1)
+            can_enter = settled & ~never_leaves & (car_rank[undecided] > leave_rank)
+            first_rank = np.full(len(occupant), NO_RANK, dtype=np.int64)
+            np.minimum.at(first_rank, target[can_enter], car_rank[undecided][can_enter])
+            wins = can_enter & (car_rank[undecided] == first_rank[target])
+
+            status[undecided[settled & wins]] = MOVES
+            status[undecided[settled & ~wins]] = STAYS
+
+        return status == MOVES
+
+    def _resolve_sequential(self, cell, next_cell, car_rank, arriving, candidates):
+        """Decide which candidate cars move by replaying them one by one in rank order."""
+        occupancy = np.bincount(cell, minlength=self.width * self.height)
+        moves = np.zeros(len(cell), dtype=bool)
+        for index in np.argsort(car_rank).tolist():
+            if arriving[index]:
+                occupancy[cell[index]] -= 1
+            elif candidates[index] and occupancy[next_cell[index]] == 0:
+                occupancy[cell[index]] -= 1
+                occupancy[next_cell[index]] += 1
+                moves[index] = True
+        return moves
+
+    def _apply_event(self, event):
+        """Move a car's mesa cell, or remove a car that reached its destination."""
+        _, slot, next_cell = event
+        car = self.cars[slot]
+        if next_cell < 0:
+            car.transition_to_arrived()
+        else:
+            FastCar.cell.fset(car, self.cells_by_id[next_cell])
+
+class FastCar(Car):
+    """Car whose state is stored in the model's FastCarEngine arrays.
+
+    Behaves like Car, so isinstance checks, the grid and the API keep
+    working, while the engine steps it in bulk.
+    """
+
+    def __init__(self, model, cell, destination=None):
+        """Initialize car in a new engine slot."""
+        self.engine = model.car_engine
+        self.engine_slot = self.engine.allocate(self)
+        self._detached_state = None
+        super().__init__(model, cell, destination)
+
+    def _get(self, name):
+        """Read a state array entry, or the saved value once the car left the engine."""
+        if self._detached_state is not None:
+            return self._detached_state[name]
+        return getattr(self.engine, name)[self.engine_slot]
+
+    def _set(self, name, value):
+        """Write a state array entry."""
+        getattr(self.engine, name)[self.engine_slot] = value
+
+    @property
+    def cell(self):
+        return self._mesa_cell
+
+    @cell.setter
+    def cell(self, cell):
+        Car.cell.fset(self, cell)
+        if self._detached_state is None:
+            self._set("cell", self.engine.cell_id(cell.coordinate) if cell is not None else -1)
+
+    @property
+    def destination(self):
+        return self._destination
+
+    @destination.setter
+    def destination(self, destination):
+        self._destination = destination
+        self._set("destination", self.engine.cell_id(destination.cell.coordinate) if destination is not None else -1)
+
+    @property
+    def main_state(self):
+        return MAIN_STATES[self._get("main_state")]
+
+    @main_state.setter
+    def main_state(self, state):
+        self._set("main_state", MAIN_STATE_CODES[state])
+
+    @property
+    def navigating_state(self):
+        return NAVIGATING_STATES[self._get("navigating_state")]
+
+    @navigating_state.setter
+    def navigating_state(self, state):
+        self._set("navigating_state", NAVIGATING_STATE_CODES[state])
+
+    @property
+    def orientation(self):
+        return ROAD_DIRECTIONS[self._get("orientation")]
+
+    @orientation.setter
+    def orientation(self, orientation):
+        self._set("orientation", ORIENTATION_CODES[orientation])
+
+    @property
+    def waiting_time(self):
+        return int(self._get("waiting_time"))
+
+    @waiting_time.setter
+    def waiting_time(self, waiting_time):
+        self._set("waiting_time", waiting_time)
+
+    @property
+    def steps_taken(self):
+        return int(self._get("steps_taken"))
+
+    @steps_taken.setter
+    def steps_taken(self, steps_taken):
+        self._set("steps_taken", steps_taken)
+
+    @property
+    def recalculate_path_threshold(self):
+        return int(self._get("recalculate_path_threshold"))
+
+    @recalculate_path_threshold.setter
+    def recalculate_path_threshold(self, threshold):
+        self._set("recalculate_path_threshold", threshold)
+
+    @property
+    def path_index(self):
+        return int(self._get("path_index"))
+
+    @path_index.setter
+    def path_index(self, path_index):
+        self._set("path_index", path_index)
+
+    @property
+    def path(self):
+        if self._detached_state is not None:
+            return self._detached_state["path"]
+        return [self.engine.coordinate(cell_id) for cell_id in self.engine.get_path(self.engine_slot)]
+
+    @path.setter
+    def path(self, path):
+        self.engine.set_path(self.engine_slot, [self.engine.cell_id(coordinate) for coordinate in path])
+
+    def calculate_path_to_destination(self):
+        """Calculate shortest path over the compiled road graph, stored in the engine."""
+        return self.engine.plan_route(self.engine_slot)
+
+    def transition_to_arrived(self):
+        """Transition to arrived state and hand the slot back to the engine."""
+        super().transition_to_arrived()
+        self._detached_state = {
+            name: getattr(self.engine, name)[self.engine_slot] for name in self.engine.SLOT_ARRAYS
+        }
+        self._detached_state["path"] = [
+            self.engine.coordinate(cell_id) for cell_id in self.engine.get_path(self.engine_slot)
+        ]
+        self.engine.release(self.engine_slot)
@@ -0,0 +1,194 @@
+from collections import deque
+from itertools import chain
+import heapq
+import numpy as np
+
+from .tiles import ROAD_DIRECTION_CODES
+
+DIRECTION_OFFSETS = [
+    ("Up", (0, 1)),
+    ("Down", (0, -1)),
+    ("Left", (-1, 0)),
+    ("Right", (1, 0))
+]
+
+OPPOSING_DIRECTION = {
+    "Up": "Down",
+    "Down": "Up",
+    "Left": "Right",
+    "Right": "Left"
+}
+
+def compile_road_graph(road_direction):
+    """Compile a road direction layer into the one-way road network graph."""
+    width, height = road_direction.shape
+    xs, ys = np.nonzero(road_direction)
+
+    neighbor_lists = [[] for _ in range(width * height)]
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        neighbors = neighbor_lists[x * height + y]
+        for movement_direction, (dx, dy) in DIRECTION_OFFSETS:
+            next_x, next_y = x + dx, y + dy
+            if 0 <= next_x < width and 0 <= next_y < height:
+                next_code = road_direction[next_x, next_y]
+                if next_code and next_code != ROAD_DIRECTION_CODES[OPPOSING_DIRECTION[movement_direction]]:
+                    neighbors.append(next_x * height + next_y)
+
+    return CellGraph("road", width, height, neighbor_lists)
+
+def compile_walk_graph(walkable):
+    """Compile a walkable layer into the pedestrian graph."""
+    width, height = walkable.shape
+    xs, ys = np.nonzero(walkable)
+
+    neighbor_lists = [[] for _ in range(width * height)]
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        neighbors = neighbor_lists[x * height + y]
+        for _, (dx, dy) in DIRECTION_OFFSETS:
+            next_x, next_y = x + dx, y + dy
+            if 0 <= next_x < width and 0 <= next_y < height and walkable[next_x, next_y]:
+                neighbors.append(next_x * height + next_y)
+
+    return CellGraph("walk", width, height, neighbor_lists)
+
+class CellGraph:
+    """Static directed graph over grid cells stored as CSR neighbour arrays."""
+
+    def __init__(self, name, width, height, neighbor_lists=None, indptr=None, indices=None):
+        """Build CSR arrays from one neighbour id list per cell id, or take prebuilt CSR arrays."""
+        self.name = name
+        self.width = width
+        self.height = height
+        self.size = width * height
+
+        if neighbor_lists is not None:
+            indptr = np.zeros(self.size + 1, dtype=np.int32)
+            np.cumsum([len(neighbors) for neighbors in neighbor_lists], out=indptr[1:])
+            indices = np.fromiter(
+                chain.from_iterable(neighbor_lists), dtype=np.int32, count=int(indptr[-1])
+            )
+        self.indptr = indptr
+        self.indices = indices
+
+        # Plain Python view of the CSR rows, indexing NumPy scalars in the search loop is slow
+        self.adjacency = [
+            tuple(self.indices[self.indptr[cell_id]:self.indptr[cell_id + 1]].tolist())
+            for cell_id in range(self.size)
+        ]
+        self.distance_fields = {}
+        self._reverse_adjacency = None
+
+    def cell_id(self, coordinate):
+        """Convert an (x, y) coordinate to a flat cell id."""
+        return coordinate[0] * self.height + coordinate[1]
+
+    def coordinate(self, cell_id):
+        """Convert a flat cell id back to an (x, y) coordinate."""
+        return divmod(cell_id, self.height)
+
+    def neighbors(self, cell_id):
+        """Get neighbour cell ids reachable from a cell."""
+        return self.adjacency[cell_id]
+
+    def predecessors(self, cell_id):
+        """Get cell ids that have an edge into a cell."""
+        if self._reverse_adjacency is None:
+            reverse_adjacency = [[] for _ in range(self.size)]
+            for source_id, neighbors in enumerate(self.adjacency):
+                for neighbor_id in neighbors:
+                    reverse_adjacency[neighbor_id].append(source_id)
+            self._reverse_adjacency = [tuple(sources) for sources in reverse_adjacency]
+        return self._reverse_adjacency[cell_id]
+
+    def compile_distance_field(self, goal_id):
+        """Build and store the reverse BFS distance field towards a goal cell."""
+        if goal_id not in self.distance_fields:
+            self.distance_fields[goal_id] = DistanceField(self, goal_id)
+        return self.distance_fields[goal_id]
+
+class DistanceField:
+    """Hop distance and next-hop tables from every cell towards one goal cell."""
+
+    def __init__(self, graph, goal_id):
+        """Run a reverse breadth-first search from the goal over the graph."""
+        self.goal_id = goal_id
+        self.distance = np.full(graph.size, -1, dtype=np.int32)
+        self.next_hop = np.full(graph.size, -1, dtype=np.int32)
+
+        self.distance[goal_id] = 0
+        frontier = deque([goal_id])
+        while frontier:
+            cell_id = frontier.popleft()
+            for source_id in graph.predecessors(cell_id):
+                if self.distance[source_id] < 0:
+                    self.distance[source_id] = self.distance[cell_id] + 1
+                    self.next_hop[source_id] = cell_id
+                    frontier.append(source_id)
+
+        self._next_hop = self.next_hop.tolist()
+
+    def path_from(self, start_id):
+        """Follow next-hops from start to goal, returning cell ids after the start or None."""
+        if self.distance[start_id] < 0:
+            return None
+
+        path = []
+        cell_id = start_id
+        while cell_id != self.goal_id:
+            cell_id = self._next_hop[cell_id]
+            path.append(cell_id)
+        return path
+
+def astar(graph, start_id, goal_id):
+    """Find a shortest path with A*, returning cell ids after the start or None."""
+    return astar_search(graph, start_id, goal_id)[0]
+
+def astar_search(graph, start_id, goal_id):
+    """Run A*, returning the path as astar does and the number of expanded nodes."""
+    adjacency = graph.adjacency
+    height = graph.height
+    goal_x, goal_y = divmod(goal_id, height)
+
+    counter = 0
+    open_set = [(0, counter, start_id)]
+    counter += 1
+
+    came_from = {}
+    g_score = {start_id: 0}
+    open_set_hash = {start_id}
+
+    while open_set:
+        _, _, current_id = heapq.heappop(open_set)
+        open_set_hash.discard(current_id)
+
+        if current_id == goal_id:
+            return reconstruct_path(came_from, current_id, start_id), counter - len(open_set)
+
+        tentative_g_score = g_score[current_id] + 1
+
+        for neighbor_id in adjacency[current_id]:
+            if neighbor_id not in g_score or tentative_g_score < g_score[neighbor_id]:
+                came_from[neighbor_id] = current_id
+                g_score[neighbor_id] = tentative_g_score
+
+                if neighbor_id not in open_set_hash:
+                    neighbor_x, neighbor_y = divmod(neighbor_id, height)
+                    f_score = tentative_g_score + abs(neighbor_x - goal_x) + abs(neighbor_y - goal_y)
+                    heapq.heappush(open_set, (f_score, counter, neighbor_id))
+                    counter += 1
+                    open_set_hash.add(neighbor_id)
+
+    return None, counter
+
+def reconstruct_path(came_from, current_id, start_id):
+    """Reconstruct path from start to current, excluding the start cell."""
+    path = [current_id]
+    while current_id in came_from:
+        current_id = came_from[current_id]
+        path.append(current_id)
+    path.reverse()
+
+    if path and path[0] == start_id:
+        path.pop(0)
+
+    return path
@@ -0,0 +1,243 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .graph import CellGraph, compile_road_graph, compile_walk_graph
+from .tiles import ROAD_DIRECTIONS, ROAD_DIRECTION_CODES
+
+# Bump when the artifact layout or the parsing rules change, so stale artifacts are ignored
+COMPILED_MAP_VERSION = 1
+
+CITY_FILES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "city_files")
+DEFAULT_DICTIONARY_PATH = os.path.join(CITY_FILES_DIR, "mapDictionary.json")
+DEFAULT_CACHE_DIR = os.path.join(CITY_FILES_DIR, ".compiled")
+
+# Compiled maps kept in memory, least recently used first
+MAX_COMPILED_MAPS = 8
+
+# Tile kinds, one per map character class, in the order CityModel creates their agents
+ROAD = 0
+TRAFFIC_LIGHT = 1
+OBSTACLE = 2
+CAR_DESTINATION = 3
+PEDESTRIAN_DESTINATION = 4
+SIDEWALK = 5
+PEDESTRIAN_WALK = 6
+
+TILE_KINDS = {
+    "v": ROAD, "^": ROAD, ">": ROAD, "<": ROAD,
+    "S": TRAFFIC_LIGHT, "s": TRAFFIC_LIGHT,
+    "#": OBSTACLE,
+    "D": CAR_DESTINATION,
+    "P": PEDESTRIAN_DESTINATION,
+    "B": SIDEWALK,
+    "C": PEDESTRIAN_WALK,
+}
+
+# Arrays stored in the .npz artifact
+ARRAY_NAMES = (
+    "shape", "tile_x", "tile_y", "tile_kind", "tile_direction", "light_state", "light_period", "light_group",
+    "road_direction", "walkable", "road_indptr", "road_indices", "walk_indptr", "walk_indices",
+)
+
+_compiled_maps = OrderedDict()
+
+
+def _detect_road_direction(column_index, row_index, map_lines, row_content, map_dictionary):
+    """Detect road direction by checking neighboring road tiles."""
+    neighbor_positions = [
+        (column_index-1, row_index, "<"),
+        (column_index+1, row_index, ">"),
+        (column_index, row_index-1, "^"),
+        (column_index, row_index+1, "v"),
+    ]
+
+    for neighbor_column, neighbor_row, expected_road_character in neighbor_positions:
+        if 0 <= neighbor_column < len(row_content) and 0 <= neighbor_row < len(map_lines):
+            neighbor_character = map_lines[neighbor_row][neighbor_column] if neighbor_column < len(map_lines[neighbor_row]) else None
+            if neighbor_character == expected_road_character:
+                return map_dictionary[expected_road_character]
+
+    return "Left"
+
+
+class CompiledMap:
+    """A parsed city map as flat NumPy tables, ready to be turned into agents.
+
+    Tiles are stored in the order the map text lists them, which is the
+    order CityModel creates their agents, so models built from a compiled
+    map are identical to models built from the text. Road and walk graphs
+    are compiled once and shared by every model that uses the map.
+    """
+
+    def __init__(self, arrays):
+        """Wrap the arrays of a compiled map."""
+        self.arrays = arrays
+        self.width, self.height = (int(size) for size in arrays["shape"])
+        self._road_graph = None
+        self._walk_graph = None
+
+    def tiles(self):
+        """Yield (x, y, kind, direction name, light state, light period, light group) per tile."""
+        arrays = self.arrays
+        columns = zip(
+            arrays["tile_x"].tolist(), arrays["tile_y"].tolist(), arrays["tile_kind"].tolist(),
+            arrays["tile_direction"].tolist(), arrays["light_state"].tolist(),
+            arrays["light_period"].tolist(), arrays["light_group"].tolist(),
+        )
+        for x, y, kind, direction, light_state, light_period, light_group in columns:
+            yield x, y, kind, ROAD_DIRECTIONS[direction], light_state, light_period, chr(light_group) if light_group else None
+
+    @property
+    def road_graph(self):
+        """Get the shared road graph of this map."""
+        if self._road_graph is None:
+            self._road_graph = CellGraph(
+                "road", self.width, self.height,
+                indptr=self.arrays["road_indptr"], indices=self.arrays["road_indices"],
+            )
+        return self._road_graph
+
+    @property
+    def walk_graph(self):
+        """Get the shared walk graph of this map."""
+        if self._walk_graph is None:
+            self._walk_graph = CellGraph(
+                "walk", self.width, self.height,
+                indptr=self.arrays["walk_indptr"], indices=self.arrays["walk_indices"],
+            )
+        return self._walk_graph
+
+
+def compile_map(map_text, map_dictionary):
+    """Parse map text with a character dictionary into the arrays of a CompiledMap."""
+    map_lines = map_text.splitlines(keepends=True)
+    width = len(map_lines[0])
+    height = len(map_lines)
+
+    rows = []
+    road_direction = np.zeros((width, height), dtype=np.int8)
+    walkable = np.zeros((width, height), dtype=bool)
+
+    for row_index, row_content in enumerate(map_lines):
+        for column_index, cell_character in enumerate(row_content):
+            kind = TILE_KINDS.get(cell_character)
+            if kind is None:
+                continue
+
+            x, y = column_index, height - row_index - 1
+            direction = None
+            light_state = False
+            light_period = 0
+            light_group = 0
+
+            if kind == ROAD:
+                direction = map_dictionary[cell_character]
+            elif kind in (TRAFFIC_LIGHT, CAR_DESTINATION, PEDESTRIAN_WALK):
+                direction = _detect_road_direction(column_index, row_index, map_lines, row_content, map_dictionary)
+            if kind == TRAFFIC_LIGHT:
+                light_state = cell_character != "S"
+                light_period = int(map_dictionary[cell_character])
+                light_group = ord(cell_character)
+
+            if direction is not None:
+                road_direction[x, y] = ROAD_DIRECTION_CODES[direction]
+            if kind in (TRAFFIC_LIGHT, PEDESTRIAN_DESTINATION, SIDEWALK, PEDESTRIAN_WALK):
+                walkable[x, y] = True
+
+            rows.append((x, y, kind, ROAD_DIRECTION_CODES.get(direction, 0), light_state, light_period, light_group))
+
+    road_graph = compile_road_graph(road_direction)
+    walk_graph = compile_walk_graph(walkable)
+    columns = list(zip(*rows)) if rows else [()] * 7
+
+    return {
+        "shape": np.array([width, height], dtype=np.int32),
+        "tile_x": np.array(columns[0], dtype=np.int32),
+        "tile_y": np.array(columns[1], dtype=np.int32),
+        "tile_kind": np.array(columns[2], dtype=np.uint8),
+        "tile_direction": np.array(columns[3], dtype=np.int8),
+        "light_state": np.array(columns[4], dtype=bool),
+        "light_period": np.array(columns[5], dtype=np.int32),
+        "light_group": np.array(columns[6], dtype=np.uint8),
+        "road_direction": road_direction,
+        "walkable": walkable,
+        "road_indptr": road_graph.indptr,
+        "road_indices": road_graph.indices,
+        "walk_indptr": walk_graph.indptr,
+        "walk_indices": walk_graph.indices,
+    }
+
+
+def map_key(map_text, dictionary_text):
+    """Get the content hash that identifies a compiled map."""
+    digest = hashlib.sha256()
+    digest.update(str(COMPILED_MAP_VERSION).encode())
+    for text in (dictionary_text, map_text):
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_map(map_path, dictionary_path=DEFAULT_DICTIONARY_PATH, cache_dir=DEFAULT_CACHE_DIR):
+    """Get the compiled form of a map file, from memory, the disk cache, or by compiling it.
+
+    Artifacts are keyed by the content hash of the map and the dictionary,
+    so editing either file compiles a new artifact. A cache_dir of None
+    skips the disk cache; an unwritable one is ignored. The last
+    MAX_COMPILED_MAPS compiled maps are also kept in memory.
+    """
+    with open(map_path) as map_file:
+        map_text = map_file.read()
+    return load_map_text(map_text, dictionary_path, cache_dir)
+
+
+def load_map_text(map_text, dictionary_path=DEFAULT_DICTIONARY_PATH, cache_dir=None):
+    """Get the compiled form of map text, such as a generated map, cached like load_map.
+
+    Artifacts are only written to disk when a cache_dir is given, so one-off
+    generated maps do not pile up next to the map files.
+    """
+    with open(dictionary_path) as dictionary_file:
+        dictionary_text = dictionary_file.read()
+
+    key = map_key(map_text, dictionary_text)
+    compiled = _compiled_maps.get(key)
+    if compiled is not None:
+        _compiled_maps.move_to_end(key)
+        return compiled
+
+    arrays = None
+    artifact_path = os.path.join(cache_dir, f"{key}.npz") if cache_dir else None
+    if artifact_path and os.path.exists(artifact_path):
+        try:
+            with np.load(artifact_path) as artifact:
+                arrays = {name: artifact[name] for name in ARRAY_NAMES}
+        except (OSError, KeyError, ValueError):
+            arrays = None
+
+    if arrays is None:
+        arrays = compile_map(map_text, json.loads(dictionary_text))
+        if artifact_path:
+            _save_artifact(artifact_path, arrays)
+
+    compiled = _compiled_maps[key] = CompiledMap(arrays)
+    while len(_compiled_maps) > MAX_COMPILED_MAPS:
+        _compiled_maps.popitem(last=False)
+    return compiled
+
+
+def _save_artifact(artifact_path, arrays):
+    """Write an artifact atomically, ignoring cache directories that cannot be written."""
+    try:
+        os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(artifact_path), suffix=".npz")
+        with os.fdopen(file_descriptor, "wb") as artifact:
+            np.savez(artifact, **arrays)
+        os.replace(temporary_path, artifact_path)
+    except OSError:
+        pass
@@ -0,0 +1,170 @@
+import random
+
+# Map characters of mapDictionary.json
+ROAD_CHARACTERS = {"Up": "^", "Down": "v", "Left": "<", "Right": ">"}
+VERTICAL_LIGHT = "S"
+HORIZONTAL_LIGHT = "s"
+OBSTACLE = "#"
+CAR_DESTINATION = "D"
+PEDESTRIAN_DESTINATION = "P"
+SIDEWALK = "B"
+PEDESTRIAN_WALK = "C"
+
+# Lanes per road corridor, and the smallest block that fits lights, crosswalks and destinations
+CORRIDOR_WIDTH = 2
+MIN_BLOCK_SIZE = 5
+
+
+class GeneratedMap:
+    """A procedurally generated city map and the spawn points derived from it.
+
+    text is in the character format of mapDictionary.json, so the map can be
+    saved to city_files and loaded like the hand-drawn ones. Spawn points
+    are (x, y) model coordinates.
+    """
+
+    def __init__(self, text, car_spawn_positions, pedestrian_spawn_positions, seed=None):
+        """Initialize a generated map."""
+        self.text = text
+        self.car_spawn_positions = car_spawn_positions
+        self.pedestrian_spawn_positions = pedestrian_spawn_positions
+        self.seed = seed
+
+    @property
+    def width(self):
+        """Get the number of map characters per row."""
+        return self.text.index("\n")
+
+    @property
+    def height(self):
+        """Get the number of map rows."""
+        return self.text.count("\n")
+
+    def save(self, path):
+        """Write the map text to a file."""
+        with open(path, "w") as map_file:
+            map_file.write(self.text)
+
+
+def _split_blocks(size, block_size, rng):
+    """Split one map axis into corridor and block spans, as (start, length) pairs of the blocks."""
+    block_count = (size - CORRIDOR_WIDTH) // (block_size + CORRIDOR_WIDTH)
+    if block_count < 1 or block_size < MIN_BLOCK_SIZE:
+        raise ValueError(
+            f"A map axis of {size} cells does not fit blocks of {block_size} cells, "
+            f"use at least {MIN_BLOCK_SIZE + 2 * CORRIDOR_WIDTH} cells and a block size of at least {MIN_BLOCK_SIZE}"
+        )
+
+    lengths = [block_size] * block_count
+    spare = size - CORRIDOR_WIDTH * (block_count + 1) - block_size * block_count
+    for index in rng.choices(range(block_count), k=spare):
+        lengths[index] += 1
+
+    blocks = []
+    start = CORRIDOR_WIDTH
+    for length in lengths:
+        blocks.append((start, length))
+        start += length + CORRIDOR_WIDTH
+    return blocks
+
+
+def generate_city(width, height, block_size=8, seed=None, car_destination_rate=0.5, pedestrian_destination_rate=0.5):
+    """Generate a width x height city of one-way two-lane roads around sidewalk-ringed blocks.
+
+    The outer ring road runs counterclockwise and inner corridors alternate
+    direction, so every road cell can reach every other. Every approach to a
+    crossing has a light, "S" on vertical and "s" on horizontal corridors,
+    which pedestrians also use to cross; longer inner segments get a
+    mid-block crosswalk. Each block gets a car destination with probability
+    car_destination_rate and a pedestrian destination with probability
+    pedestrian_destination_rate. Blocks are at least block_size cells, with
+    the cells left over spread between them by seed.
+    """
+    rng = random.Random(seed)
+    block_columns = _split_blocks(width, block_size, rng)
+    block_rows = _split_blocks(height, block_size, rng)
+
+    # Corridors as (start, direction), from the left and top ring to the right and bottom ring
+    vertical_corridors = [(0, "Down")] + [
+        (x - CORRIDOR_WIDTH, "Up" if index % 2 else "Down") for index, (x, _) in enumerate(block_columns[1:], 1)
+    ] + [(width - CORRIDOR_WIDTH, "Up")]
+    horizontal_corridors = [(0, "Left")] + [
+        (row - CORRIDOR_WIDTH, "Right" if index % 2 else "Left") for index, (row, _) in enumerate(block_rows[1:], 1)
+    ] + [(height - CORRIDOR_WIDTH, "Right")]
+
+    cells = [[OBSTACLE] * width for _ in range(height)]
+
+    for x, direction in vertical_corridors:
+        for row in cells:
+            row[x:x + CORRIDOR_WIDTH] = ROAD_CHARACTERS[direction] * CORRIDOR_WIDTH
+    for row_index, direction in horizontal_corridors:
+        for row in cells[row_index:row_index + CORRIDOR_WIDTH]:
+            row[:] = ROAD_CHARACTERS[direction] * width
+
+    # Ring corners take the direction of the corridor leaving them
+    for corner_x, corner_row, direction in [
+        (0, 0, "Down"),
+        (0, height - CORRIDOR_WIDTH, "Right"),
+        (width - CORRIDOR_WIDTH, height - CORRIDOR_WIDTH, "Up"),
+        (width - CORRIDOR_WIDTH, 0, "Left"),
+    ]:
+        for row in cells[corner_row:corner_row + CORRIDOR_WIDTH]:
+            row[corner_x:corner_x + CORRIDOR_WIDTH] = ROAD_CHARACTERS[direction] * CORRIDOR_WIDTH
+
+    # Lights two cells before every crossing and crosswalks halfway along inner segments
+    for x, direction in vertical_corridors:
+        inner = 0 < x < width - CORRIDOR_WIDTH
+        for row_start, length in block_rows:
+            downstream = row_start + length - 1 if direction == "Down" else row_start
+            step = 1 if direction == "Down" else -1
+            light_row = downstream - step
+            crosswalk_row = downstream - step * (length - length // 2)
+            cells[light_row][x:x + CORRIDOR_WIDTH] = VERTICAL_LIGHT * CORRIDOR_WIDTH
+            if inner and length >= 6:
+                cells[crosswalk_row][x:x + CORRIDOR_WIDTH] = PEDESTRIAN_WALK * CORRIDOR_WIDTH
+
+    for row_index, direction in horizontal_corridors:
+        inner = 0 < row_index < height - CORRIDOR_WIDTH
+        for x_start, length in block_columns:
+            downstream = x_start + length - 1 if direction == "Right" else x_start
+            step = 1 if direction == "Right" else -1
+            light_x = downstream - step
+            crosswalk_x = downstream - step * (length - length // 2)
+            for row in cells[row_index:row_index + CORRIDOR_WIDTH]:
+                row[light_x] = HORIZONTAL_LIGHT
+                if inner and length >= 6:
+                    row[crosswalk_x] = PEDESTRIAN_WALK
+
+    pedestrian_spawn_positions = []
+    for row_start, block_height in block_rows:
+        for x_start, block_width in block_columns:
+            row_end = row_start + block_height - 1
+            x_end = x_start + block_width - 1
+            for row_index in range(row_start, row_end + 1):
+                for x in range(x_start, x_end + 1):
+                    if row_index in (row_start, row_end) or x in (x_start, x_end):
+                        cells[row_index][x] = SIDEWALK
+
+            if rng.random() < car_destination_rate:
+                # A destination on the top or bottom sidewalk, off crosswalks, with the sidewalk detouring around it
+                edge_row, detour_row, road_row = rng.choice([(row_start, row_start + 1, row_start - 1), (row_end, row_end - 1, row_end + 1)])
+                x = rng.choice([x for x in range(x_start + 2, x_end - 1) if cells[road_row][x] != PEDESTRIAN_WALK])
+                cells[edge_row][x] = CAR_DESTINATION
+                cells[detour_row][x - 1:x + 2] = SIDEWALK * 3
+
+            if rng.random() < pedestrian_destination_rate:
+                cells[rng.randint(row_start + 1, row_end - 1)][rng.choice([x_start, x_end])] = PEDESTRIAN_DESTINATION
+
+            pedestrian_spawn_positions.append((x_start, height - 1 - row_start))
+
+    # Cars spawn on the outer lane of the ring, halfway along every block
+    car_spawn_positions = []
+    for x_start, length in block_columns:
+        car_spawn_positions.append((x_start + length // 2, height - 1))
+        car_spawn_positions.append((x_start + length // 2, 0))
+    for row_start, length in block_rows:
+        car_spawn_positions.append((0, height - 1 - (row_start + length // 2)))
+        car_spawn_positions.append((width - 1, height - 1 - (row_start + length // 2)))
+
+    text = "".join("".join(row) + "\n" for row in cells)
+    return GeneratedMap(text, car_spawn_positions, pedestrian_spawn_positions, seed)
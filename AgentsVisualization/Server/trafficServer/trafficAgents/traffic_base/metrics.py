@@ -0,0 +1,171 @@
+from bisect import bisect_left
+from collections import defaultdict
+from time import perf_counter
+
+from .agent import Car, Pedestrian
+
+# Upper bounds of the histogram buckets, besides +Inf
+STEP_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+EXPANSION_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+ROUTE_LENGTH_BUCKETS = (1, 5, 10, 20, 40, 80, 160)
+
+# Metric name -> (type, help) of everything SimulationMetrics exports
+METRIC_FAMILIES = {
+    "traffic_steps_total": ("counter", "Model steps taken."),
+    "traffic_idle_steps_skipped_total": ("counter", "Idle model steps skipped by CityModel.skip_idle."),
+    "traffic_step_seconds": ("histogram", "Wall time of one model step."),
+    "traffic_model_phase_seconds_total": ("counter", "Time spent in each phase of CityModel.step."),
+    "traffic_agent_phase_seconds_total": ("counter", "Time spent in each phase of Car.step and Pedestrian.step."),
+    "traffic_agent_steps_total": ("counter", "Agent steps taken."),
+    "traffic_parked_turns_total": ("counter", "Agent turns skipped while parked by the wake scheduler."),
+    "traffic_replans_total": ("counter", "Route replans by agent kind and reason."),
+    "traffic_astar_searches_total": ("counter", "A* searches run after route cache misses."),
+    "traffic_astar_expansions": ("histogram", "Nodes expanded by one A* search."),
+    "traffic_route_length": ("histogram", "Cells in a found route."),
+    "traffic_routes_unreachable_total": ("counter", "Route searches that found no path."),
+    "traffic_route_cache_hits_total": ("counter", "Route cache hits."),
+    "traffic_route_cache_misses_total": ("counter", "Route cache misses."),
+    "traffic_agents_active": ("gauge", "Active agents by kind."),
+    "traffic_agents_navigating": ("gauge", "Active agents by kind and navigating state."),
+}
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram with fixed buckets."""
+
+    def __init__(self, buckets):
+        """Initialize empty buckets."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record one value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        """Get the bucket, sum and count samples of this histogram."""
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append((f"{name}_bucket", dict(labels, le=le), cumulative))
+        samples.append((f"{name}_sum", labels, self.sum))
+        samples.append((f"{name}_count", labels, self.count))
+        return samples
+
+
+class SimulationMetrics:
+    """Counters, timers and histograms of one CityModel.
+
+    The model only collects them when built with metrics=True, in which case
+    it spawns the instrumented agent classes below and routes through an
+    instrumented route finder. Without metrics no instrumented code runs.
+    Gauges such as agents per navigating state are computed when samples
+    are read, not on every step.
+    """
+
+    def __init__(self, model):
+        """Initialize empty metrics for a model."""
+        self.model = model
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter."""
+        self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, name, value, buckets, **labels):
+        """Record a value in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def samples(self):
+        """Get every sample as (metric name, labels, value) tuples."""
+        samples = [(name, dict(labels), value) for (name, labels), value in self.counters.items()]
+        for (name, labels), histogram in self.histograms.items():
+            samples.extend(histogram.samples(name, dict(labels)))
+
+        route_cache = self.model.route_cache
+        samples.append(("traffic_route_cache_hits_total", {}, route_cache.hits))
+        samples.append(("traffic_route_cache_misses_total", {}, route_cache.misses))
+
+        for kind in ("car", "pedestrian"):
+            agents = self.model.counters.agents(kind)
+            samples.append(("traffic_agents_active", {"kind": kind}, len(agents)))
+            states = defaultdict(int)
+            for agent in agents:
+                states[agent.navigating_state.value] += 1
+            for state, count in sorted(states.items()):
+                samples.append(("traffic_agents_navigating", {"kind": kind, "state": state}, count))
+        return samples
+
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    """Format labels in Prometheus text syntax."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+def render_prometheus(samples, families=METRIC_FAMILIES):
+    """Render samples in the Prometheus text exposition format, grouped by family."""
+    by_family = defaultdict(list)
+    for name, labels, value in samples:
+        family = name
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[: -len(suffix)] in families:
+                family = name[: -len(suffix)]
+        by_family[family].append((name, labels, value))
+
+    lines = []
+    for family in sorted(by_family):
+        metric_type, description = families.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for name, labels, value in by_family[family]:
+            lines.append(f"{name}{_format_labels(labels)} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedStep:
+    """Agent step that times perceive, decide and act and counts replans."""
+
+    def step(self):
+        """Execute agent step: perceive, decide, act, recording phase times."""
+        metrics = self.model.metrics
+        started = perf_counter()
+        perception = self.perceive_environment()
+        perceived = perf_counter()
+        action = self.decide_action(perception)
+        decided = perf_counter()
+        if action == 'replan':
+            metrics.inc("traffic_replans_total", kind=self.agent_kind, reason=self.replan_reason)
+        self.execute_action(action, perception)
+        acted = perf_counter()
+
+        kind = self.agent_kind
+        metrics.inc("traffic_agent_steps_total", kind=kind)
+        metrics.inc("traffic_agent_phase_seconds_total", perceived - started, kind=kind, phase="perceive")
+        metrics.inc("traffic_agent_phase_seconds_total", decided - perceived, kind=kind, phase="decide")
+        metrics.inc("traffic_agent_phase_seconds_total", acted - decided, kind=kind, phase="act")
+
+
+class InstrumentedCar(InstrumentedStep, Car):
+    """Car whose steps are recorded in the model metrics."""
+
+
+class InstrumentedPedestrian(InstrumentedStep, Pedestrian):
+    """Pedestrian whose steps are recorded in the model metrics."""
@@ -1,45 +1,99 @@
 from mesa import Model
 from mesa.experimental.cell_space import OrthogonalMooreGrid
 from .agent import *
-import json
+from .graph import compile_road_graph, compile_walk_graph, astar, astar_search
+from .route_cache import RouteCache, MISSING
+from .tiles import TileLayers
+from .map_compiler import load_map, load_map_text, CITY_FILES_DIR, ROAD, TRAFFIC_LIGHT, OBSTACLE, CAR_DESTINATION, PEDESTRIAN_DESTINATION, SIDEWALK, PEDESTRIAN_WALK
+from .map_generator import GeneratedMap
+from .occupancy import OccupancyGrid
+from .traffic_lights import TrafficLightController, LIGHTS_CHANGED
+from .events import EventQueue
+from .fast_engine import FastCarEngine, FastCar
+from .counters import AgentCounters
+from .wake_scheduler import WakeScheduler
+from .metrics import SimulationMetrics, InstrumentedCar, InstrumentedPedestrian, STEP_SECONDS_BUCKETS, EXPANSION_BUCKETS, ROUTE_LENGTH_BUCKETS
+from time import perf_counter
+import numpy as np
 import os
+import warnings
 
 class CityModel(Model):
     """City traffic simulation model."""
 
-    def _detect_road_direction_from_neighbors(self, column_index, row_index, map_lines, row_content, map_character_dictionary):
-        """Detect road direction by checking neighboring road tiles."""
-        neighbor_positions = [
-            (column_index-1, row_index, "<"),
-            (column_index+1, row_index, ">"),
-            (column_index, row_index-1, "^"),
-            (column_index, row_index+1, "v"),
+    def _spawn_positions(self, preferred_positions, mask):
+        """Keep the preferred spawn positions that fall on mask, else use the mask cell nearest each map corner."""
+        width, height = mask.shape
+        positions = [
+            (x, y) for x, y in preferred_positions
+            if 0 <= x < width and 0 <= y < height and mask[x, y]
         ]
-        
-        for neighbor_column, neighbor_row, expected_road_character in neighbor_positions:
-            if 0 <= neighbor_column < len(row_content) and 0 <= neighbor_row < len(map_lines):
-                neighbor_character = map_lines[neighbor_row][neighbor_column] if neighbor_column < len(map_lines[neighbor_row]) else None
-                if neighbor_character == expected_road_character:
-                    return map_character_dictionary[expected_road_character]
-        
-        return "Left"
+        if positions:
+            return positions
+
+        xs, ys = np.nonzero(mask)
+        for corner_x, corner_y in [(0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)]:
+            nearest = int(np.argmin(np.abs(xs - corner_x) + np.abs(ys - corner_y)))
+            position = (int(xs[nearest]), int(ys[nearest]))
+            if position not in positions:
+                positions.append(position)
+        return positions
+
+    def _compile_road_graph(self):
+        """Compile the one-way road network into a static cell graph."""
+        return compile_road_graph(self.tiles.road_direction)
 
-    def __init__(self, initial_agents_count, seed=42, spawn_interval=10):
-        """Initialize city model."""
+    def _compile_walk_graph(self):
+        """Compile sidewalks, pedestrian walks and traffic lights into a static cell graph."""
+        return compile_walk_graph(self.tiles.walkable)
+
+    def __init__(self, initial_agents_count, seed=42, spawn_interval=10, routing="astar", route_cache_size=1024, replanning="restart", engine="agents", max_cars=10, max_pedestrians=5, map_file="2024_modified.txt", light_timings=None, metrics=False, wake_scheduling=True):
+        """Initialize city model.
+
+        routing selects how agents find paths: "astar" searches per agent,
+        "field" follows per-destination distance fields built at init.
+        Found routes are shared between agents through an LRU route cache.
+        replanning selects what blocked cars do: "restart" searches again from
+        scratch, "incremental" repairs a per-car D* Lite search that treats
+        cells occupied by cars as congested. The "fast" engine only supports
+        "restart" and falls back to it, with a warning, when asked for
+        "incremental".
+        map_file is a path or a file name in city_files, loaded through the
+        compiled map cache, or a GeneratedMap whose spawn points replace the
+        default ones. light_timings maps a
+        light group (its map character) to a period, or to a (period, offset)
+        pair, overriding the periods of mapDictionary.json.
+        metrics=True records step, routing and agent phase metrics in
+        self.metrics; otherwise self.metrics is None and nothing is recorded.
+        wake_scheduling parks cars and pedestrians waiting at lights or behind
+        other agents until what blocks them changes, without changing the
+        run; it applies to the "agents" engine only.
+        """
         super().__init__(seed=seed)
 
-        
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        traffic_agents_dir = os.path.dirname(current_dir)
-        
-        city_files_dir = os.path.join(traffic_agents_dir, "city_files")
-        
-        map_dict_path = os.path.join(city_files_dir, "mapDictionary.json")
-        map_character_dictionary = json.load(open(map_dict_path))
+        if isinstance(map_file, GeneratedMap):
+            compiled_map = load_map_text(map_file.text)
+        else:
+            compiled_map = load_map(os.path.join(CITY_FILES_DIR, map_file))
 
         self.num_agents = initial_agents_count
+        self.routing = routing
+        self.route_cache = RouteCache(route_cache_size)
+        self.graph_version = 0
+        self.replanning = replanning
+        self.congestion_penalty = 10
+        self.engine = engine
+        if self.engine == "fast" and self.replanning != "restart":
+            warnings.warn(f"The fast engine only supports restart replanning, ignoring replanning={replanning!r}", stacklevel=2)
+            self.replanning = "restart"
+        self.counters = AgentCounters()
+        self.metrics = SimulationMetrics(self) if metrics else None
+        self.wake_scheduler = WakeScheduler(self) if wake_scheduling and engine == "agents" else None
         self.traffic_lights = []
+        self.events = EventQueue()
+        self.traffic_light_controller = TrafficLightController(self.events)
+        if self.wake_scheduler is not None:
+            self.events.subscribe(LIGHTS_CHANGED, self.wake_scheduler.lights_changed)
         self.car_destinations = []
         self.pedestrian_destinations = []
         
@@ -54,105 +108,229 @@ class CityModel(Model):
         self.pedestrian_spawn_positions = [
             (10, 16)
         ]
-        self.max_cars = 10
-        self.max_pedestrians = 5
+        if isinstance(map_file, GeneratedMap):
+            self.car_spawn_positions = list(map_file.car_spawn_positions)
+            self.pedestrian_spawn_positions = list(map_file.pedestrian_spawn_positions)
+        self.max_cars = max_cars
+        self.max_pedestrians = max_pedestrians
 
-        map_file_path = os.path.join(city_files_dir, "2024_modified.txt")
-        with open(map_file_path) as map_file:
-            map_lines = map_file.readlines()
-            self.width = len(map_lines[0])
-            self.height = len(map_lines)
+        self.width = compiled_map.width
+        self.height = compiled_map.height
 
-            self.grid = OrthogonalMooreGrid(
-                [self.width, self.height], capacity=100, torus=False
-            )
+        self.grid = OrthogonalMooreGrid(
+            [self.width, self.height], capacity=100, torus=False
+        )
+        self.tiles = TileLayers(self.width, self.height)
+        self.occupancy = OccupancyGrid(self.width, self.height)
 
-            for row_index, row_content in enumerate(map_lines):
-                for column_index, cell_character in enumerate(row_content):
+        for x, y, kind, road_direction, light_state, light_period, light_group in compiled_map.tiles():
+            grid_cell = self.grid[(x, y)]
 
-                    grid_cell = self.grid[(column_index, self.height - row_index - 1)]
+            if kind == ROAD:
+                self.tiles.add_road(Road(self, grid_cell, road_direction))
 
-                    if cell_character in ["v", "^", ">", "<"]:
-                        agent = Road(self, grid_cell, map_character_dictionary[cell_character])
+            elif kind == TRAFFIC_LIGHT:
+                self.tiles.add_road(Road(self, grid_cell, road_direction))
 
-                    elif cell_character in ["S", "s"]:
-                        road_direction = self._detect_road_direction_from_neighbors(
-                            column_index, row_index, map_lines, row_content, map_character_dictionary
-                        )
-                        Road(self, grid_cell, road_direction)
-                        
-                        agent = Traffic_Light(
-                            self,
-                            grid_cell,
-                            False if cell_character == "S" else True,
-                            int(map_character_dictionary[cell_character]),
-                        )
-                        self.traffic_lights.append(agent)
-
-                    elif cell_character == "#":
-                        agent = Obstacle(self, grid_cell)
-
-                    elif cell_character == "D":
-                        road_direction = self._detect_road_direction_from_neighbors(
-                            column_index, row_index, map_lines, row_content, map_character_dictionary
-                        )
-                        Road(self, grid_cell, road_direction)
-                        
-                        agent = Destination(self, grid_cell)
-                        self.car_destinations.append(agent)
-
-                    elif cell_character == "P":
-                        agent = Sidewalk(self, grid_cell)
-                        pedestrian_destination = Destination(self, grid_cell)
-                        self.pedestrian_destinations.append(pedestrian_destination)
-
-                    elif cell_character == "B":
-                        agent = Sidewalk(self, grid_cell)
-
-                    elif cell_character == "C":
-                        road_direction = self._detect_road_direction_from_neighbors(
-                            column_index, row_index, map_lines, row_content, map_character_dictionary
-                        )
-                        Road(self, grid_cell, road_direction)
-                        
-                        agent = PedestrianWalk(self, grid_cell, road_direction)
+                agent = Traffic_Light(self, grid_cell, light_state, light_period, group=light_group)
+                self.traffic_lights.append(agent)
+                self.tiles.add_traffic_light(agent)
+
+            elif kind == OBSTACLE:
+                self.tiles.add_obstacle(Obstacle(self, grid_cell))
+
+            elif kind == CAR_DESTINATION:
+                self.tiles.add_road(Road(self, grid_cell, road_direction))
+
+                agent = Destination(self, grid_cell)
+                self.car_destinations.append(agent)
+                self.tiles.add_destination(agent)
+
+            elif kind == PEDESTRIAN_DESTINATION:
+                self.tiles.add_sidewalk(Sidewalk(self, grid_cell))
+                pedestrian_destination = Destination(self, grid_cell)
+                self.pedestrian_destinations.append(pedestrian_destination)
+                self.tiles.add_destination(pedestrian_destination)
+
+            elif kind == SIDEWALK:
+                self.tiles.add_sidewalk(Sidewalk(self, grid_cell))
+
+            elif kind == PEDESTRIAN_WALK:
+                self.tiles.add_road(Road(self, grid_cell, road_direction))
+                self.tiles.add_pedestrian_walk(PedestrianWalk(self, grid_cell, road_direction))
+
+        for group, timing in (light_timings or {}).items():
+            period, offset = timing if isinstance(timing, (tuple, list)) else (timing, 0)
+            self.traffic_light_controller.set_group_timing(group, period, offset)
+
+        self.car_spawn_positions = self._spawn_positions(self.car_spawn_positions, self.tiles.road_direction != 0)
+        self.pedestrian_spawn_positions = self._spawn_positions(self.pedestrian_spawn_positions, self.tiles.walkable)
+
+        self._build_routing(compiled_map.road_graph, compiled_map.walk_graph)
+
+        if self.engine == "fast":
+            self.car_engine = FastCarEngine(self)
+            self.car_class = FastCar
+        else:
+            self.car_engine = None
+            self.car_class = InstrumentedCar if metrics else Car
+        self.pedestrian_class = InstrumentedPedestrian if metrics else Pedestrian
+
+        if metrics:
+            self.find_route = self._find_route_instrumented
 
         self.running = True
 
+    def register_agent(self, agent):
+        """Register an agent with the model, except static tiles, which live in self.tiles."""
+        if not isinstance(agent, StaticTile):
+            super().register_agent(agent)
+
+    def deregister_agent(self, agent):
+        """Deregister an agent from the model; static tiles were never registered."""
+        if not isinstance(agent, StaticTile):
+            super().deregister_agent(agent)
+
+    def _build_routing(self, road_graph=None, walk_graph=None):
+        """Set up movement graphs, compiling them unless given, and in field routing mode destination distance fields."""
+        self.road_graph = road_graph if road_graph is not None else self._compile_road_graph()
+        self.walk_graph = walk_graph if walk_graph is not None else self._compile_walk_graph()
+
+        if self.routing == "field":
+            for destination in self.car_destinations:
+                self.road_graph.compile_distance_field(self.road_graph.cell_id(destination.cell.coordinate))
+            for destination in self.pedestrian_destinations:
+                self.walk_graph.compile_distance_field(self.walk_graph.cell_id(destination.cell.coordinate))
+
+    def rebuild_graphs(self):
+        """Recompile routing after the map changes, invalidating cached routes."""
+        self.graph_version += 1
+        self.route_cache.clear()
+        self._build_routing()
+
+    def find_route(self, graph, start_id, goal_id):
+        """Find a route as cell ids after the start, or None if the goal is unreachable."""
+        route_key = (graph.name, start_id, goal_id, self.graph_version)
+        route = self.route_cache.get(route_key, MISSING)
+        if route is not MISSING:
+            return route
+
+        if self.routing == "field" and goal_id in graph.distance_fields:
+            route = graph.distance_fields[goal_id].path_from(start_id)
+        else:
+            route = astar(graph, start_id, goal_id)
+
+        self.route_cache.put(route_key, route)
+        return route
+
+    def _find_route_instrumented(self, graph, start_id, goal_id):
+        """Find a route as find_route does, recording searches, expansions and route lengths."""
+        route_key = (graph.name, start_id, goal_id, self.graph_version)
+        route = self.route_cache.get(route_key, MISSING)
+        if route is not MISSING:
+            return route
+
+        if self.routing == "field" and goal_id in graph.distance_fields:
+            route = graph.distance_fields[goal_id].path_from(start_id)
+        else:
+            route, expansions = astar_search(graph, start_id, goal_id)
+            self.metrics.inc("traffic_astar_searches_total", graph=graph.name)
+            self.metrics.observe("traffic_astar_expansions", expansions, EXPANSION_BUCKETS, graph=graph.name)
+
+        if route is None:
+            self.metrics.inc("traffic_routes_unreachable_total", graph=graph.name)
+        else:
+            self.metrics.observe("traffic_route_length", len(route), ROUTE_LENGTH_BUCKETS, graph=graph.name)
+
+        self.route_cache.put(route_key, route)
+        return route
+
     def step(self):
         """Advance model by one step."""
-        self.agents.shuffle_do("step")
-        
+        if self.metrics is None:
+            self._run_events()
+            self._step_agents()
+            self._spawn()
+            return
+
+        started = perf_counter()
+        self._run_events()
+        events_done = perf_counter()
+        self._step_agents()
+        agents_done = perf_counter()
+        self._spawn()
+        spawned = perf_counter()
+
+        self.metrics.inc("traffic_steps_total")
+        self.metrics.observe("traffic_step_seconds", spawned - started, STEP_SECONDS_BUCKETS)
+        self.metrics.inc("traffic_model_phase_seconds_total", events_done - started, phase="events")
+        self.metrics.inc("traffic_model_phase_seconds_total", agents_done - events_done, phase="agents")
+        self.metrics.inc("traffic_model_phase_seconds_total", spawned - agents_done, phase="spawn")
+
+    def _run_events(self):
+        """Fire every timed event due by the current step, such as traffic light switches."""
+        self.events.run_until(self.steps)
+
+    def skip_idle(self, max_steps):
+        """Advance up to max_steps steps in which nothing but timed events can happen, and get how many were skipped.
+
+        A step is idle when no car or pedestrian is in the model and no spawn
+        is due, so such a step only fires events and advances the spawn
+        timer. Skipping it gives the same run as stepping through it.
+        """
+        if len(self.agents) or max_steps <= 0:
+            return 0
+
+        if self.max_cars > 0 or self.max_pedestrians > 0:
+            skipped = min(max_steps, self.spawn_interval - self.spawn_timer - 1)
+        else:
+            skipped = max_steps
+        if skipped <= 0:
+            return 0
+
+        self.steps += skipped
+        self.events.run_until(self.steps)
+        self.spawn_timer = (self.spawn_timer + skipped) % self.spawn_interval if self.spawn_interval > 0 else 0
+
+        if self.metrics is not None:
+            self.metrics.inc("traffic_steps_total", skipped)
+            self.metrics.inc("traffic_idle_steps_skipped_total", skipped)
+        return skipped
+
+    def _step_agents(self):
+        """Step every agent once."""
+        if self.car_engine is not None:
+            self.car_engine.step()
+        elif self.wake_scheduler is not None:
+            self.agents.shuffle_do(self.wake_scheduler.step_agent)
+        else:
+            self.agents.shuffle_do("step")
+
+    def _spawn(self):
+        """Spawn a car and a pedestrian every spawn_interval steps while under the caps."""
         self.spawn_timer += 1
         
         if self.spawn_timer >= self.spawn_interval:
             self.spawn_timer = 0
             
-            active_cars_count = sum(1 for agent in self.agents if isinstance(agent, Car) and agent.is_active())
-            active_pedestrians_count = sum(1 for agent in self.agents if isinstance(agent, Pedestrian) and agent.is_active())
-            
-            if active_cars_count < self.max_cars:
+            if self.counters.active["car"] < self.max_cars:
                 car_spawn_position = self.random.choice(self.car_spawn_positions)
                 car_spawn_cell = self.grid[car_spawn_position]
                 
-                cars_at_spawn_location = [agent for agent in car_spawn_cell.agents if isinstance(agent, Car)]
-                
-                if not cars_at_spawn_location:
+                if not self.occupancy.has_car(car_spawn_position):
                     if self.car_destinations:
                         selected_destination = self.random.choice(self.car_destinations)
-                        Car(self, car_spawn_cell, destination=selected_destination)
+                        self.car_class(self, car_spawn_cell, destination=selected_destination)
                 
                     else:
-                        Car(self, car_spawn_cell, destination=None)
+                        self.car_class(self, car_spawn_cell, destination=None)
                         
             
-            if active_pedestrians_count < self.max_pedestrians:
+            if self.counters.active["pedestrian"] < self.max_pedestrians:
                 pedestrian_spawn_position = self.random.choice(self.pedestrian_spawn_positions)
                 pedestrian_spawn_cell = self.grid[pedestrian_spawn_position]
                 
-                pedestrians_at_spawn_location = [agent for agent in pedestrian_spawn_cell.agents if isinstance(agent, Pedestrian)]
-                
-                if not pedestrians_at_spawn_location:
+                if not self.occupancy.has_pedestrian(pedestrian_spawn_position):
                     if self.pedestrian_destinations:
                         selected_destination = self.random.choice(self.pedestrian_destinations)
-                        Pedestrian(self, pedestrian_spawn_cell, destination=selected_destination)
\ No newline at end of file
+                        self.pedestrian_class(self, pedestrian_spawn_cell, destination=selected_destination)
\ No newline at end of file
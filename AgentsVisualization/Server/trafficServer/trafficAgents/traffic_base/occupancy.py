@@ -0,0 +1,85 @@
+import numpy as np
+
+from .tiles import ROAD_DIRECTION_CODES
+
+# Road direction code -> (upstream x offset, upstream y offset, axis, whether the queue extends towards higher indices)
+UPSTREAM_RUNS = {
+    ROAD_DIRECTION_CODES["Up"]: (0, -1, 1, False),
+    ROAD_DIRECTION_CODES["Down"]: (0, 1, 1, True),
+    ROAD_DIRECTION_CODES["Left"]: (1, 0, 0, True),
+    ROAD_DIRECTION_CODES["Right"]: (-1, 0, 0, False),
+}
+
+class OccupancyGrid:
+    """Per-tile counts of cars and pedestrians, indexed by [x, y].
+
+    Counts are updated by the agents themselves whenever their cell changes,
+    so collision checks are a single array read instead of a scan of
+    cell.agents.
+    """
+
+    def __init__(self, width, height):
+        """Initialize empty occupancy layers for a width x height grid."""
+        self.cars = np.zeros((width, height), dtype=np.int16)
+        self.pedestrians = np.zeros((width, height), dtype=np.int16)
+
+    def has_car(self, coordinate):
+        """Check if a tile has at least one car."""
+        return self.cars[coordinate] > 0
+
+    def has_pedestrian(self, coordinate):
+        """Check if a tile has at least one pedestrian."""
+        return self.pedestrians[coordinate] > 0
+
+    def queue_length(self, coordinate, direction):
+        """Count cars queued back to back upstream of a tile, for traffic flowing in direction."""
+        x, y = coordinate
+        if direction == "Left":
+            line = self.cars[x + 1:, y]
+        elif direction == "Right":
+            line = self.cars[:x, y][::-1]
+        elif direction == "Up":
+            line = self.cars[x, :y][::-1]
+        elif direction == "Down":
+            line = self.cars[x, y + 1:]
+        else:
+            return 0
+
+        empty = np.flatnonzero(line == 0)
+        return int(empty[0]) if empty.size else line.size
+
+    def traffic_light_queues(self, tiles):
+        """Get the queue length behind every traffic light, indexed by light id.
+
+        Runs of occupied tiles are counted for the whole grid along each
+        direction at once, then read at the tile upstream of every light.
+        """
+        xs, ys = np.nonzero(tiles.traffic_light >= 0)
+        order = np.argsort(tiles.traffic_light[xs, ys])
+        xs, ys = xs[order], ys[order]
+        directions = tiles.road_direction[xs, ys]
+
+        occupied = self.cars > 0
+        width, height = occupied.shape
+        queues = np.zeros(len(xs), dtype=np.int32)
+        for code, (dx, dy, axis, towards_higher) in UPSTREAM_RUNS.items():
+            selected = np.flatnonzero(directions == code)
+            upstream_x, upstream_y = xs[selected] + dx, ys[selected] + dy
+            inside = (upstream_x >= 0) & (upstream_x < width) & (upstream_y >= 0) & (upstream_y < height)
+            if not inside.any():
+                continue
+            if towards_higher:
+                runs = _runs_towards_higher(occupied, axis)
+            else:
+                runs = np.flip(_runs_towards_higher(np.flip(occupied, axis), axis), axis)
+            queues[selected[inside]] = runs[upstream_x[inside], upstream_y[inside]]
+        return queues
+
+
+def _runs_towards_higher(occupied, axis):
+    """Count the occupied tiles in a row from every tile towards higher indices along an axis."""
+    size = occupied.shape[axis]
+    index = np.arange(size).reshape((size, 1) if axis == 0 else (1, size))
+    empty_at = np.where(occupied, size, index)
+    next_empty = np.flip(np.minimum.accumulate(np.flip(empty_at, axis), axis=axis), axis)
+    return next_empty - index
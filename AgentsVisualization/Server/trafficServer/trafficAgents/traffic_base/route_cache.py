@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+# Unreachable goals are cached as None, so lookups need a distinct miss marker
+MISSING = object()
+
+class RouteCache:
+    """Bounded LRU cache of routes keyed by (graph name, start id, goal id, graph version)."""
+
+    def __init__(self, max_size=1024):
+        """Initialize an empty cache holding at most max_size routes."""
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._routes = OrderedDict()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def __contains__(self, key):
+        return key in self._routes
+
+    def get(self, key, default=None):
+        """Get a cached route and mark it as recently used, counting hits and misses."""
+        route = self._routes.get(key, MISSING)
+        if route is MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._routes.move_to_end(key)
+        return route
+
+    def put(self, key, route):
+        """Store a route, evicting the least recently used one when full."""
+        self._routes[key] = tuple(route) if route is not None else None
+        self._routes.move_to_end(key)
+        while len(self._routes) > self.max_size:
+            self._routes.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached routes, keeping hit and miss counters."""
+        self._routes.clear()
+
+    def stats(self):
+        """Get cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._routes),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,99 @@
+from itertools import chain
+import numpy as np
+
+ROAD_DIRECTIONS = [None, "Up", "Down", "Left", "Right"]
+ROAD_DIRECTION_CODES = {direction: code for code, direction in enumerate(ROAD_DIRECTIONS) if direction}
+
+class TileLayers:
+    """Typed NumPy layers of the static map tiles, indexed by [x, y].
+
+    Layers answer "what is on this tile" with one array read. Registries
+    map layer values back to the agents for callers that need the object,
+    and are the only model-side home of static tiles, which are not in
+    model.agents.
+    """
+
+    def __init__(self, width, height):
+        """Initialize empty layers for a width x height grid."""
+        self.width = width
+        self.height = height
+        self.road_direction = np.zeros((width, height), dtype=np.int8)
+        self.walkable = np.zeros((width, height), dtype=bool)
+        self.obstacle = np.zeros((width, height), dtype=bool)
+        self.traffic_light = np.full((width, height), -1, dtype=np.int32)
+        self.destination = np.full((width, height), -1, dtype=np.int32)
+
+        self.roads = {}
+        self.sidewalks = {}
+        self.pedestrian_walks = {}
+        self.obstacles = {}
+        self.traffic_lights = []
+        self.destinations = []
+
+    def add_road(self, road):
+        """Register a road tile and its direction."""
+        coordinate = road.cell.coordinate
+        self.road_direction[coordinate] = ROAD_DIRECTION_CODES[road.direction]
+        self.roads[coordinate] = road
+
+    def add_sidewalk(self, sidewalk):
+        """Register a sidewalk tile as walkable."""
+        coordinate = sidewalk.cell.coordinate
+        self.walkable[coordinate] = True
+        self.sidewalks[coordinate] = sidewalk
+
+    def add_pedestrian_walk(self, pedestrian_walk):
+        """Register a crosswalk tile as walkable."""
+        coordinate = pedestrian_walk.cell.coordinate
+        self.walkable[coordinate] = True
+        self.pedestrian_walks[coordinate] = pedestrian_walk
+
+    def add_traffic_light(self, traffic_light):
+        """Register a traffic light tile, which pedestrians can also walk on."""
+        coordinate = traffic_light.cell.coordinate
+        self.walkable[coordinate] = True
+        self.traffic_light[coordinate] = len(self.traffic_lights)
+        self.traffic_lights.append(traffic_light)
+
+    def add_obstacle(self, obstacle):
+        """Register an obstacle tile."""
+        coordinate = obstacle.cell.coordinate
+        self.obstacle[coordinate] = True
+        self.obstacles[coordinate] = obstacle
+
+    def add_destination(self, destination):
+        """Register a car or pedestrian destination tile."""
+        self.destination[destination.cell.coordinate] = len(self.destinations)
+        self.destinations.append(destination)
+
+    def agents(self, agent_class=None):
+        """Iterate over registered tile agents, optionally only instances of agent_class."""
+        registries = chain(
+            self.roads.values(), self.sidewalks.values(), self.pedestrian_walks.values(),
+            self.obstacles.values(), self.traffic_lights, self.destinations,
+        )
+        if agent_class is None:
+            return registries
+        return (agent for agent in registries if isinstance(agent, agent_class))
+
+    def has_road(self, coordinate):
+        """Check if a tile has a road."""
+        return self.road_direction[coordinate] != 0
+
+    def is_walkable(self, coordinate):
+        """Check if a tile has a sidewalk, crosswalk or traffic light."""
+        return self.walkable[coordinate]
+
+    def road_at(self, coordinate):
+        """Get the road agent on a tile, or None."""
+        return self.roads.get(coordinate)
+
+    def traffic_light_at(self, coordinate):
+        """Get the traffic light agent on a tile, or None."""
+        light_id = self.traffic_light[coordinate]
+        return self.traffic_lights[light_id] if light_id >= 0 else None
+
+    def destination_at(self, coordinate):
+        """Get the destination agent on a tile, or None."""
+        destination_id = self.destination[coordinate]
+        return self.destinations[destination_id] if destination_id >= 0 else None
@@ -0,0 +1,126 @@
+import numpy as np
+
+from .events import EventQueue
+
+# Event kinds: a phase group's scheduled switch, and the ids of lights whose state changed
+LIGHT_FLIP = "light_flip"
+LIGHTS_CHANGED = "lights_changed"
+
+class TrafficLightController:
+    """State of every traffic light, switched by timed events.
+
+    Lights belong to named phase groups that always share timing. Each
+    group has one pending LIGHT_FLIP event in an EventQueue; when it fires,
+    every light of the group switches state at once and the next switch is
+    scheduled a period later. Nothing runs for lights between switches, and
+    time_remaining is computed from the queue's current time when read.
+    Subscribers of LIGHTS_CHANGED get the ids of lights that changed.
+    """
+
+    def __init__(self, events=None, capacity=16):
+        """Initialize an empty controller on an event queue, or on its own queue."""
+        self.events = events if events is not None else EventQueue()
+        self.events.subscribe(LIGHT_FLIP, self._flip)
+        self.count = 0
+        self.group_names = []
+        self.group_members = []
+        self.group_versions = []
+        self.state = np.zeros(capacity, dtype=bool)
+        self.period = np.ones(capacity, dtype=np.int32)
+        self.offset = np.zeros(capacity, dtype=np.int32)
+        self.group = np.zeros(capacity, dtype=np.int32)
+
+    def add(self, state, period, group=None, offset=0):
+        """Register a light and return its light id.
+
+        A light joining an existing group takes over that group's timing.
+        """
+        if self.count == len(self.state):
+            self._grow()
+
+        group_name = group if group is not None else f"light_{self.count}"
+        if group_name in self.group_names:
+            group_id = self.group_names.index(group_name)
+            first_member = self.group_members[group_id][0]
+            period = int(self.period[first_member])
+            offset = int(self.offset[first_member])
+        else:
+            group_id = len(self.group_names)
+            self.group_names.append(group_name)
+            self.group_members.append([])
+            self.group_versions.append(0)
+
+        light_id = self.count
+        self.state[light_id] = state
+        self.period[light_id] = period
+        self.offset[light_id] = offset
+        self.group[light_id] = group_id
+        self.group_members[group_id].append(light_id)
+        self.count += 1
+
+        if len(self.group_members[group_id]) == 1:
+            self._schedule(group_id)
+        return light_id
+
+    def _grow(self):
+        """Double array capacity."""
+        capacity = max(1, 2 * len(self.state))
+        for name in ("state", "period", "offset", "group"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _schedule(self, group_id):
+        """Schedule the next switch of a group, the first step after now where (step - offset) % period == 0."""
+        first_member = self.group_members[group_id][0]
+        period = int(self.period[first_member])
+        offset = int(self.offset[first_member])
+        now = self.events.now
+        self.events.schedule(now + period - (now - offset) % period, LIGHT_FLIP, (group_id, self.group_versions[group_id]))
+
+    def _flip(self, payload):
+        """Switch every light of a group and schedule its next switch, unless the event is stale."""
+        group_id, version = payload
+        if version != self.group_versions[group_id]:
+            return
+
+        members = np.array(self.group_members[group_id])
+        self.state[members] ^= True
+        self._schedule(group_id)
+        self.events.publish(LIGHTS_CHANGED, members)
+
+    def members(self, group_name):
+        """Get light ids that belong to a named phase group."""
+        return np.array(self.group_members[self.group_names.index(group_name)])
+
+    def set_group_timing(self, group_name, period, offset=0):
+        """Change period and offset of every light in a phase group, rescheduling its next switch."""
+        group_id = self.group_names.index(group_name)
+        members = self.members(group_name)
+        self.period[members] = period
+        self.offset[members] = offset
+        self.group_versions[group_id] += 1
+        self._schedule(group_id)
+
+    def set_group_state(self, group_name, state):
+        """Set the state of every light in a phase group."""
+        members = self.members(group_name)
+        self.state[members] = state
+        self.events.publish(LIGHTS_CHANGED, members)
+
+    def set_state(self, light_id, state):
+        """Set the state of one light."""
+        self.state[light_id] = state
+        self.events.publish(LIGHTS_CHANGED, [light_id])
+
+    @property
+    def time_remaining(self):
+        """Get the steps until each light's next switch, indexed by light id."""
+        period = self.period[:self.count]
+        return period - (self.events.now - self.offset[:self.count]) % period
+
+    def light_time_remaining(self, light_id):
+        """Get the steps until one light's next switch."""
+        period = int(self.period[light_id])
+        return period - (self.events.now - int(self.offset[light_id])) % period
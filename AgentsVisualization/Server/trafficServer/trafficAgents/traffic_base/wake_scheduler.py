@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from .agent import NavigatingState
+
+# Navigating states whose outcome only changes when a light or an occupied cell changes
+PARKED_STATES = (NavigatingState.WAITING_TRAFFIC_LIGHT, NavigatingState.AVOIDING_COLLISION)
+
+class WakeScheduler:
+    """Parks waiting cars and pedestrians until what blocks them can change.
+
+    An agent that ends its step waiting at a light or behind another agent
+    would repeat the same perceive and decide every step. Instead it is
+    parked on the lights it looks at and, when avoiding a collision, on its
+    next cell. While parked its turn only adds to waiting_time, exactly as
+    a repeated wait would. It runs full steps again once one of its lights
+    changes, an agent leaves its next cell, or waiting_time reaches its
+    replan threshold. Agents keep their place in the shuffled step order,
+    so runs are identical to stepping every agent.
+    """
+
+    def __init__(self, model):
+        """Initialize an empty scheduler for a model."""
+        self.model = model
+        self.parked = {}
+        self.by_light = defaultdict(set)
+        self.by_cell = defaultdict(set)
+
+    def step_agent(self, agent):
+        """Take one agent's turn: a full step, or a wait while it is parked."""
+        if agent in self.parked:
+            if agent.waiting_time < agent.recalculate_path_threshold:
+                agent.waiting_time += 1
+                if self.model.metrics is not None:
+                    self.model.metrics.inc("traffic_parked_turns_total", kind=agent.agent_kind)
+                return
+            self.wake(agent)
+
+        agent.step()
+
+        if getattr(agent, "navigating_state", None) in PARKED_STATES:
+            self.park(agent)
+
+    def park(self, agent):
+        """Park a waiting agent on the lights it sees and, when avoiding a collision, its next cell."""
+        next_pos = agent.get_next_position_from_path()
+        if next_pos is None:
+            return
+
+        traffic_light = self.model.tiles.traffic_light
+        lights = tuple({int(light_id) for light_id in (traffic_light[next_pos], traffic_light[agent.cell.coordinate]) if light_id >= 0})
+        cell = next_pos if agent.navigating_state == NavigatingState.AVOIDING_COLLISION else None
+
+        self.parked[agent] = (lights, cell)
+        for light_id in lights:
+            self.by_light[light_id].add(agent)
+        if cell is not None:
+            self.by_cell[cell].add(agent)
+
+    def wake(self, agent):
+        """Unpark an agent so its next turn is a full step."""
+        lights, cell = self.parked.pop(agent)
+        for light_id in lights:
+            self.by_light[light_id].discard(agent)
+        if cell is not None:
+            self.by_cell[cell].discard(agent)
+
+    def lights_changed(self, light_ids):
+        """Wake agents parked on lights whose state changed."""
+        for light_id in light_ids:
+            waiting = self.by_light.get(int(light_id))
+            while waiting:
+                self.wake(next(iter(waiting)))
+
+    def cell_vacated(self, coordinate):
+        """Wake agents parked behind a cell that a car or pedestrian just left."""
+        waiting = self.by_cell.get(coordinate)
+        while waiting:
+            self.wake(next(iter(waiting)))
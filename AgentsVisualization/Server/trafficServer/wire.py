@@ -0,0 +1,72 @@
+"""Compact binary encoding of frames, selected with the Accept header.
+
+A frame is a 48 byte little-endian header followed by one section per
+layer (cars, pedestrians, traffic lights). Header layout:
+
+    magic      4s   b"TRFB"
+    version    u16
+    reserved   u16
+    step       u32
+    counts     3 x u32, number of cars, pedestrians and lights
+    stats      6 x u32, in the key order of AgentCounters.stats()
+
+Each section of n entries holds, in order, uint32 ids[n], uint16 x[n],
+uint16 z[n] and uint8 values[n], padded to a multiple of 4 bytes so that
+every array can be read directly into a typed array. values holds the
+orientation code (0 none, 1 Up, 2 Down, 3 Left, 4 Right) of cars and
+pedestrians, and the state (0 red, 1 green) of lights. y is always 1 and
+is not sent.
+"""
+import struct
+
+import numpy as np
+
+from trafficAgents.traffic_base.tiles import ROAD_DIRECTION_CODES
+
+FRAME_MIMETYPE = "application/vnd.traffic-frame"
+FRAME_MAGIC = b"TRFB"
+FRAME_VERSION = 1
+HEADER = struct.Struct("<4sHHI3I6I")
+STATS_KEYS = ("active_cars", "arrived_cars", "total_cars", "active_pedestrians", "arrived_pedestrians", "total_pedestrians")
+
+
+def wants_binary(accept):
+    """Check whether an Accept header prefers binary frames over JSON."""
+    return accept.best_match(["application/json", FRAME_MIMETYPE]) == FRAME_MIMETYPE
+
+
+def _section(agents, value):
+    """Pack ids, coordinates and one uint8 value of some agents."""
+    count = len(agents)
+    ids = np.fromiter((agent.unique_id for agent in agents), dtype="<u4", count=count)
+    coordinates = np.fromiter(
+        (axis for agent in agents for axis in agent.cell.coordinate), dtype="<u2", count=2 * count
+    )
+    values = np.fromiter((value(agent) for agent in agents), dtype=np.uint8, count=count)
+    body = ids.tobytes() + coordinates[0::2].tobytes() + coordinates[1::2].tobytes() + values.tobytes()
+    return body + b"\0" * (-len(body) % 4)
+
+
+def _orientation(agent):
+    """Get the orientation code of a moving agent."""
+    return ROAD_DIRECTION_CODES.get(agent.orientation, 0)
+
+
+def encode_frame(model, step, cars=True, pedestrians=True, lights=True):
+    """Encode the requested layers of the model's current frame."""
+    car_agents = model.counters.agents("car") if cars else []
+    pedestrian_agents = model.counters.agents("pedestrian") if pedestrians else []
+    light_agents = model.traffic_lights if lights else []
+    stats = model.counters.stats()
+
+    header = HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, 0, step,
+        len(car_agents), len(pedestrian_agents), len(light_agents),
+        *(stats[key] for key in STATS_KEYS),
+    )
+    return b"".join((
+        header,
+        _section(car_agents, _orientation),
+        _section(pedestrian_agents, _orientation),
+        _section(light_agents, lambda light: light.state),
+    ))
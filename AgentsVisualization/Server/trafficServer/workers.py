@@ -0,0 +1,109 @@
+"""Worker processes that host session simulations outside the server's GIL."""
+import atexit
+import multiprocessing
+import threading
+
+from simulation import Simulation
+
+
+def _serve(connection):
+    """Run commands for the simulations of one worker until told to stop.
+
+    Messages are (session id, method, args, kwargs) tuples. "open" and
+    "close" create and drop a simulation, any other method is called on
+    the session's Simulation. Every message gets an (ok, result) reply,
+    with the exception as result when the call failed.
+    """
+    simulations = {}
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        session_id, method, args, kwargs = message
+        try:
+            if method == "open":
+                simulations[session_id] = Simulation(*args)
+                result = None
+            elif method == "close":
+                simulations.pop(session_id, None)
+                result = None
+            else:
+                result = getattr(simulations[session_id], method)(*args, **kwargs)
+            connection.send((True, result))
+        except Exception as e:
+            connection.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class Worker:
+    """One worker process and the pipe used to send it commands.
+
+    Commands to a worker are strictly request/reply, so calls from
+    different request threads are serialized by a lock on the pipe.
+    """
+
+    def __init__(self, context, index):
+        """Start the worker process."""
+        self.index = index
+        self.sessions = set()
+        self.lock = threading.Lock()
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_connection,), name=f"simulation-worker-{index}", daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def call(self, session_id, method, *args, **kwargs):
+        """Run a Simulation method for a session in this worker and return its result."""
+        with self.lock:
+            try:
+                self.connection.send((session_id, method, args, kwargs))
+                ok, result = self.connection.recv()
+            except (EOFError, OSError) as e:
+                raise RuntimeError(f"Simulation worker {self.index} is not responding") from e
+        if not ok:
+            raise result
+        return result
+
+    def stop(self):
+        """Ask the worker to exit and wait for it."""
+        with self.lock:
+            try:
+                self.connection.send(None)
+            except (EOFError, OSError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class WorkerPool:
+    """Fixed number of worker processes with sticky session placement.
+
+    A session is placed on the worker hosting the fewest sessions when it
+    is opened and stays there, so its model never leaves that process.
+    """
+
+    def __init__(self, size):
+        """Start size worker processes."""
+        if size < 1:
+            raise ValueError(f"Worker pool needs at least one process, got {size}")
+        context = multiprocessing.get_context("spawn")
+        self.workers = [Worker(context, index) for index in range(size)]
+        self.lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def assign(self, session_id):
+        """Pick the least loaded worker for a new session."""
+        with self.lock:
+            worker = min(self.workers, key=lambda worker: len(worker.sessions))
+            worker.sessions.add(session_id)
+        return worker
+
+    def release(self, worker, session_id):
+        """Forget a closed session."""
+        with self.lock:
+            worker.sessions.discard(session_id)
+
+    def stop(self):
+        """Stop every worker."""
+        for worker in self.workers:
+            worker.stop()
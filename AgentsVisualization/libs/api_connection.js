@@ -13,6 +13,24 @@ import { Object3D } from './object3d.js';
 // Define the agent server URI
 const agent_server_uri = "http://localhost:8585/";
 
+// Session id returned by /init; every other request is scoped to it
+let sessionId = null;
+
+/*
+ * Builds the URL of an endpoint of this client's session, with optional
+ * query parameters.
+ */
+function serverUrl(endpoint, params = {}) {
+    const url = new URL(endpoint, agent_server_uri);
+    if (sessionId != null) {
+        url.searchParams.set("session", sessionId);
+    }
+    for (const [key, value] of Object.entries(params)) {
+        url.searchParams.set(key, value);
+    }
+    return url.toString();
+}
+
 // Initialize arrays to store agents and obstacles
 const agents = [];
 const pedestrians = [];
@@ -33,13 +51,34 @@ const initData = {
 
 /* FUNCTIONS FOR THE INTERACTION WITH THE MESA SERVER */
 
+/*
+ * Creates or updates the Object3D of each position received from the server,
+ * keeping the previous position for interpolation.
+ */
+function syncPositions(collection, positions) {
+    for (const item of positions) {
+        const current = collection.find((object3d) => object3d.id == item.id);
+
+        if (current != undefined) {
+            // Update the object's position
+            current.oldPosArray = current.posArray;
+            current.position = { x: item.x, y: item.y, z: item.z };
+        } else {
+            // New object: create and add to the collection
+            const newObject = new Object3D(item.id, [item.x, item.y, item.z]);
+            newObject['oldPosArray'] = newObject.posArray;
+            collection.push(newObject);
+        }
+    }
+}
+
 /*
  * Initializes the agents model by sending a POST request to the agent server.
  */
 async function initAgentsModel() {
     try {
         // Send a POST request to the agent server to initialize the model
-        let response = await fetch(agent_server_uri + "init", {
+        let response = await fetch(serverUrl("init"), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(initData)
@@ -49,6 +88,8 @@ async function initAgentsModel() {
         if (response.ok) {
             // Parse the response as JSON and log the message
             let result = await response.json();
+            sessionId = result.session;
+            lastDeltaStep = null;
             console.log(result.message);
         } else {
             let result = await response.json();
@@ -67,41 +108,15 @@ async function initAgentsModel() {
 async function getAgents() {
     try {
         // Send a GET request to the agent server to retrieve the agent positions
-        let response = await fetch(agent_server_uri + "getAgents");
+        let response = await fetch(serverUrl("getAgents"));
 
         // Check if the response was successful
         if (response.ok) {
             // Parse the response as JSON
             let result = await response.json();
 
-            // Check if the agents array is empty
-            if (agents.length == 0) {
-                // Create new agents and add them to the agents array
-                for (const agent of result.agentpos) {
-                    const newAgent = new Object3D(agent.id, [agent.x, agent.y, agent.z]);
-                    // Store the initial position
-                    newAgent['oldPosArray'] = newAgent.posArray;
-                    agents.push(newAgent);
-                }
-            } else {
-                // Update the positions of existing agents
-                for (const agent of result.agentpos) {
-                    const current_agent = agents.find((object3d) => object3d.id == agent.id);
-
-                    // Check if the agent exists in the agents array
-                    if (current_agent != undefined) {
-                        // Update the agent's position
-                        current_agent.oldPosArray = current_agent.posArray;
-                        current_agent.position = { x: agent.x, y: agent.y, z: agent.z };
-                    } else {
-                        // NEW AGENT: Create and add to the array
-                        // console.log(`🆕 New agent detected: ${agent.id}`);
-                        const newAgent = new Object3D(agent.id, [agent.x, agent.y, agent.z]);
-                        newAgent['oldPosArray'] = newAgent.posArray;
-                        agents.push(newAgent);
-                    }
-                }
-            }
+            // Create or update the car objects
+            syncPositions(agents, result.agentpos);
         } else {
             let result = await response.json();
             console.log("Error:", result.message, result.error);
@@ -119,7 +134,7 @@ async function getAgents() {
 async function getObstacles() {
     try {
         // Send a GET request to the agent server to retrieve the obstacle positions
-        let response = await fetch(agent_server_uri + "getObstacles");
+        let response = await fetch(serverUrl("getObstacles"));
 
         // Check if the response was successful
         if (response.ok) {
@@ -144,7 +159,7 @@ async function getObstacles() {
 
 async function getTrafficLights() {
     try {
-        let response = await fetch(agent_server_uri + "getTrafficLights");
+        let response = await fetch(serverUrl("getTrafficLights"));
         if (response.ok) {
             let result = await response.json();
             for (const tf of result.TrafficLightpos) {
@@ -162,7 +177,7 @@ async function getTrafficLights() {
 
 async function getRoads() {
     try {
-        let response = await fetch(agent_server_uri + "getRoads");
+        let response = await fetch(serverUrl("getRoads"));
         if (response.ok) {
             let result = await response.json();
             for (const road of result.Roadpos) {
@@ -180,7 +195,7 @@ async function getRoads() {
 
 async function getDestinations() {
     try {
-        let response = await fetch(agent_server_uri + "getDestinations");
+        let response = await fetch(serverUrl("getDestinations"));
         if (response.ok) {
             let result = await response.json();
             for (const dest of result.Destinationpos) {
@@ -198,7 +213,7 @@ async function getDestinations() {
 
 async function getSidewalks() {
     try {
-        let response = await fetch(agent_server_uri + "getSidewalks");
+        let response = await fetch(serverUrl("getSidewalks"));
         if (response.ok) {
             let result = await response.json();
             for (const sw of result.Sidewalkpos) {
@@ -216,7 +231,7 @@ async function getSidewalks() {
 
 async function getPedestrianWalks() {
     try {
-        let response = await fetch(agent_server_uri + "getPedestrianWalks");
+        let response = await fetch(serverUrl("getPedestrianWalks"));
         if (response.ok) {
             let result = await response.json();
             for (const pw of result.PedestrianWalkpos) {
@@ -235,38 +250,96 @@ async function getPedestrianWalks() {
 async function getPedestrians() {
     try {
         // Call the correct endpoint
-        let response = await fetch(agent_server_uri + "getPedestrians");
+        let response = await fetch(serverUrl("getPedestrians"));
 
         if (response.ok) {
             let result = await response.json();
 
             // result MUST contain: result.Pedestrianpos
-            const pedList = result.Pedestrianpos;
-
-            if (pedestrians.length === 0) {
-                // First time → create Object3D for all pedestrians
-                for (const ped of pedList) {
-                    const newPed = new Object3D(ped.id, [ped.x, ped.y, ped.z]);
-                    newPed.oldPosArray = newPed.posArray;
-                    pedestrians.push(newPed);
-                }
+            syncPositions(pedestrians, result.Pedestrianpos);
+        } else {
+            let result = await response.json();
+            console.log("Error:", result.message, result.error);
+        }
+
+    } catch (error) {
+        console.log(error);
+    }
+}
+
+
+/*
+ * Retrieves cars, pedestrians, traffic light states and stats in a single
+ * request. When advance is true the server steps the model first.
+ */
+async function getState(advance = false) {
+    try {
+        let response = await fetch(serverUrl("state", advance ? { advance: true } : {}));
+
+        if (response.ok) {
+            let result = await response.json();
+            applyFrame(result);
+            return result;
+        } else {
+            let result = await response.json();
+            console.log("Error:", result.message, result.error);
+        }
+
+    } catch (error) {
+        console.log(error);
+    }
+}
+
+/*
+ * Removes the Object3D of every id the server reported as gone.
+ */
+function removeIds(collection, ids) {
+    for (const id of ids) {
+        const index = collection.findIndex((object3d) => object3d.id == id);
+        if (index != -1) {
+            collection.splice(index, 1);
+        }
+    }
+}
+
+// Last step received from /delta, or null before the first frame
+let lastDeltaStep = null;
+
+/*
+ * Retrieves only what changed since the last frame received from /delta.
+ * The server answers with a full frame when the step is no longer buffered.
+ */
+async function getDelta() {
+    try {
+        let response = await fetch(serverUrl("delta", lastDeltaStep != null ? { since: lastDeltaStep } : {}));
+
+        if (response.ok) {
+            let result = await response.json();
+
+            if (result.full) {
+                agents.length = 0;
+                pedestrians.length = 0;
+                syncPositions(agents, result.agentpos);
+                syncPositions(pedestrians, result.Pedestrianpos);
             } else {
-                // Update positions or add new pedestrian
-                for (const ped of pedList) {
-                    let currentPed = pedestrians.find((p) => p.id == ped.id);
-
-                    if (currentPed) {
-                        // Update existing pedestrian
-                        currentPed.oldPosArray = currentPed.posArray;
-                        currentPed.position = { x: ped.x, y: ped.y, z: ped.z };
-                    } else {
-                        // Add new pedestrian dynamically
-                        const newPed = new Object3D(ped.id, [ped.x, ped.y, ped.z]);
-                        newPed.oldPosArray = newPed.posArray;
-                        pedestrians.push(newPed);
-                    }
+                syncPositions(agents, result.agentpos.updated);
+                removeIds(agents, result.agentpos.removed);
+                syncPositions(pedestrians, result.Pedestrianpos.updated);
+                removeIds(pedestrians, result.Pedestrianpos.removed);
+            }
+
+            // Update the state of the lights that flipped
+            const lights = result.full ? result.TrafficLightpos : result.TrafficLightpos.updated;
+            for (const tf of lights) {
+                const current = trafficLights.find((object3d) => object3d.id == tf.id);
+                if (current != undefined) {
+                    current.state = tf.state;
+                    current.timeRemaining = tf.time_remaining;
                 }
             }
+
+            lastDeltaStep = result.step;
+            return result;
         } else {
             let result = await response.json();
             console.log("Error:", result.message, result.error);
@@ -277,32 +350,147 @@ async function getPedestrians() {
     }
 }
 
+// Media type of the packed binary frames, see trafficServer/wire.py
+const FRAME_MIMETYPE = "application/vnd.traffic-frame";
+const FRAME_HEADER_BYTES = 48;
+const STATS_KEYS = ["active_cars", "arrived_cars", "total_cars", "active_pedestrians", "arrived_pedestrians", "total_pedestrians"];
 
 /*
- * Updates the agent positions by sending a request to the agent server.
+ * Decodes a packed binary frame into typed arrays without copying.
+ * Every layer holds ids, x, z and values (orientation code or light state).
  */
-async function update() {
+function decodeFrame(buffer) {
+    const header = new DataView(buffer, 0, FRAME_HEADER_BYTES);
+    const frame = { step: header.getUint32(8, true), stats: {} };
+    STATS_KEYS.forEach((key, index) => {
+        frame.stats[key] = header.getUint32(24 + 4 * index, true);
+    });
+
+    let offset = FRAME_HEADER_BYTES;
+    ["cars", "pedestrians", "lights"].forEach((layer, index) => {
+        const count = header.getUint32(12 + 4 * index, true);
+        const ids = new Uint32Array(buffer, offset, count);
+        offset += 4 * count;
+        const x = new Uint16Array(buffer, offset, count);
+        offset += 2 * count;
+        const z = new Uint16Array(buffer, offset, count);
+        offset += 2 * count;
+        const values = new Uint8Array(buffer, offset, count);
+        offset += count + ((4 - count % 4) % 4);
+        frame[layer] = { ids, x, z, values };
+    });
+    return frame;
+}
+
+/*
+ * Retrieves the current frame as packed arrays. When advance is true the
+ * server steps the model first.
+ */
+async function getBinaryState(advance = false) {
     try {
-        // Send a request to the agent server to update the agent positions
-        let response = await fetch(agent_server_uri + "update");
+        let response = await fetch(serverUrl("state", advance ? { advance: true } : {}), {
+            headers: { 'Accept': FRAME_MIMETYPE }
+        });
 
-        // Check if the response was successful
         if (response.ok) {
-            // Retrieve the updated agent positions
-            await getAgents();
-            // Retrieve the updated pedestrian positions
-            await getPedestrians();
-            // Log a message indicating that the agents have been updated
-            //console.log("Updated agents");
+            return decodeFrame(await response.arrayBuffer());
         } else {
             let result = await response.json();
             console.log("Error:", result.message, result.error);
         }
 
     } catch (error) {
-        // Log any errors that occur during the request
         console.log(error);
     }
 }
 
-export { agents, pedestrians, obstacles, trafficLights, roads, destinations, sidewalks, pedestrianWalks, initAgentsModel, update, getAgents, getObstacles, getTrafficLights, getRoads, getDestinations, getSidewalks, getPedestrianWalks, getPedestrians };
\ No newline at end of file
+/*
+ * Applies a full frame of cars, pedestrians and traffic light states.
+ */
+function applyFrame(result) {
+    syncPositions(agents, result.agentpos);
+    syncPositions(pedestrians, result.Pedestrianpos);
+
+    // Update the state of the known traffic lights
+    for (const tf of result.TrafficLightpos) {
+        const current = trafficLights.find((object3d) => object3d.id == tf.id);
+        if (current != undefined) {
+            current.state = tf.state;
+            current.timeRemaining = tf.time_remaining;
+        }
+    }
+}
+
+/*
+ * Starts the server-side ticker and subscribes to the frames it pushes.
+ * onFrame is called with every frame received. Returns the EventSource,
+ * which the caller closes to unsubscribe.
+ */
+async function streamFrames(rate = 10, onFrame = null) {
+    try {
+        await fetch(serverUrl("stream/start", { rate: rate }), { method: 'POST' });
+    } catch (error) {
+        console.log(error);
+        return null;
+    }
+
+    const source = new EventSource(serverUrl("stream"));
+    source.addEventListener("frame", (event) => {
+        const result = JSON.parse(event.data);
+        applyFrame(result);
+        if (onFrame != null) {
+            onFrame(result);
+        }
+    });
+    source.addEventListener("end", () => source.close());
+    return source;
+}
+
+/*
+ * Stops the server-side ticker, ending every open stream.
+ */
+async function stopStream() {
+    try {
+        await fetch(serverUrl("stream/stop"), { method: 'POST' });
+    } catch (error) {
+        console.log(error);
+    }
+}
+
+/*
+ * Advances the model up to steps times on the server, stopping early when
+ * the optional until condition holds (e.g. "all_cars_arrived" or
+ * "step:500"). Returns the aggregated stats of the run.
+ */
+async function fastForward(steps, until = null, perStep = false) {
+    const params = { steps: steps };
+    if (until != null) {
+        params.until = until;
+    }
+    if (perStep) {
+        params.per_step = true;
+    }
+
+    try {
+        let response = await fetch(serverUrl("update", params));
+        let result = await response.json();
+
+        if (response.ok) {
+            return result;
+        } else {
+            console.log("Error:", result.message, result.error);
+        }
+
+    } catch (error) {
+        console.log(error);
+    }
+}
+
+/*
+ * Advances the model one step and retrieves the new state in one request.
+ */
+async function update() {
+    await getState(true);
+}
+
+export { agents, pedestrians, obstacles, trafficLights, roads, destinations, sidewalks, pedestrianWalks, initAgentsModel, update, fastForward, getState, getBinaryState, decodeFrame, getDelta, streamFrames, stopStream, getAgents, getObstacles, getTrafficLights, getRoads, getDestinations, getSidewalks, getPedestrianWalks, getPedestrians };
\ No newline at end of file